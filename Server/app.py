@@ -9,11 +9,15 @@ from agent.EAgent import EAgent
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(project_root)
 
-from flask import Flask, request, jsonify, render_template, Response
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
 import json
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
-from database.Neo4jDataProcessor import Node, Link
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from database.Neo4jDataProcessor import (Node, Link, Graph, GRAPH, EVENTS, LINK_CACHE, GRAPH_MIRROR, JOURNAL,
+                                         ExternalChangeWatcher, cache_stats)
+from database.GraphSnapshot import SnapshotStore
+from Server.broadcast import EventAggregator
+from Server.config import Config
 import threading
 import time
 
@@ -22,96 +26,203 @@ CORS(app)  # 允许跨域请求
 socketio = SocketIO(app, 
                    cors_allowed_origins="*",
                    async_mode='threading',
-                   logger=True,
-                   engineio_logger=True)
+                   logger=Config.SOCKET_LOGGER,
+                   engineio_logger=Config.SOCKET_LOGGER)
+
+# 当前连接的客户端数量，没有客户端时不检测外部修改
+connected_clients = 0
+clients_lock = threading.Lock()
+
+# 未订阅的客户端所在的房间，接收全部事件
+ALL_EVENTS_ROOM = 'graph:all'
+
+class ClientSubscription:
+    """客户端订阅的节点ID、标签和视口，只有涉及这些节点（或带有这些标签的节点）的事件才发给该客户端
+
+    通过标签匹配发出的节点会加入 node_ids，之后的修改、删除以及相连关系的事件仍能送达。
+    viewport 是客户端平移、缩放画布后发来的可见节点ID，每次整体替换。
+    节点的创建和修改事件都带有完整的标签列表；删除事件只按ID匹配，客户端不认识的节点被删除与它无关。
+    """
+
+    def __init__(self):
+        self.node_ids = set()
+        self.labels = set()
+        self.viewport = set()
+
+    def update(self, node_ids, labels, mode):
+        if mode == 'replace':
+            self.node_ids, self.labels = set(node_ids), set(labels)
+        elif mode == 'add':
+            self.node_ids.update(node_ids)
+            self.labels.update(labels)
+        elif mode == 'remove':
+            self.node_ids.difference_update(node_ids)
+            self.labels.difference_update(labels)
+        else:
+            raise ValueError(f"Unknown subscription mode: {mode}")
+
+    def _node_matches(self, node_id, labels=()):
+        if node_id in self.node_ids or node_id in self.viewport:
+            return True
+        return bool(self.labels) and not self.labels.isdisjoint(labels)
+
+    def touches(self, event, data):
+        """判断事件是否与订阅相关，并随之更新订阅的节点ID"""
+        if event == 'graph_reset':
+            return True
+        if event == 'node_deleted':
+            matched = self._node_matches(data['id'])
+            self.node_ids.discard(data['id'])
+            self.viewport.discard(data['id'])
+            return matched
+        if event.startswith('node_'):
+            matched = self._node_matches(data['id'], data.get('labels', ()))
+            if matched:
+                self.node_ids.add(data['id'])
+            return matched
+        start_id, end_id = data.get('start_node_id'), data.get('end_node_id')
+        if start_id is None:
+            cached = LINK_CACHE.peek(data['id'])
+            if cached is None:
+                # 关系事件都带有两端节点ID，缺少时无法判断是否相关，不发给按订阅过滤的客户端
+                return False
+            start_id, end_id = cached.start_node_id, cached.end_node_id
+        return self._node_matches(start_id) or self._node_matches(end_id)
+
+# 客户端 sid -> ClientSubscription，只包含已订阅的客户端
+subscriptions = {}
 
 # WebSocket 事件监听
 @socketio.on('connect')
 def handle_connect():
+    global connected_clients
+    with clients_lock:
+        connected_clients += 1
+    join_room(ALL_EVENTS_ROOM)
     print('Client connected')
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    global connected_clients
+    with clients_lock:
+        connected_clients -= 1
+        subscriptions.pop(request.sid, None)
     print('Client disconnected')
 
-# 广播节点创建事件
-def broadcast_node_created(node):
-    socketio.emit('node_created', node)
-
-# 广播节点更新事件
-def broadcast_node_updated(node):
-    socketio.emit('node_updated', node)
-
-# 广播节点删除事件
-def broadcast_node_deleted(node_id):
-    socketio.emit('node_deleted', {'id': node_id})
-
-# 广播关系创建事件
-def broadcast_relationship_created(relationship):
-    socketio.emit('relationship_created', relationship)
-
-# 广播关系更新事件
-def broadcast_relationship_updated(relationship):
-    socketio.emit('relationship_updated', relationship)
-
-# 广播关系删除事件
-def broadcast_relationship_deleted(relationship_id):
-    socketio.emit('relationship_deleted', {'id': relationship_id})
-
-# 轮询 Neo4j 数据变化
-def poll_neo4j_changes():
-    last_nodes = set()
-    last_relationships = set()
-
+# 更新订阅：{node_ids, labels, mode: replace/add/remove}，{all: true} 恢复接收全部事件；视口另见 viewport 事件
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    data = data or {}
+    if data.get('all'):
+        with clients_lock:
+            subscriptions.pop(request.sid, None)
+        join_room(ALL_EVENTS_ROOM)
+        return {'code': 200}
+    try:
+        node_ids = [int(node_id) for node_id in data.get('node_ids') or []]
+        with clients_lock:
+            subscription = subscriptions.get(request.sid) or ClientSubscription()
+            subscription.update(node_ids, data.get('labels') or [], data.get('mode', 'replace'))
+            subscriptions[request.sid] = subscription
+    except (TypeError, ValueError) as e:
+        return {'code': 400, 'message': str(e)}
+    leave_room(ALL_EVENTS_ROOM)
+    return {'code': 200}
+
+# 更新视口订阅：{node_ids}，客户端平移或缩放画布后发送当前可见的节点ID，替换上一次的视口
+@socketio.on('viewport')
+def handle_viewport(data):
+    try:
+        node_ids = {int(node_id) for node_id in (data or {}).get('node_ids') or []}
+    except (TypeError, ValueError) as e:
+        return {'code': 400, 'message': str(e)}
+    with clients_lock:
+        subscription = subscriptions.get(request.sid) or ClientSubscription()
+        subscription.viewport = node_ids
+        subscriptions[request.sid] = subscription
+    leave_room(ALL_EVENTS_ROOM)
+    return {'code': 200}
+
+# 把事件总线上的图变更事件按时间窗口合并为 graph_delta 帧：
+# 未订阅的客户端通过房间接收整帧，已订阅的客户端只接收与订阅相关的事件
+def broadcast_delta(frame):
+    socketio.emit('graph_delta', frame, to=ALL_EVENTS_ROOM)
+    with clients_lock:
+        deliveries = []
+        for sid, subscription in subscriptions.items():
+            events = [item for item in frame['events'] if subscription.touches(item['event'], item['data'])]
+            if events:
+                deliveries.append((sid, events))
+    for sid, events in deliveries:
+        socketio.emit('graph_delta', {**frame, 'events': events}, to=sid)
+
+event_aggregator = EventAggregator(broadcast_delta, Config.SOCKET_BATCH_WINDOW_MS / 1000)
+EVENTS.subscribe(event_aggregator)
+
+# 检测应用之外对图的修改，应用内的写操作已通过事件总线直接发布
+change_watcher = ExternalChangeWatcher()
+
+def watch_external_changes():
     while True:
-        # 获取当前节点和关系
-        current_nodes = set(node.id for node in Node.get_all_nodes())
-        current_relationships = set(link.id for link in Link.get_all_relationships())
-
-        # 检查新增节点
-        new_nodes = current_nodes - last_nodes
-        for node_id in new_nodes:
-            node = Node.from_id(node_id).to_dict()
-            broadcast_node_created(node)
-
-        # 检查删除节点
-        deleted_nodes = last_nodes - current_nodes
-        for node_id in deleted_nodes:
-            broadcast_node_deleted(node_id)
-
-        # 检查新增关系
-        new_relationships = current_relationships - last_relationships
-        for rel_id in new_relationships:
-            relationship = Link.from_id(rel_id).to_dict()
-            broadcast_relationship_created(relationship)
-
-        # 检查删除关系
-        deleted_relationships = last_relationships - current_relationships
-        for rel_id in deleted_relationships:
-            broadcast_relationship_deleted(rel_id)
-
-        # 更新缓存
-        last_nodes = current_nodes
-        last_relationships = current_relationships
-
-        # 轮询间隔
-        time.sleep(5)
-
-# 启动轮询线程
-threading.Thread(target=poll_neo4j_changes, daemon=True).start()
+        # 没有客户端时按最大间隔等待，不访问数据库；启用拓扑镜像时始终检测，镜像依靠检测结果得知外部修改
+        if connected_clients > 0 or GRAPH_MIRROR is not None:
+            try:
+                change_watcher.poll()
+            except Exception as e:
+                print(f'Failed to detect external changes: {str(e)}')
+            time.sleep(change_watcher.interval)
+        else:
+            # 暂停期间不记录写操作涉及的ID，客户端重新连接后重新建立指纹表
+            change_watcher.pause()
+            time.sleep(change_watcher.max_interval)
+
+# 启动外部修改检测线程
+threading.Thread(target=watch_external_changes, daemon=True).start()
+
+# 用连接数最多的节点预热缓存
+def warm_cache():
+    try:
+        count = Node.warm_cache()
+        print(f'Cache warmed with {count} nodes')
+    except Exception as e:
+        print(f'Failed to warm cache: {str(e)}')
+
+threading.Thread(target=warm_cache, daemon=True).start()
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
+# 解析列表接口的分页参数：cursor 为上一页返回的 next_cursor，limit 为每页数量
+def parse_page_args():
+    cursor = request.args.get('cursor', type=int)
+    limit = request.args.get('limit', Config.API_PAGE_SIZE, type=int)
+    return cursor, max(1, min(limit, Config.API_MAX_PAGE_SIZE))
+
+# 请求 stream=1 或 Accept 为 application/x-ndjson 时以 NDJSON 流式返回全部数据
+def wants_stream():
+    return (request.args.get('stream') in ('1', 'true')
+            or request.accept_mimetypes.best == 'application/x-ndjson')
+
+# 边从数据库读取边输出，每行一个 JSON 对象，服务端内存占用与数据量无关
+def ndjson_response(items):
+    def generate():
+        for item in items:
+            yield json.dumps(item, ensure_ascii=False) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 # 节点接口
 @app.route('/api/nodes', methods=['GET', 'POST'])
 def handle_nodes():
     if request.method == 'GET':
-        nodes = [node.to_dict() for node in Node.get_all_nodes()]
+        if wants_stream():
+            return ndjson_response(node.to_dict() for node in Node.iter_all_nodes())
+        cursor, limit = parse_page_args()
+        nodes, next_cursor = Node.get_nodes_page(cursor, limit)
         return jsonify({
             'code': 200,
-            'data': nodes
+            'data': [node.to_dict() for node in nodes],
+            'next_cursor': next_cursor
         })
     elif request.method == 'POST':
         data = request.json
@@ -155,10 +266,15 @@ def handle_node(node_id):
 @app.route('/api/relationships', methods=['GET', 'POST'])
 def handle_relationships():
     if request.method == 'GET':
-        relationships = [link.to_dict() for link in Link.get_all_relationships()]
+        # 关系只返回两端节点ID，节点信息通过节点接口获取
+        if wants_stream():
+            return ndjson_response(link.to_dict(include_nodes=False) for link in Link.iter_all_relationships())
+        cursor, limit = parse_page_args()
+        links, next_cursor = Link.get_relationships_page(cursor, limit)
         return jsonify({
             'code': 200,
-            'data': relationships
+            'data': [link.to_dict(include_nodes=False) for link in links],
+            'next_cursor': next_cursor
         })
     elif request.method == 'POST':
         data = request.json
@@ -166,8 +282,7 @@ def handle_relationships():
         end_node_id = data.get('endNodeId')
         rel_type = data.get('type', 'CONNECTS_TO')
         properties = data.get('properties', {})
-        start_node = Node.from_id(start_node_id)
-        relationship = start_node.connect(end_node_id, rel_type, properties).to_dict()
+        relationship = Link.from_nodes(start_node_id, end_node_id, rel_type, properties).to_dict()
         return jsonify({
             'code': 201,
             'data': relationship
@@ -239,60 +354,443 @@ def handle_relationship(relationship_id):
             'data': deleted_relationship
         })
 
+# 批量操作接口：所有操作在一个事务中执行，任一操作失败时整体回滚
+@app.route('/api/batch', methods=['POST'])
+def handle_batch():
+    data = request.json or {}
+    operations = data.get('operations', [])
+    if not isinstance(operations, list) or not operations:
+        return jsonify({
+            'code': 400,
+            'message': 'operations must be a non-empty list'
+        }), 400
+
+    try:
+        # 合并后的事件由 Graph.execute_batch 作为一个 graph_batch 事件发布
+        results, events = Graph.execute_batch(operations)
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        }), 400
+
+    summary = []
+    ids = {}
+    for item in results:
+        record = item['result']
+        item_id = record['node_id'] if 'node_id' in record else record['rel_id']
+        summary.append({'op': item['op'], 'ref': item['ref'], 'id': item_id})
+        if item['ref'] is not None:
+            ids[item['ref']] = item_id
+    return jsonify({
+        'code': 200,
+        'data': {
+            'ids': ids,
+            'results': summary,
+            'events': events
+        }
+    })
+
+# 子图接口：返回种子节点周围的节点和它们之间的关系，供前端按需加载
+@app.route('/api/subgraph', methods=['GET'])
+def handle_subgraph():
+    seeds = request.args.get('seeds')
+    labels = request.args.get('labels')
+    types = request.args.get('types')
+    try:
+        seed_ids = [int(seed) for seed in seeds.split(',') if seed] if seeds else None
+    except ValueError:
+        return jsonify({
+            'code': 400,
+            'message': 'seeds must be a comma separated list of node ids'
+        }), 400
+    nodes, links, truncated = Graph.get_subgraph(
+        seed_ids=seed_ids,
+        q=request.args.get('q'),
+        depth=request.args.get('depth', 1, type=int),
+        limit=request.args.get('limit', type=int),
+        labels=labels.split(',') if labels else None,
+        types=types.split(',') if types else None
+    )
+    return jsonify({
+        'code': 200,
+        'data': {
+            'nodes': [node.to_dict() for node in nodes],
+            'relationships': [link.to_dict(include_nodes=False) for link in links],
+            'truncated': truncated
+        }
+    })
+
+# 路径查询接口：返回两个节点之间按跳数排序的最短路径
+@app.route('/api/paths', methods=['GET'])
+def handle_paths():
+    start_node_id = request.args.get('start', type=int)
+    end_node_id = request.args.get('end', type=int)
+    if start_node_id is None or end_node_id is None:
+        return jsonify({
+            'code': 400,
+            'message': 'Both start and end are required'
+        }), 400
+    types = request.args.get('types')
+    try:
+        paths = Node.find_paths(
+            start_node_id,
+            end_node_id,
+            k=request.args.get('k', 1, type=int),
+            max_depth=request.args.get('max_depth', type=int),
+            direction=request.args.get('direction', 'out'),
+            rel_types=types.split(',') if types else None
+        )
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        }), 400
+    except TimeoutError as e:
+        return jsonify({
+            'code': 504,
+            'message': str(e)
+        }), 504
+    return jsonify({
+        'code': 200,
+        'data': paths
+    })
+
+# 度数查询接口：view 为 isolated 时分页返回孤立节点，为 hubs 时返回度数最高的节点，
+# 为 histogram 时返回度数分布；cursor 为上一页返回的 next_cursor，孤立节点为节点ID，
+# 度数最高的节点为 "度数:节点ID"
+@app.route('/api/degrees', methods=['GET'])
+def handle_degrees():
+    view = request.args.get('view', 'hubs')
+    direction = request.args.get('direction', 'total')
+    _, limit = parse_page_args()
+    cursor = request.args.get('cursor')
+    try:
+        if view == 'histogram':
+            return jsonify({
+                'code': 200,
+                'data': Node.degree_histogram(direction)
+            })
+        if view == 'isolated':
+            nodes, next_cursor = Node.get_isolated_nodes_page(int(cursor) if cursor else None, limit)
+            data = [node.to_dict() for node in nodes]
+            total = Node.count_isolated_nodes()
+        elif view == 'hubs':
+            after = tuple(int(part) for part in cursor.split(':')) if cursor else None
+            if after is not None and len(after) != 2:
+                raise ValueError("cursor must be degree:node_id")
+            ranked, next_cursor = Node.get_hub_nodes_page(after, limit, direction)
+            data = [{**node.to_dict(), 'degree': degree} for node, degree in ranked]
+            next_cursor = f'{next_cursor[0]}:{next_cursor[1]}' if next_cursor else None
+            total = None
+        else:
+            raise ValueError("view must be one of isolated, hubs, histogram")
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        }), 400
+    return jsonify({
+        'code': 200,
+        'data': data,
+        'total': total,
+        'next_cursor': next_cursor
+    })
+
+# 重复节点检测：返回按大小降序的近似重复节点簇，include_unnamed=1 时没有 name 的节点也参与检测
+@app.route('/api/duplicates', methods=['GET'])
+def handle_duplicates():
+    result = Graph.find_duplicates(
+        threshold=request.args.get('threshold', type=float),
+        limit=max(1, min(request.args.get('limit', 50, type=int), Config.API_MAX_PAGE_SIZE)),
+        include_unnamed=request.args.get('include_unnamed') in ('1', 'true')
+    )
+    return jsonify({
+        'code': 200,
+        'data': result
+    })
+
+# 合并节点：{node_ids: [保留的节点ID, 其他节点ID...], properties: discard/overwrite/combine}
+@app.route('/api/nodes/merge', methods=['POST'])
+def handle_merge_nodes():
+    data = request.json or {}
+    try:
+        node_ids = [int(node_id) for node_id in data.get('node_ids') or []]
+        node = Node.merge_nodes(node_ids, data.get('properties', 'discard'))
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        }), 400
+    return jsonify({
+        'code': 200,
+        'data': node.to_dict()
+    })
+
+# 全图分析接口，结果按图版本号缓存：
+#   /api/analytics/components?kind=weak|strong   连通分量数量、最大的分量和分量大小分布
+#   /api/analytics/reachability?nodes=1,2,3      按连通分量对节点分组，同组节点互相可达
+#   /api/analytics/pagerank|degree|betweenness   中心性最高的节点
+@app.route('/api/analytics/<metric>', methods=['GET'])
+def handle_analytics(metric):
+    limit = max(1, min(request.args.get('limit', 10, type=int), Config.API_MAX_PAGE_SIZE))
+    kind = request.args.get('kind', 'weak')
+    try:
+        if metric == 'components':
+            data = Graph.analyze_components(kind, limit)
+        elif metric == 'reachability':
+            nodes = request.args.get('nodes', '')
+            data = Graph.check_reachability([int(node_id) for node_id in nodes.split(',') if node_id], kind)
+        else:
+            options = {}
+            if metric == 'pagerank':
+                options['damping'] = request.args.get('damping', 0.85, type=float)
+            elif metric == 'betweenness':
+                options['samples'] = request.args.get('samples', type=int)
+                options['seed'] = request.args.get('seed', 0, type=int)
+            ranked, info = Graph.rank_nodes(metric, limit, **options)
+            data = {**info, 'ranked': [{**node.to_dict(), 'score': score} for node, score in ranked]}
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        }), 400
+    return jsonify({
+        'code': 200,
+        'data': data
+    })
+
+# 连接池使用情况，用于根据工作线程数量调整连接池大小
+@app.route('/api/pool', methods=['GET'])
+def handle_pool_stats():
+    return jsonify({
+        'code': 200,
+        'data': GRAPH.pool_stats()
+    })
+
+# 节点和关系缓存的命中情况
+@app.route('/api/cache', methods=['GET'])
+def handle_cache_stats():
+    return jsonify({
+        'code': 200,
+        'data': cache_stats()
+    })
+
+# 广播合并的统计：发出的帧数、合并的发布次数、收到/发出/被合并掉的事件数
+@app.route('/api/broadcast', methods=['GET'])
+def handle_broadcast_stats():
+    return jsonify({
+        'code': 200,
+        'data': event_aggregator.stats
+    })
+
 # 后台任务管理器
 class BackgroundTaskManager:
-    def __init__(self):
-        self.frozen_state = None
+    """冻结和重置图，快照保存在磁盘上，重启后仍可重置；配合变更日志可以恢复到日志中的任意位置"""
+
+    def __init__(self, store, journal=None):
+        self.store = store
+        self.journal = journal
+        # 未完成的重置：(快照名称, 进度)，再次重置同一快照时从失败的位置继续
+        self.reset_progress = None
         self.task_lock = threading.Lock()
-        
-    def freeze_graph(self):
+
+    def save_snapshot(self, name, measure_json=False):
         with self.task_lock:
-            # 获取所有节点和关系
-            nodes = [node.to_dict() for node in Node.get_all_nodes()]
-            relationships = [link.to_dict() for link in Link.get_all_relationships()]
-            
-            # 保存冻结状态
-            self.frozen_state = {
-                'nodes': nodes,
-                'relationships': relationships
-            }
-            
-    def reset_graph(self):
+            # 快照之前的日志位置，从该快照重放时从这里开始
+            journal_position = self.journal.position if self.journal else None
+            # 在一个读事务中读取所有节点和关系
+            started = time.perf_counter()
+            snapshot = Graph.freeze()
+            read_seconds = time.perf_counter() - started
+            stats = self.store.save(name, snapshot, journal_position, measure_json)
+            stats['read_seconds'] = read_seconds
+            if self.reset_progress and self.reset_progress[0] == name:
+                self.reset_progress = None
+            return stats
+
+    def _restore(self, snapshot, name):
+        """恢复快照，返回统计信息以及快照中的ID到当前ID的节点、关系映射"""
+        if self.reset_progress is None or self.reset_progress[0] != name:
+            # 优先只恢复有差异的部分，未改动的节点保持原ID
+            stats = Graph.restore_diff(snapshot)
+            if stats is not None:
+                node_id_map, relationship_id_map = stats.pop('node_id_map'), stats.pop('relationship_id_map')
+                return {'name': name, 'mode': 'diff', 'load_seconds': snapshot.load_seconds, **stats}, \
+                    node_id_map, relationship_id_map
+            self.reset_progress = (name, {})
+        # 分块清空并重建，失败时保留进度，下次重置从失败的块继续
+        progress = Graph.restore(snapshot, self.reset_progress[1])
+        self.reset_progress = None
+        return {
+            'name': name,
+            'mode': 'full',
+            'load_seconds': snapshot.load_seconds,
+            'deleted': progress['deleted'],
+            'nodes': progress['nodes'],
+            'relationships': progress['relationships'],
+            'timings': progress['timings']
+        }, progress['node_id_map'], progress['relationship_id_map']
+
+    def restore_snapshot(self, name):
+        with self.task_lock:
+            return self._restore(self.store.open(name), name)[0]
+
+    def replay_journal(self, name, position=None):
+        """恢复快照后重放快照之后到 position 为止的变更日志，position 为 None 时重放到末尾"""
+        if self.journal is None:
+            raise ValueError("Mutation journal is disabled")
+        with self.task_lock:
+            snapshot = self.store.open(name)
+            start = snapshot.meta.get('journal_position')
+            if start is None:
+                raise ValueError(f"Snapshot {name} has no journal position")
+            position = self.journal.position if position is None else position
+            if position < start:
+                raise ValueError(f"Position {position} is before snapshot {name} (journal position {start})")
+            stats, node_id_map, relationship_id_map = self._restore(snapshot, name)
+            started = time.perf_counter()
+            replayed = Graph.replay(self.journal.read(start, position), node_id_map, relationship_id_map)
+            stats['timings']['replay'] = time.perf_counter() - started
+            stats['replayed'] = replayed['replayed']
+            stats['position'] = position
+            return stats
+
+    def delete_snapshot(self, name):
         with self.task_lock:
-            if not self.frozen_state:
-                raise ValueError("No frozen state available")
-            
-            # 删除现有所有节点和关系
-            for node in Node.get_all_nodes():
-                node.remove()
-            
-            # 创建节点ID映射表
-            node_id_map = {}
-            
-            # 恢复冻结的节点并记录新ID
-            for node_data in self.frozen_state['nodes']:
-                new_node = Node.from_node(node_data['labels'], node_data['properties'])
-                node_id_map[node_data['id']] = new_node.id
-            
-            # 恢复冻结的关系，使用新的节点ID
-            for rel_data in self.frozen_state['relationships']:
-                start_id = node_id_map.get(rel_data['start_node']['id'])
-                end_id = node_id_map.get(rel_data['end_node']['id'])
-                
-                if start_id>-1 and end_id>-1:
-                    start_node = Node.from_id(start_id)
-                    start_node.connect(end_id, rel_data['type'], rel_data['properties'])
+            if self.reset_progress and self.reset_progress[0] == name:
+                self.reset_progress = None
+            return self.store.delete(name)
+
+    def freeze_graph(self):
+        return self.save_snapshot(Config.FROZEN_SNAPSHOT_NAME)
+
+    def reset_graph(self):
+        if not self.store.exists(Config.FROZEN_SNAPSHOT_NAME):
+            raise ValueError("No frozen state available")
+        return self.restore_snapshot(Config.FROZEN_SNAPSHOT_NAME)
 
 # 初始化后台任务管理器
-task_manager = BackgroundTaskManager()
+task_manager = BackgroundTaskManager(SnapshotStore(Config.SNAPSHOT_DIR), JOURNAL)
+
+# 变更日志的当前位置和分段
+@app.route('/api/journal', methods=['GET'])
+def handle_journal():
+    if JOURNAL is None:
+        return jsonify({
+            'code': 404,
+            'message': 'Mutation journal is disabled'
+        }), 404
+    return jsonify({
+        'code': 200,
+        'data': JOURNAL.stats()
+    })
+
+# 恢复快照并重放之后的变更日志：{snapshot, position}，position 省略时重放到末尾
+@app.route('/api/journal/replay', methods=['POST'])
+def handle_journal_replay():
+    data = request.json or {}
+    try:
+        stats = task_manager.replay_journal(data.get('snapshot') or Config.FROZEN_SNAPSHOT_NAME,
+                                            data.get('position'))
+    except KeyError:
+        return jsonify({
+            'code': 404,
+            'message': f"Snapshot {data.get('snapshot')} not found"
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({
+            'code': 500,
+            'message': str(e)
+        }), 500
+    return jsonify({
+        'code': 200,
+        'data': stats
+    })
+
+# 列出磁盘上的快照
+@app.route('/api/snapshots', methods=['GET'])
+def handle_snapshots():
+    return jsonify({
+        'code': 200,
+        'data': task_manager.store.list()
+    })
+
+# 把当前图保存为命名快照，同名快照被替换；measure_json 为真时另外返回按 JSON 序列化的大小
+@app.route('/api/snapshots', methods=['POST'])
+def handle_create_snapshot():
+    data = request.json or {}
+    try:
+        stats = task_manager.save_snapshot(data.get('name'), bool(data.get('measure_json')))
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        }), 400
+    return jsonify({
+        'code': 200,
+        'data': stats
+    })
+
+# 用命名快照替换当前图
+@app.route('/api/snapshots/<name>/restore', methods=['POST'])
+def handle_restore_snapshot(name):
+    try:
+        stats = task_manager.restore_snapshot(name)
+    except KeyError:
+        return jsonify({
+            'code': 404,
+            'message': f'Snapshot {name} not found'
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({
+            'code': 500,
+            'message': str(e)
+        }), 500
+    return jsonify({
+        'code': 200,
+        'data': stats
+    })
+
+@app.route('/api/snapshots/<name>', methods=['DELETE'])
+def handle_delete_snapshot(name):
+    try:
+        deleted = task_manager.delete_snapshot(name)
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        }), 400
+    if not deleted:
+        return jsonify({
+            'code': 404,
+            'message': f'Snapshot {name} not found'
+        }), 404
+    return jsonify({
+        'code': 200,
+        'message': 'Snapshot deleted successfully'
+    })
 
 @app.route('/api/freeze', methods=['POST'])
 def handle_freeze():
     try:
-        task_manager.freeze_graph()
+        stats = task_manager.freeze_graph()
         return jsonify({
             'code': 200,
-            'message': 'Graph frozen successfully'
+            'message': 'Graph frozen successfully',
+            'data': stats
         })
     except Exception as e:
         return jsonify({
@@ -303,10 +801,11 @@ def handle_freeze():
 @app.route('/api/reset', methods=['POST'])
 def handle_reset():
     try:
-        task_manager.reset_graph()
+        stats = task_manager.reset_graph()
         return jsonify({
             'code': 200,
-            'message': 'Graph reset successfully'
+            'message': 'Graph reset successfully',
+            'data': stats
         })
     except Exception as e:
         traceback.print_exc()
@@ -0,0 +1,175 @@
+"""WebSocket 广播：把事件总线上的图变更事件按时间窗口合并为 graph_delta 帧"""
+import threading
+from collections import OrderedDict
+
+
+def _merge_update(base, update, created):
+    """把部分更新合并到之前的事件数据上，created 为 True 时 base 是完整的创建事件"""
+    merged = dict(base)
+    properties = dict(base.get('properties', {}))
+    removed = [] if created else list(base.get('removed_properties', []))
+    for key, value in update.items():
+        if key not in ('properties', 'removed_properties'):
+            merged[key] = value
+    for key, value in update.get('properties', {}).items():
+        properties[key] = value
+        if key in removed:
+            removed.remove(key)
+    for key in update.get('removed_properties', []):
+        properties.pop(key, None)
+        if not created and key not in removed:
+            removed.append(key)
+    if properties or 'properties' in base:
+        merged['properties'] = properties
+    if removed:
+        merged['removed_properties'] = removed
+    else:
+        merged.pop('removed_properties', None)
+    return merged
+
+
+class EventAggregator:
+    """按时间窗口缓冲图变更事件，合并后作为一个 graph_delta 帧发出
+
+    同一对象在窗口内的多个事件只保留最终状态：创建后修改合并为创建，创建后删除不发出，
+    多次修改合并为一次，修改后删除只保留删除。window 为 0 时每个事件（或批量事件）立即发出。
+    帧按取出缓冲区的顺序发出，graph_reset 之后的帧不会先于包含 graph_reset 的帧发出；
+    不是节点、关系增删改的事件不合并也不发出，计入 stats 的 ignored。
+
+    Args:
+        emit (callable): emit(frame)，frame 包含 events 列表以及 batches（合并的发布次数）、
+            received（收到的事件数）、dropped（被合并掉的事件数）
+        window (float): 缓冲窗口秒数
+    """
+
+    # 事件按此顺序发出，保证客户端先有节点再有关系、先删除关系再删除节点
+    ORDER = [
+        ('node', 'created'), ('node', 'updated'),
+        ('relationship', 'created'), ('relationship', 'updated'),
+        ('relationship', 'deleted'), ('node', 'deleted'),
+    ]
+
+    def __init__(self, emit, window):
+        self._emit = emit
+        self.window = window
+        self._lock = threading.Lock()
+        # 从取出缓冲区到发出帧的整个过程持有，保证帧按取出的顺序发出；emit 中发布的事件可能重入
+        self._emit_lock = threading.RLock()
+        self._timer = None
+        self._reset_buffer()
+        self.stats = {'frames': 0, 'batches': 0, 'received': 0, 'emitted': 0, 'dropped': 0, 'ignored': 0}
+
+    def _reset_buffer(self):
+        # (类别, ID) -> [状态, 数据, 是否先删除了同ID的旧对象]
+        self._changes = OrderedDict()
+        self._graph_reset = None
+        self._batches = 0
+        self._received = 0
+
+    def __call__(self, event, data):
+        """作为 EVENTS 的订阅者接收事件"""
+        items = data['events'] if event == 'graph_batch' else [{'event': event, 'data': data}]
+        if self.window <= 0:
+            with self._emit_lock:
+                with self._lock:
+                    self._buffer(event, data, items)
+                    frame = self._take()
+                if frame:
+                    self._emit(frame)
+            return
+        with self._lock:
+            self._buffer(event, data, items)
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _buffer(self, event, data, items):
+        """把一次发布的事件加入缓冲区，调用时持有 _lock"""
+        if event == 'graph_reset':
+            # 图已被整体重建，之前缓冲的事件都没有意义
+            received = self._received
+            self._reset_buffer()
+            self._graph_reset = data
+            self._batches, self._received = 1, received + 1
+            items = []
+        else:
+            self._batches += 1
+        for item in items:
+            self._add(item['event'], item['data'])
+
+    def _add(self, event, data):
+        kind, _, state = event.rpartition('_')
+        if kind not in ('node', 'relationship') or state not in ('created', 'updated', 'deleted') \
+                or 'id' not in data:
+            self.stats['ignored'] += 1
+            return
+        key = (kind, data['id'])
+        self._received += 1
+        previous = self._changes.get(key)
+        if previous is None:
+            self._changes[key] = [state, data, False]
+        elif previous[0] == 'created':
+            if state == 'deleted':
+                if previous[2]:
+                    self._changes[key] = ['deleted', data, False]
+                else:
+                    del self._changes[key]
+            elif state == 'updated':
+                previous[1] = _merge_update(previous[1], data, created=True)
+            else:
+                previous[1] = data
+        elif previous[0] == 'updated':
+            if state == 'updated':
+                previous[1] = _merge_update(previous[1], data, created=False)
+            else:
+                self._changes[key] = [state, data, state == 'created']
+        else:
+            # 已删除的ID被重新使用
+            if state == 'created':
+                self._changes[key] = ['created', data, True]
+            else:
+                self._changes[key] = [state, data, previous[2]]
+
+    def _take(self):
+        """取出缓冲区中的事件并生成帧，缓冲区为空时返回 None"""
+        changes, graph_reset = self._changes, self._graph_reset
+        batches, received = self._batches, self._received
+        self._reset_buffer()
+        self._timer = None
+        if not changes and graph_reset is None:
+            return None
+        events = [{'event': 'graph_reset', 'data': graph_reset}] if graph_reset is not None else []
+        # 被重新使用的ID先发出删除事件
+        events += [{'event': f'{kind}_deleted', 'data': {'id': item_id}}
+                  for (kind, item_id), change in changes.items()
+                  if change[2] and change[0] == 'created' and kind == 'relationship']
+        events += [{'event': f'{kind}_deleted', 'data': {'id': item_id}}
+                   for (kind, item_id), change in changes.items()
+                   if change[2] and change[0] == 'created' and kind == 'node']
+        for kind, state in self.ORDER:
+            events += [{'event': f'{kind}_{state}', 'data': change[1]}
+                       for (change_kind, _), change in changes.items()
+                       if change_kind == kind and change[0] == state]
+        frame = {
+            'events': events,
+            'batches': batches,
+            'received': received,
+            'dropped': max(received - len(events), 0)
+        }
+        self.stats['frames'] += 1
+        self.stats['batches'] += batches
+        self.stats['received'] += received
+        self.stats['emitted'] += len(events)
+        self.stats['dropped'] += frame['dropped']
+        return frame
+
+    def flush(self):
+        """立即发出缓冲的事件"""
+        with self._emit_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                frame = self._take()
+            if frame:
+                self._emit(frame)
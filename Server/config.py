@@ -5,3 +5,92 @@ class Config:
     NEO4J_USER = os.getenv('NEO4J_USER', 'neo4j')
     NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'AGCF3xJumbfJD-b')
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key')
+
+    # Neo4j 驱动连接池配置
+    NEO4J_MAX_CONNECTION_POOL_SIZE = int(os.getenv('NEO4J_MAX_CONNECTION_POOL_SIZE', '100'))
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.getenv('NEO4J_CONNECTION_ACQUISITION_TIMEOUT', '60'))
+    NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv('NEO4J_MAX_CONNECTION_LIFETIME', '3600'))
+    NEO4J_FETCH_SIZE = int(os.getenv('NEO4J_FETCH_SIZE', '1000'))
+
+    # Node/Link 身份映射缓存配置，CACHE_TTL 为 0 表示不过期
+    NODE_CACHE_SIZE = int(os.getenv('NODE_CACHE_SIZE', '10000'))
+    LINK_CACHE_SIZE = int(os.getenv('LINK_CACHE_SIZE', '10000'))
+    CACHE_TTL = float(os.getenv('CACHE_TTL', '0'))
+    CACHE_WARM_SIZE = int(os.getenv('CACHE_WARM_SIZE', '200'))
+
+    # 路径查询配置：最大跳数、最多返回的路径数、查询超时秒数，以及按图版本号缓存结果的数量和过期时间
+    PATH_MAX_DEPTH = int(os.getenv('PATH_MAX_DEPTH', '6'))
+    PATH_MAX_RESULTS = int(os.getenv('PATH_MAX_RESULTS', '10'))
+    PATH_QUERY_TIMEOUT = float(os.getenv('PATH_QUERY_TIMEOUT', '5'))
+    PATH_CACHE_SIZE = int(os.getenv('PATH_CACHE_SIZE', '1000'))
+    PATH_CACHE_TTL = float(os.getenv('PATH_CACHE_TTL', '30'))
+
+    # 附近节点查询逐层扩展时，每一层最多保留的节点数量
+    NEARBY_FRONTIER_LIMIT = int(os.getenv('NEARBY_FRONTIER_LIMIT', '1000'))
+
+    # 列表接口分页配置：默认每页数量和单页最大数量
+    API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '500'))
+    API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '5000'))
+
+    # 子图接口配置：最大扩展跳数、默认和最大节点数量、未指定种子节点时选取的种子数量
+    SUBGRAPH_MAX_DEPTH = int(os.getenv('SUBGRAPH_MAX_DEPTH', '3'))
+    SUBGRAPH_DEFAULT_LIMIT = int(os.getenv('SUBGRAPH_DEFAULT_LIMIT', '200'))
+    SUBGRAPH_MAX_LIMIT = int(os.getenv('SUBGRAPH_MAX_LIMIT', '2000'))
+    SUBGRAPH_SEED_LIMIT = int(os.getenv('SUBGRAPH_SEED_LIMIT', '10'))
+
+    # 检测应用之外修改的间隔秒数：有变化后为最小间隔，空闲时逐次加倍到最大间隔；
+    # 指纹按ID区间分块读取，每块的ID数量；两次检测之间记录的应用内写入ID超过 CHANGE_TOUCHED_LIMIT 时
+    # 不再逐个记录，下一次检测重新建立指纹表
+    CHANGE_POLL_MIN_INTERVAL = float(os.getenv('CHANGE_POLL_MIN_INTERVAL', '1'))
+    CHANGE_POLL_MAX_INTERVAL = float(os.getenv('CHANGE_POLL_MAX_INTERVAL', '30'))
+    CHANGE_TOUCHED_LIMIT = int(os.getenv('CHANGE_TOUCHED_LIMIT', '100000'))
+    FINGERPRINT_CHUNK_SIZE = int(os.getenv('FINGERPRINT_CHUNK_SIZE', '10000'))
+
+    # WebSocket 广播配置：合并事件的时间窗口毫秒数（0 表示不合并），是否输出每一帧的 Socket.IO 日志
+    SOCKET_BATCH_WINDOW_MS = float(os.getenv('SOCKET_BATCH_WINDOW_MS', '50'))
+    SOCKET_LOGGER = os.getenv('SOCKET_LOGGER', 'false').lower() in ('1', 'true', 'yes')
+
+    # 冻结/重置图时每个事务删除或重建的节点、关系数量
+    RESET_CHUNK_SIZE = int(os.getenv('RESET_CHUNK_SIZE', '5000'))
+    # 重置时只恢复与快照不同的部分，差异超过该数量时改为整体重建
+    RESET_DIFF_MAX_CHANGES = int(os.getenv('RESET_DIFF_MAX_CHANGES', '50000'))
+
+    # 图快照的保存目录，以及 /api/freeze 和 /api/reset 使用的快照名称
+    SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR',
+                             os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots'))
+    FROZEN_SNAPSHOT_NAME = os.getenv('FROZEN_SNAPSHOT_NAME', 'frozen')
+
+    # 图变更日志配置：是否启用、保存目录、单个分段的最大字节数、后台 fsync 间隔秒数，以及重放时每个事务的记录数量
+    JOURNAL_ENABLED = os.getenv('JOURNAL_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    JOURNAL_DIR = os.getenv('JOURNAL_DIR',
+                            os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'journal'))
+    JOURNAL_SEGMENT_BYTES = int(os.getenv('JOURNAL_SEGMENT_BYTES', str(64 * 1024 * 1024)))
+    JOURNAL_FSYNC_INTERVAL = float(os.getenv('JOURNAL_FSYNC_INTERVAL', '1'))
+    JOURNAL_REPLAY_BATCH_SIZE = int(os.getenv('JOURNAL_REPLAY_BATCH_SIZE', '1000'))
+
+    # 随机抽样的节点ID表：重新全量加载的间隔秒数（0 表示只通过事件增量维护），加载时每页的ID数量
+    SAMPLER_REFRESH_INTERVAL = float(os.getenv('SAMPLER_REFRESH_INTERVAL', '300'))
+    SAMPLER_PAGE_SIZE = int(os.getenv('SAMPLER_PAGE_SIZE', '50000'))
+
+    # 节点度数索引：重新全量加载的间隔秒数（0 表示只通过事件增量维护），加载时每页的节点数量
+    DEGREE_REFRESH_INTERVAL = float(os.getenv('DEGREE_REFRESH_INTERVAL', '300'))
+    DEGREE_PAGE_SIZE = int(os.getenv('DEGREE_PAGE_SIZE', '50000'))
+
+    # 图拓扑的内存镜像：是否启用；版本号落后超过 MIRROR_MAX_STALE 秒时在后台重新加载，
+    # 加载超过 MIRROR_MAX_AGE 秒后重新加载一次（0 表示不定期重新加载）；增量超过 MIRROR_COMPACT_THRESHOLD 时合并进数组
+    MIRROR_ENABLED = os.getenv('MIRROR_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    MIRROR_MAX_STALE = float(os.getenv('MIRROR_MAX_STALE', '5'))
+    MIRROR_MAX_AGE = float(os.getenv('MIRROR_MAX_AGE', '600'))
+    MIRROR_COMPACT_THRESHOLD = int(os.getenv('MIRROR_COMPACT_THRESHOLD', '10000'))
+
+    # 全图分析：邻接矩阵的最长使用秒数（0 表示只在图版本号变化时重新导出），介数中心性近似默认抽取的源点数量
+    ANALYTICS_CACHE_TTL = float(os.getenv('ANALYTICS_CACHE_TTL', '60'))
+    ANALYTICS_BETWEENNESS_SAMPLES = int(os.getenv('ANALYTICS_BETWEENNESS_SAMPLES', '64'))
+
+    # 重复节点检测：最小 Jaccard 相似度、MinHash 签名长度、LSH 分段数量、name 的 n-gram 长度，
+    # 以及同一个桶中两两比较的最多节点数量（超过时只比较相邻节点）
+    DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', '0.6'))
+    DEDUP_NUM_PERM = int(os.getenv('DEDUP_NUM_PERM', '64'))
+    DEDUP_BANDS = int(os.getenv('DEDUP_BANDS', '16'))
+    DEDUP_NGRAM = int(os.getenv('DEDUP_NGRAM', '2'))
+    DEDUP_MAX_BUCKET = int(os.getenv('DEDUP_MAX_BUCKET', '50'))
@@ -3,22 +3,71 @@ export default class ApiClient {
         this.baseUrl = baseUrl;
     }
 
-    async getNodes() {
-        const response = await fetch(`${this.baseUrl}/nodes`);
+    // 获取一页数据，返回 { data, next_cursor }，next_cursor 为 null 时没有下一页
+    async getPage(resource, cursor = null, limit = 500) {
+        const params = new URLSearchParams({ limit });
+        if (cursor !== null) {
+            params.set('cursor', cursor);
+        }
+        const response = await fetch(`${this.baseUrl}/${resource}?${params}`);
         const result = await response.json();
         if (result.code === 200) {
-            return result.data;
+            return { data: result.data, next_cursor: result.next_cursor };
+        }
+        throw new Error(`Failed to get ${resource}`);
+    }
+
+    // 逐页遍历，每次产出一页数据
+    async *iterPages(resource, limit = 500) {
+        let cursor = null;
+        do {
+            const page = await this.getPage(resource, cursor, limit);
+            yield page.data;
+            cursor = page.next_cursor;
+        } while (cursor !== null && cursor !== undefined);
+    }
+
+    async getNodes() {
+        const nodes = [];
+        for await (const page of this.iterPages('nodes')) {
+            nodes.push(...page);
         }
-        throw new Error('Failed to get nodes');
+        return nodes;
     }
 
+    // 关系只包含 start_node_id 和 end_node_id
     async getRelationships() {
-        const response = await fetch(`${this.baseUrl}/relationships`);
+        const relationships = [];
+        for await (const page of this.iterPages('relationships')) {
+            relationships.push(...page);
+        }
+        return relationships;
+    }
+
+    // 获取种子节点周围的子图，seeds 为节点ID数组，q 为搜索词，都不提供时以连接数最多的节点为种子
+    async getSubgraph({ seeds = [], q = null, depth = 1, limit = null, labels = [], types = [] } = {}) {
+        const params = new URLSearchParams({ depth });
+        if (seeds.length > 0) {
+            params.set('seeds', seeds.join(','));
+        }
+        if (q) {
+            params.set('q', q);
+        }
+        if (limit !== null) {
+            params.set('limit', limit);
+        }
+        if (labels.length > 0) {
+            params.set('labels', labels.join(','));
+        }
+        if (types.length > 0) {
+            params.set('types', types.join(','));
+        }
+        const response = await fetch(`${this.baseUrl}/subgraph?${params}`);
         const result = await response.json();
         if (result.code === 200) {
             return result.data;
         }
-        throw new Error('Failed to get relationships');
+        throw new Error('Failed to get subgraph');
     }
 
     async createNode(labels, properties) {
@@ -106,6 +155,22 @@ export default class ApiClient {
         throw new Error('Failed to update relationship');
     }
 
+    // 在一个事务中执行一组操作，创建操作的 ref 可在后续操作中代替ID使用
+    async batch(operations) {
+        const response = await fetch(`${this.baseUrl}/batch`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ operations })
+        });
+        const result = await response.json();
+        if (result.code === 200) {
+            return result.data;
+        }
+        throw new Error(result.message || 'Failed to execute batch');
+    }
+
     async freezeGraph() {
         const response = await fetch(`${this.baseUrl}/freeze`, {
             method: 'POST'
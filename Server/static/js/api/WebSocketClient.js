@@ -3,13 +3,18 @@ export default class WebSocketClient {
         this.url = url;
         this.socket = null;
         this.connected = false;
+        // 当前订阅的节点ID和标签，为 null 时接收全部事件
+        this.subscription = null;
+        // 当前视口内可见的节点ID，为 null 时没有视口订阅
+        this.viewport = null;
         this.callbacks = {
             onNodeUpdate: [],
             onNodeCreate: [],
             onNodeDelete: [],
             onRelationshipUpdate: [],
             onRelationshipCreate: [],
-            onRelationshipDelete: []
+            onRelationshipDelete: [],
+            onGraphReset: []
         };
     }
 
@@ -28,6 +33,13 @@ export default class WebSocketClient {
             this.socket.on('connect', () => {
                 console.log('Socket.IO connection established');
                 this.connected = true;
+                // 重新连接后服务端没有订阅信息，重新发送完整订阅
+                if (this.subscription) {
+                    this.socket.emit('subscribe', { ...this.subscription, mode: 'replace' });
+                }
+                if (this.viewport) {
+                    this.socket.emit('viewport', { node_ids: this.viewport });
+                }
             });
 
             this.socket.on('disconnect', () => {
@@ -67,11 +79,57 @@ export default class WebSocketClient {
             case 'relationship_deleted':
                 this.callbacks.onRelationshipDelete.forEach(cb => cb(data));
                 break;
+            case 'graph_reset':
+                this.callbacks.onGraphReset.forEach(cb => cb(data));
+                break;
+            case 'graph_batch':
+            case 'graph_delta':
+                // 批量操作或广播窗口内合并后的事件，按服务端给出的顺序逐个处理
+                data.events.forEach(item => this.handleMessage(item));
+                break;
             default:
                 console.warn('Unknown WebSocket event:', event);
         }
     }
 
+    // 只接收与这些节点ID或标签相关的事件；mode 为 replace、add 或 remove
+    subscribe({ nodeIds = [], labels = [], mode = 'replace' } = {}) {
+        const current = this.subscription || { node_ids: [], labels: [] };
+        if (mode === 'replace') {
+            this.subscription = { node_ids: [...nodeIds], labels: [...labels] };
+        } else if (mode === 'add') {
+            this.subscription = {
+                node_ids: [...new Set([...current.node_ids, ...nodeIds])],
+                labels: [...new Set([...current.labels, ...labels])]
+            };
+        } else {
+            this.subscription = {
+                node_ids: current.node_ids.filter(id => !nodeIds.includes(id)),
+                labels: current.labels.filter(label => !labels.includes(label))
+            };
+        }
+        if (this.connected) {
+            this.socket.emit('subscribe', { node_ids: nodeIds, labels, mode });
+        }
+    }
+
+    // 平移或缩放画布后更新视口订阅，替换上一次发送的可见节点ID
+    setViewport(nodeIds) {
+        this.viewport = [...nodeIds];
+        if (this.connected) {
+            this.socket.emit('viewport', { node_ids: this.viewport });
+        }
+    }
+
+    // 取消订阅，恢复接收全部事件
+    subscribeAll() {
+        this.subscription = null;
+        this.viewport = null;
+        if (this.connected) {
+            this.socket.emit('subscribe', { all: true });
+        }
+    }
+
     on(event, callback) {
         if (this.callbacks[event]) {
             this.callbacks[event].push(callback);
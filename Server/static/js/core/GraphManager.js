@@ -6,6 +6,8 @@ export default class GraphManager {
         this.graph = null;
         this.canvas = null;
         this.nodeManager = nodeManager
+        // 已显示在画布上的关系ID，扩展子图时避免重复连接
+        this.linkIds = new Set();
         
         this.initialize();
 
@@ -39,6 +41,7 @@ export default class GraphManager {
         
         await this.loadGraphData();
         this.setupGraphEventHandlers();
+        this.setupViewportSubscription();
         
 
         
@@ -101,6 +104,7 @@ export default class GraphManager {
                             input_info
                         );
                         link_info.id = res_link.id
+                        application.linkIds.add(res_link.id)
                         startNode.addOutput("","")
                         endNode.addInput("","")
                     }
@@ -135,16 +139,22 @@ export default class GraphManager {
             this.apiClient = this.graphManager.apiClient;
         };
 
-        KnowledgeGraphNode.prototype.getMenuOptions = (canvas) => {
+        KnowledgeGraphNode.prototype.getMenuOptions = function(canvas) {
             // 添加右键菜单选项
         
             const options = [];
 
+            // 加载当前节点周围一跳内尚未显示的节点
+            options.push({
+                content: "Expand",
+                callback: () => application.expandNodes([this.id])
+            });
+
             // 添加Ask选项（仅在选中节点时显示）
             if (canvas.selected_nodes && Object.entries(canvas.selected_nodes).length > 0) {
                 options.push({
                     content: "Ask",
-                    callback: () => this.uiManager.showAskPanel()
+                    callback: () => application.uiManager.showAskPanel()
                 });
             }
 
@@ -158,6 +168,11 @@ export default class GraphManager {
         this.canvas.getExtraMenuOptions = (canvas, options) => {
             // 如果没有选中节点，显示空白处菜单
                 const extra = []
+                extra.push({
+                    content: "Search & Load",
+                    callback: () => this.searchAndLoad()
+                });
+
                 extra.push({
                     content: "Freeze Graph",
                     callback: () => this.freezeGraph()
@@ -208,36 +223,105 @@ export default class GraphManager {
         
     }
 
+    // 平移或缩放画布停止后，把视口内可见的节点ID发给服务端作为视口订阅
+    setupViewportSubscription() {
+        let timer = null;
+        this.canvas.ds.onredraw = () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => {
+                if (this.wsClient) {
+                    const visibleNodes = this.canvas.computeVisibleNodes(null, []);
+                    this.wsClient.setViewport(visibleNodes.map(node => node.id));
+                }
+            }, 300);
+        };
+    }
+
     setupWebSocketListeners() {
         this.wsClient.connect();
     
-        this.wsClient.on('node_created', (nodeData) => {
+        this.wsClient.on('onNodeCreate', (nodeData) => {
             this.nodeManager.handleNodeCreated(nodeData);
         });
     
-        this.wsClient.on('node_updated', (nodeData) => {
+        this.wsClient.on('onNodeUpdate', (nodeData) => {
             this.nodeManager.handleNodeUpdated(nodeData);
         });
     
-        this.wsClient.on('node_deleted', (nodeData) => {
+        this.wsClient.on('onNodeDelete', (nodeData) => {
             this.nodeManager.handleNodeDeleted(nodeData);
         });
+
+        // 图被整体重建后重新加载画布
+        this.wsClient.on('onGraphReset', async () => {
+            this.graph.clear();
+            await this.loadGraphData();
+        });
     }
 
     async loadGraphData() {
-        // 加载节点数据
-        this.nodeManager.listen_change = false
-        await this.nodeManager.loadInitialData();
-        
-        // 加载关系数据并创建连接
-        const relationships = await this.apiClient.getRelationships();
-        for (const [idx,rel] of relationships.entries()) {
-            const startNode = this.nodeManager.nodeMap.get(rel.start_node.id);
-            const endNode = this.nodeManager.nodeMap.get(rel.end_node.id);
+        // 只加载初始子图（默认以连接数最多的节点为种子），其余部分按需展开
+        this.nodeManager.nodeMap.clear();
+        this.linkIds.clear();
+        const subgraph = await this.apiClient.getSubgraph();
+        this.addSubgraph(subgraph, 'replace');
+    }
+
+    // 展开节点周围的子图
+    async expandNodes(nodeIds, depth = 1) {
+        try {
+            const subgraph = await this.apiClient.getSubgraph({ seeds: nodeIds, depth });
+            this.addSubgraph(subgraph);
+        } catch (error) {
+            console.error('Failed to expand nodes:', error);
+        }
+    }
+
+    // 搜索节点并加载其周围的子图
+    async searchAndLoad() {
+        const q = prompt("Search nodes by name:");
+        if (!q) {
+            return;
+        }
+        try {
+            const subgraph = await this.apiClient.getSubgraph({ q });
+            this.addSubgraph(subgraph);
+        } catch (error) {
+            console.error('Failed to load subgraph:', error);
+        }
+    }
+
+    // 把子图中尚未显示的节点和关系加入画布，加入期间不触发写回接口，
+    // 并订阅这些节点的实时事件（mode 为 replace 时替换原有订阅）
+    addSubgraph(subgraph, mode = 'add') {
+        const listenChange = this.nodeManager.listen_change;
+        this.nodeManager.listen_change = false;
+        try {
+            this.nodeManager.addNodes(subgraph.nodes);
+            this.addRelationships(subgraph.relationships);
+        } finally {
+            this.nodeManager.listen_change = listenChange;
+        }
+        if (this.wsClient) {
+            this.wsClient.subscribe({ nodeIds: subgraph.nodes.map(node => node.id), mode });
+        }
+        if (subgraph.truncated) {
+            console.warn('Subgraph truncated, expand nodes to load more');
+        }
+    }
+
+    addRelationships(relationships) {
+        for (const rel of relationships) {
+            if (this.linkIds.has(rel.id)) {
+                continue;
+            }
+            const startNode = this.nodeManager.nodeMap.get(rel.start_node_id);
+            const endNode = this.nodeManager.nodeMap.get(rel.end_node_id);
             
             if (startNode && endNode) {
                 // 创建图形连接
                 const link = startNode.connect(startNode.outputs.length - 1, endNode, endNode.inputs.length - 1, rel.id);
+                this.linkIds.add(rel.id);
                 // 添加连接标签
                 if (rel.type) {
                     link._label = rel.type;
@@ -259,7 +343,6 @@ export default class GraphManager {
                 endNode.setDirtyCanvas(true, true);
             }
         }
-        this.nodeManager.listen_change = true
     }
 
     setupEventListeners() {
@@ -6,21 +6,41 @@ export default class NodeManager {
         this.nodeMap = new Map();
         this.app = app;
         this.listen_change = true;
+        // 同一轮事件循环中产生的删除操作合并为一次批量请求
+        this.pendingOperations = [];
+        this.flushScheduled = false;
     }
 
-    async loadInitialData() {
-        try {
-            const nodes = await this.apiClient.getNodes();
-            nodes.forEach(node => {
-                const lgNode = this.createKnowledgeGraphNode(node);
-                this.nodeMap.set(node.id, lgNode);
-                if (this.graph) {
-                    this.graph.add(lgNode);
-                }
-            });
-        } catch (error) {
-            console.error('Failed to load initial data:', error);
+    queueOperation(operation) {
+        this.pendingOperations.push(operation);
+        if (!this.flushScheduled) {
+            this.flushScheduled = true;
+            setTimeout(() => this.flushOperations(), 0);
+        }
+    }
+
+    flushOperations() {
+        const operations = this.pendingOperations;
+        this.pendingOperations = [];
+        this.flushScheduled = false;
+        if (operations.length === 0) {
+            return Promise.resolve(null);
         }
+        return this.apiClient.batch(operations).catch(console.error);
+    }
+
+    // 把尚未显示的节点加入画布，已显示的节点保持不变
+    addNodes(nodes) {
+        nodes.forEach(node => {
+            if (this.nodeMap.has(node.id)) {
+                return;
+            }
+            const lgNode = this.createKnowledgeGraphNode(node);
+            this.nodeMap.set(node.id, lgNode);
+            if (this.graph) {
+                this.graph.add(lgNode);
+            }
+        });
     }
 
     createKnowledgeGraphNode(nodeData) {
@@ -112,7 +132,7 @@ export default class NodeManager {
     }
 
     handleNodeCreated(nodeData) {
-        if (this.listen_change) {
+        if (this.listen_change && !this.nodeMap.has(nodeData.id)) {
             const lgNode = this.createKnowledgeGraphNode(nodeData);
             this.nodeMap.set(nodeData.id, lgNode);
             if (this.graph) {
@@ -123,11 +143,17 @@ export default class NodeManager {
 
     handleNodeUpdated(nodeData) {
         if (this.listen_change) {
+            // 事件只包含变化的字段，与现有内容合并
             const lgNode = this.nodeMap.get(nodeData.id);
             if (lgNode) {
-                lgNode.properties = nodeData.properties;
-                lgNode.title = nodeData.labels.join(', ');
-                lgNode.setDirtyCanvas(true, true);
+                const properties = { ...lgNode.properties, ...(nodeData.properties || {}) };
+                (nodeData.removed_properties || []).forEach(key => delete properties[key]);
+                lgNode.properties = properties;
+                if (nodeData.labels) {
+                    lgNode.labels = nodeData.labels;
+                    lgNode.title = nodeData.labels.join(', ');
+                }
+                lgNode.refreshControls();
             }
         }
     }
@@ -165,8 +191,7 @@ export default class NodeManager {
         if (this.listen_change) {
             const nodeId = node.id
             if (nodeId) {
-                this.apiClient.deleteNode(nodeId)
-                    .catch(console.error);
+                this.queueOperation({ op: 'delete_node', id: nodeId });
             }
         }
     }
@@ -231,8 +256,7 @@ export default class NodeManager {
             } else if (!isConnected && type === LiteGraph.OUTPUT) {
                 // 删除连接
                 if (link_info.id) {
-                    this.apiClient.deleteRelationship(link_info.id)
-                        .catch(console.error);
+                    this.queueOperation({ op: 'delete_relationship', id: link_info.id });
                 } else {
                     console.warn('No relationship ID found for connection removal');
                 }
@@ -6,7 +6,7 @@ from langchain.tools import BaseTool, tool
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 import httpx
-from database.Neo4jDataProcessor import Node, Link
+from database.Neo4jDataProcessor import Node, Link, Graph, format_path
 
 class EAgent:
     def __init__(self):
@@ -27,11 +27,16 @@ class EAgent:
 - get_node(node_id: int): 获取节点信息
 - get_nearby_nodes(node_id: int, max_depth: int = 2): 获取附近节点
 - get_link(relationship_id: int): 获取关系信息
-- find_path(start_node_id: int, end_node_id: int): 查找节点间路径,查找时请注意关系的单向性
+- find_path(start_node_id: int, end_node_id: int, k: int = 1, max_depth: int = 4, direction: str = "out"): 查找节点间最短的 k 条路径，direction 为 out 时沿关系方向查找，为 both 时忽略方向
 - get_random_nodes(count: int = 5): 获取随机节点
 - get_random_nearby_nodes(node_id: int, count: int = 3, max_depth: int = 2): 获取随机附近节点
 - search_nodes(name: str, limit: int = 3): 模糊搜索指定name的节点
-- get_isolated_nodes(): 获取所有孤立节点
+- get_isolated_nodes(limit: int = 20): 获取孤立节点总数和其中 limit 个节点
+- get_hub_nodes(limit: int = 5): 获取连接数最多的节点
+- analyze_components(kind: str = "weak", limit: int = 5): 统计全图的连通分量（weak 忽略方向，strong 沿关系方向），用于发现互不相连的区域
+- check_reachability(node_ids: list): 一次检查多个节点是否处于同一个弱连通分量（忽略方向时是否互相可达）
+- get_central_nodes(metric: str = "pagerank", limit: int = 5): 按 pagerank、degree 或 betweenness 获取最重要的节点
+- find_duplicate_nodes(limit: int = 10): 在全图中查找名称和属性近似重复的节点簇
 
 请根据以下几个方面进行评估：
 1. 数据完整性：检查节点和关系的属性是否完整
@@ -97,8 +102,8 @@ class EAgent:
                 return f"评估关系时发生错误：{str(e)}"
 
         @tool("find_path")
-        def find_path(start_node_id: int, end_node_id: int) -> str:
-            """查找两个节点之间的路径"""
+        def find_path(start_node_id: int, end_node_id: int, k: int = 1, max_depth: int = 4, direction: str = "out") -> str:
+            """查找两个节点之间最短的 k 条路径"""
             try:
                 start_node = Node.from_id(start_node_id)
                 end_node = Node.from_id(end_node_id)
@@ -106,11 +111,13 @@ class EAgent:
                 if not start_node or not end_node:
                     return f"评估发现：起始节点({start_node_id})或目标节点({end_node_id})不存在"
                     
-                result = start_node.to(end_node)
+                result = start_node.to(end_node, k=k, max_depth=max_depth, direction=direction)
                 if not result:
-                    return f"评估发现：节点 {start_node_id} 到节点 {end_node_id} 之间没有可达路径"
+                    return f"评估发现：节点 {start_node_id} 到节点 {end_node_id} 之间在 {max_depth} 跳内没有可达路径"
                     
-                return "路径信息：" + str(result)
+                return "路径信息：" + "；".join(format_path(path) for path in result)
+            except TimeoutError:
+                return "评估路径超时，请减小 max_depth 后重试"
             except Exception as e:
                 return f"评估路径时发生错误：{str(e)}"
 
@@ -164,17 +171,81 @@ class EAgent:
                 return f"评估搜索时发生错误：{str(e)}"
 
         @tool("get_isolated_nodes")
-        def get_isolated_nodes() -> str:
-            """获取所有孤立节点"""
+        def get_isolated_nodes(limit: int = 20) -> str:
+            """获取孤立节点总数和其中 limit 个节点"""
             try:
-                nodes = Node.get_isolated_nodes()
+                nodes = Node.get_isolated_nodes(limit)
                 if not nodes:
                     return "评估发现：数据库中没有孤立节点，这是一个好现象"
-                
-                return f"评估发现 {len(nodes)} 个孤立节点：" + str([n.__str__() for n in nodes])
+
+                total = Node.count_isolated_nodes()
+                return (f"评估发现 {total} 个孤立节点，其中 {len(nodes)} 个："
+                        + str([n.__str__() for n in nodes]))
             except Exception as e:
                 return f"评估孤立节点时发生错误：{str(e)}"
 
+        @tool("get_hub_nodes")
+        def get_hub_nodes(limit: int = 5) -> str:
+            """获取连接数最多的节点"""
+            try:
+                ranked = Node.get_hub_nodes(limit)
+                if not ranked:
+                    return "评估发现：数据库中没有节点"
+
+                return "连接数最多的节点：" + str([f"{node.__str__()} 度数:{degree}" for node, degree in ranked])
+            except Exception as e:
+                return f"评估连接数最多的节点时发生错误：{str(e)}"
+
+        @tool("analyze_components")
+        def analyze_components(kind: str = "weak", limit: int = 5) -> str:
+            """统计全图的连通分量，kind 为 weak 时忽略关系方向，为 strong 时沿关系方向"""
+            try:
+                result = Graph.analyze_components(kind, limit)
+                largest = "；".join(f"大小 {component['size']}，节点示例 {component['node_ids']}"
+                                   for component in result['largest'])
+                return (f"评估发现图中共有 {result['count']} 个{'弱' if kind == 'weak' else '强'}连通分量"
+                        f"（{result['nodes']} 个节点）。最大的分量：{largest}。"
+                        f"分量大小分布 [大小, 数量]：{result['distribution']}")
+            except Exception as e:
+                return f"评估连通分量时发生错误：{str(e)}"
+
+        @tool("check_reachability")
+        def check_reachability(node_ids: list) -> str:
+            """检查多个节点是否处于同一个弱连通分量"""
+            try:
+                result = Graph.check_reachability([int(node_id) for node_id in node_ids])
+                message = f"节点按连通分量分组为：{result['groups']}，同组节点之间（忽略方向）互相可达"
+                if result['missing']:
+                    message += f"；节点 {result['missing']} 不存在"
+                return message
+            except Exception as e:
+                return f"评估可达性时发生错误：{str(e)}"
+
+        @tool("get_central_nodes")
+        def get_central_nodes(metric: str = "pagerank", limit: int = 5) -> str:
+            """按 pagerank、degree 或 betweenness 获取最重要的节点"""
+            try:
+                ranked, _ = Graph.rank_nodes(metric, limit)
+                if not ranked:
+                    return "评估发现：数据库中没有节点"
+                return f"按 {metric} 排序的重要节点：" + str([f"{node.__str__()} 分数:{score:.4g}"
+                                                          for node, score in ranked])
+            except Exception as e:
+                return f"评估重要节点时发生错误：{str(e)}"
+
+        @tool("find_duplicate_nodes")
+        def find_duplicate_nodes(limit: int = 10) -> str:
+            """在全图中查找名称和属性近似重复的节点簇"""
+            try:
+                result = Graph.find_duplicates(limit=limit)
+                if not result['clusters']:
+                    return "评估发现：没有疑似重复的节点"
+                clusters = "；".join(f"节点 {cluster['node_ids']}（名称 {cluster['names']}，相似度 {cluster['similarity']:.2f}）"
+                                    for cluster in result['clusters'])
+                return f"评估发现 {result['total_clusters']} 组疑似重复的节点，其中 {len(result['clusters'])} 组：{clusters}"
+            except Exception as e:
+                return f"评估重复节点时发生错误：{str(e)}"
+
         return [
             get_node,
             get_nearby_nodes,
@@ -183,7 +254,12 @@ class EAgent:
             get_random_nodes,
             get_random_nearby_nodes,
             search_nodes,
-            get_isolated_nodes
+            get_isolated_nodes,
+            get_hub_nodes,
+            analyze_components,
+            check_reachability,
+            get_central_nodes,
+            find_duplicate_nodes
         ]
 
     def evaluate(self, target):
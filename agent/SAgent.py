@@ -14,7 +14,7 @@ import httpx
 
 from openai import http_client
 
-from database.Neo4jDataProcessor import Node, Link
+from database.Neo4jDataProcessor import Node, Link, Graph, format_path
 
 os.environ['REQUESTS_CA_BUNDLE']=r"C:/Users/l60049658/Downloads/Huawei BPIT Root CA.cer"
 
@@ -34,20 +34,24 @@ prompt_template = PromptTemplate(
 - get_link(relationship_id: int): 获取关系信息
 - remove_node(node_id: int): 删除节点
 - update_node(node_id: int, properties: dict): 更新节点属性
-- find_path(start_node_id: int, end_node_id: int): 查找节点间路径,查找时请注意关系的单向性
+- find_path(start_node_id: int, end_node_id: int, k: int = 1, max_depth: int = 4, direction: str = "out"): 查找节点间最短的 k 条路径，direction 为 out 时沿关系方向查找，为 both 时忽略方向
 - connect_nodes(start_node_id: int, end_node_id: int, rel_type: str = "CONNECTS_TO", properties: dict = None): 连接两个节点
 - get_random_nodes(count: int = 5): 获取随机节点
 - get_random_nearby_nodes(node_id: int, count: int = 3, max_depth: int = 2): 获取随机附近节点
 - remove_link(relationship_id: int): 删除关系
 - update_link(relationship_id: int, properties: dict): 更新关系属性
 - search_nodes(name: str, limit: int = 3): 搜索符合条件的节点
-- get_isolated_nodes(): 获取孤立的节点（没有任何关系连接的节点）
+- get_isolated_nodes(limit: int = 5): 获取孤立的节点（没有任何关系连接的节点）及其总数
+- get_hub_nodes(limit: int = 5): 获取连接数最多的节点
+- find_duplicate_nodes(limit: int = 10): 在全图中查找名称和属性近似重复的节点簇
+- merge_nodes(node_ids: list, properties: str = "discard"): 把一组重复节点合并到第一个节点，关系自动改接到保留的节点，其余节点被删除
 
 在使用工具时，请确保提供所有必需的参数。例如，创建节点时必须同时提供 labels 和 properties 参数。
 请注意确保你建立的节点后要与其他节点建立联系，不能有孤立的节点，你要记住你想操作的节点的ID，然后在他们之间建立联系
 如果你不记得节点的ID或者节点ID提示不存在时，你可以用search_nodes模糊搜索指定name的节点
 在创建新节点前 请检查数据库中节点是否已经存在，你可以凭借记忆或者模糊搜索节点name中的部分主要关键字来检查
-如果在操作过程中出现重复的节点或关系，无意义的冗余的节点或关系，要融合或删除他们
+如果在操作过程中出现重复的节点或关系，无意义的冗余的节点或关系，要融合或删除他们；
+可以先用 find_duplicate_nodes 一次找出全部疑似重复的节点，确认确实重复后用 merge_nodes 一次完成合并，不需要手动删除和重新连接
 
 所有操作均需基于现有节点，优先寻找现有节点操作而不是新增节点，所以在任何操作之前必须get_random_nearby_nodes，所以在任何操作之前必须get_random_nearby_nodes，所以在任何操作之前必须get_random_nearby_nodes
 请根据目标，规划并执行必要的步骤。每一步都要说明你的思考过程。请注意在你返回的结果时说明对应的节点ID和关系ID供我们检索
@@ -126,15 +130,7 @@ def create_link(start_node_id: int, end_node_id: int, rel_type: str, properties:
         if properties is None:
             properties = {}
             
-        # 先检查节点是否存在
-        start_node = Node.from_id(start_node_id)
-        end_node = Node.from_id(end_node_id)
-        
-        if not start_node:
-            return f"起始节点（ID: {start_node_id}）不存在，无法创建关系"
-        if not end_node:
-            return f"目标节点（ID: {end_node_id}）不存在，无法创建关系"
-            
+        # 节点不存在时创建语句本身会报告是哪个节点不存在
         link = Link.from_nodes(start_node_id, end_node_id, rel_type, properties)
         if not link:
             return "关系创建失败，请检查参数是否正确"
@@ -167,6 +163,30 @@ def remove_node(node_id: int) -> str:
     except Exception as e:
         return f"删除节点时发生错误：{str(e)}"
 
+@tool("find_duplicate_nodes")
+def find_duplicate_nodes(limit: int = 10) -> str:
+    """在全图中查找名称和属性近似重复的节点簇"""
+    try:
+        result = Graph.find_duplicates(limit=limit)
+        if not result['clusters']:
+            return "没有发现疑似重复的节点"
+        clusters = "；".join(f"节点 {cluster['node_ids']}（名称 {cluster['names']}，相似度 {cluster['similarity']:.2f}）"
+                            for cluster in result['clusters'])
+        return (f"共发现 {result['total_clusters']} 组疑似重复的节点，其中 {len(result['clusters'])} 组：{clusters}。"
+                "请确认后使用 merge_nodes 合并，并继续执行你计划的操作")
+    except Exception as e:
+        return f"查找重复节点时发生错误：{str(e)}"
+
+@tool("merge_nodes")
+def merge_nodes(node_ids: list, properties: str = "discard") -> str:
+    """把一组重复节点合并到第一个节点，关系改接到保留的节点，其余节点被删除
+    properties 为 discard 时保留第一个节点的属性值，overwrite 时用后面节点的值覆盖，combine 时合并为数组"""
+    try:
+        node = Node.merge_nodes([int(node_id) for node_id in node_ids], properties)
+        return f"节点合并成功，保留的节点：{node.__str__()}，请继续执行你计划的操作"
+    except Exception as e:
+        return f"合并节点时发生错误：{str(e)}"
+
 @tool("update_node")
 def update_node(node_id: int, properties: dict = None) -> str:
     """更新节点的属性"""
@@ -183,8 +203,8 @@ def update_node(node_id: int, properties: dict = None) -> str:
         return f"更新节点失败：{str(e)}"
 
 @tool("find_path")
-def find_path(start_node_id: int, end_node_id: int) -> str:
-    """查找两个节点之间的路径"""
+def find_path(start_node_id: int, end_node_id: int, k: int = 1, max_depth: int = 4, direction: str = "out") -> str:
+    """查找两个节点之间最短的 k 条路径"""
     try:
         start_node = Node.from_id(start_node_id)
         end_node = Node.from_id(end_node_id)
@@ -194,11 +214,13 @@ def find_path(start_node_id: int, end_node_id: int) -> str:
         if not end_node:
             return f"目标节点（ID: {end_node_id}）不存在"
             
-        result = start_node.to(end_node)
+        result = start_node.to(end_node, k=k, max_depth=max_depth, direction=direction)
         if not result:
-            return f"未找到从节点 {start_node_id} 到节点 {end_node_id} 的路径"
+            return f"在 {max_depth} 跳内未找到从节点 {start_node_id} 到节点 {end_node_id} 的路径"
             
-        return "找到的路径如下：" + str(result) + "请继续执行你计划的操作"
+        return "找到的路径如下：" + "；".join(format_path(path) for path in result) + " 请继续执行你计划的操作"
+    except TimeoutError:
+        return "查找路径超时，请减小 max_depth 后重试"
     except Exception as e:
         return f"查找路径时发生错误：{str(e)}"
 
@@ -209,11 +231,7 @@ def connect_nodes(start_node_id: int, end_node_id: int, rel_type: str = "CONNECT
         if not rel_type:
             return "错误：必须提供关系类型"
             
-        node = Node.from_id(start_node_id)
-        if not node:
-            return f"起始节点（ID: {start_node_id}）不存在"
-            
-        link = node.connect(end_node_id, rel_type, properties)
+        link = Link.from_nodes(start_node_id, end_node_id, rel_type, properties or {})
         if not link:
             return "节点连接失败，请检查目标节点是否存在"
             
@@ -319,14 +337,32 @@ def get_isolated_nodes(limit: int = 5) -> str:
         if limit < 1:
             return "错误：limit 参数必须大于0"
             
-        nodes = Node.get_isolated_nodes()
+        nodes = Node.get_isolated_nodes(limit)
         if not nodes:
             return "数据库中没有孤立节点"
-            
-        return "获取到的孤立节点如下：" + str([n.__str__() for n in nodes]) + "请继续执行你计划的操作"
+
+        total = Node.count_isolated_nodes()
+        return (f"共有 {total} 个孤立节点，其中 {len(nodes)} 个如下：" + str([n.__str__() for n in nodes])
+                + "请继续执行你计划的操作")
     except Exception as e:
         return f"获取孤立节点时发生错误：{str(e)}"
 
+@tool("get_hub_nodes")
+def get_hub_nodes(limit: int = 5) -> str:
+    """获取连接数最多的节点"""
+    try:
+        if limit < 1:
+            return "错误：limit 参数必须大于0"
+
+        ranked = Node.get_hub_nodes(limit)
+        if not ranked:
+            return "数据库中没有节点"
+
+        return ("连接数最多的节点如下：" + str([f"{node.__str__()} 度数:{degree}" for node, degree in ranked])
+                + "请继续执行你计划的操作")
+    except Exception as e:
+        return f"获取连接数最多的节点时发生错误：{str(e)}"
+
 # 更新工具列表
 tools = [
     get_word_length,
@@ -345,6 +381,9 @@ tools = [
     update_link,
     search_nodes,
     get_isolated_nodes,
+    get_hub_nodes,
+    find_duplicate_nodes,
+    merge_nodes,
     #search_links
 ]
 
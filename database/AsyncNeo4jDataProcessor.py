@@ -0,0 +1,300 @@
+import asyncio
+import os
+import sys
+import threading
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from database.AsyncNeo4jStuff import get_async_graph_instance
+from database.Neo4jDataProcessor import (GRAPH, LINK_CACHE, NODE_CACHE, Node, _relationship_deleted,
+                                         changed_fields, publish_changes)
+
+_ASYNC_GRAPH = None
+_async_graph_lock = threading.Lock()
+
+
+def get_async_graph():
+    """返回进程内共用的 AsyncNeo4jGraph，第一次调用时才创建驱动，只导入模块不会连接数据库"""
+    global _ASYNC_GRAPH
+    with _async_graph_lock:
+        if _ASYNC_GRAPH is None:
+            _ASYNC_GRAPH = get_async_graph_instance()
+        return _ASYNC_GRAPH
+
+
+def _publish(events):
+    """异步写入完成后递增图版本号并发布事件
+
+    与同步写入一样，订阅者（拓扑镜像、度数索引、变更日志等）和按版本号缓存的结果随之更新。
+    两步之间没有 await，同一事件循环中的其他写入不会插在中间。
+    """
+    publish_changes(events, versions=[GRAPH.advance_version()])
+
+
+class AsyncLink:
+    """Link 的异步版本，所有访问数据库的方法都需要 await
+
+    写操作与 Link 一样使进程内的 Node/Link 缓存失效并通过 EVENTS 发布事件。
+    """
+
+    @classmethod
+    async def from_id(cls, relationship_id, with_nodes=True):
+        """通过关系ID初始化AsyncLink对象
+        Args:
+            relationship_id: 关系ID
+            with_nodes (bool, optional): 为 True 时在同一次查询中加载两端节点，
+                否则需要时调用 load_nodes()
+        """
+        instance = cls.__new__(cls)
+        instance.id = relationship_id
+        await instance.get(with_nodes)
+        return instance
+
+    @classmethod
+    async def from_nodes(cls, start_node_id, end_node_id, rel_type, properties):
+        """通过节点ID和关系信息创建新的关系并初始化AsyncLink对象"""
+        result = await get_async_graph().add_relationship_by_nodes_id(start_node_id, end_node_id, rel_type, properties)
+        if result:
+            instance = cls.from_record(result)
+            _publish([{'event': 'relationship_created', 'data': instance.to_dict(include_nodes=False)}])
+            return instance
+        raise Exception("Failed to create relationship")
+
+    @classmethod
+    def from_record(cls, record):
+        """通过查询返回的关系记录直接初始化AsyncLink对象，无需再次查询"""
+        instance = cls.__new__(cls)
+        instance._load(record)
+        return instance
+
+    def __init__(self):
+        """默认初始化方法，不应直接调用"""
+        raise NotImplementedError("Please use from_id() or from_nodes() to create an AsyncLink instance")
+
+    async def get(self, with_nodes=True):
+        n = await get_async_graph().get_relationship_by_id(self.id, with_nodes)
+        if (n==[]):
+            raise ValueError(f"Relationship ID:{self.id} not exist")
+        self._load(n)
+
+    def _load(self, record):
+        self.id = record['rel_id']
+        self.type = record['type']
+        self.properties = record['properties']
+        self.start_node_id = record['start_node_id']
+        self.end_node_id = record['end_node_id']
+        self.start_node = None
+        self.end_node = None
+        if 'start_node' in record:
+            self.start_node = AsyncNode.from_record(record['start_node'])
+            self.end_node = AsyncNode.from_record(record['end_node'])
+
+    async def load_nodes(self):
+        """并发加载尚未加载的两端节点"""
+        if self.start_node is None or self.end_node is None:
+            self.start_node, self.end_node = await AsyncNode.from_ids([self.start_node_id, self.end_node_id])
+        return self.start_node, self.end_node
+
+    async def remove(self):
+        result = await get_async_graph().remove_relationship_by_id(self.id)
+        LINK_CACHE.invalidate(self.id)
+        if result is not None:
+            _publish([{'event': 'relationship_deleted', 'data': _relationship_deleted(result)}])
+
+    async def update(self, new_properties, new_type=None):
+        """更新关系属性和类型，修改类型会重建关系，更新后 self.id 为新关系的ID"""
+        previous_id, previous_type, previous_properties = self.id, self.type, self.properties
+        result = await get_async_graph().update_relationship_by_rel_id(self.id, new_properties, new_type)
+        LINK_CACHE.invalidate(previous_id)
+        if result is None:
+            raise ValueError(f"Relationship ID:{self.id} not exist")
+        self._load(result)
+        if self.id != previous_id:
+            events = [{'event': 'relationship_deleted', 'data': {**_relationship_deleted(result), 'id': previous_id}},
+                      {'event': 'relationship_created', 'data': self.to_dict(include_nodes=False)}]
+        else:
+            changes = changed_fields(None, previous_properties, None, self.properties)
+            if self.type != previous_type:
+                changes['type'] = self.type
+            events = [{'event': 'relationship_updated', 'data': {**_relationship_deleted(result), **changes}}] \
+                if changes else []
+        _publish(events)
+
+    def to_dict(self, include_nodes=True):
+        """序列化关系对象为字典，两端节点未加载时只输出节点ID"""
+        data = {
+            'id': self.id,
+            'type': self.type,
+            'properties': self.properties,
+            'start_node_id': self.start_node_id,
+            'end_node_id': self.end_node_id
+        }
+        if include_nodes and self.start_node is not None and self.end_node is not None:
+            data['start_node'] = self.start_node.to_dict()
+            data['end_node'] = self.end_node.to_dict()
+        return data
+
+    def __str__(self):
+        return str(self.to_dict())
+
+
+class AsyncNode:
+    """Node 的异步版本，所有访问数据库的方法都需要 await
+
+    写操作与 Node 一样使进程内的 Node/Link 缓存失效并通过 EVENTS 发布事件。
+    """
+
+    @classmethod
+    async def from_id(cls, node_id):
+        """通过节点ID初始化AsyncNode对象"""
+        instance = cls.__new__(cls)
+        instance.id = node_id
+        await instance.get()
+        return instance
+
+    @classmethod
+    async def from_ids(cls, node_ids):
+        """并发获取多个节点，返回顺序与 node_ids 一致"""
+        return list(await asyncio.gather(*(cls.from_id(node_id) for node_id in node_ids)))
+
+    @classmethod
+    async def from_node(cls, labels, properties):
+        """通过标签和属性创建新的节点并初始化AsyncNode对象"""
+        result = await get_async_graph().add_node(labels, properties)
+        if result:
+            instance = cls.from_record(result)
+            _publish([{'event': 'node_created', 'data': instance.to_dict()}])
+            return instance
+        raise Exception("Failed to create node")
+
+    @classmethod
+    def from_record(cls, record):
+        """通过查询返回的节点记录直接初始化AsyncNode对象，无需再次查询"""
+        instance = cls.__new__(cls)
+        instance.id = record['node_id']
+        instance.labels = record['labels']
+        instance.properties = record['properties']
+        return instance
+
+    def __init__(self):
+        """默认初始化方法，不应直接调用"""
+        raise NotImplementedError("Please use from_id() or from_node() to create an AsyncNode instance")
+
+    async def get(self):
+        n = await get_async_graph().get_node_by_id(self.id)
+        if (n==None):
+            raise ValueError(f"Node ID:{self.id} not exist")
+        self.labels = n["labels"]
+        self.properties = n["properties"]
+
+    async def remove(self):
+        result = await get_async_graph().remove_node_by_id(self.id)
+        NODE_CACHE.invalidate(self.id)
+        # DETACH DELETE 同时删除了与该节点相连的关系
+        LINK_CACHE.invalidate_by(self.id)
+        if result is not None:
+            events = [{'event': 'relationship_deleted', 'data': _relationship_deleted(relationship)}
+                      for relationship in result['relationships']]
+            events.append({'event': 'node_deleted', 'data': {'id': self.id}})
+            _publish(events)
+
+    async def update(self, properties, labels=None):
+        """更新节点属性和标签
+        Args:
+            properties (dict): 要更新的属性
+            labels (list, optional): 要更新的标签列表. 默认为 None 表示不更新标签
+        """
+        previous_labels, previous_properties = self.labels, self.properties
+        result = await get_async_graph().update_node_by_node_id(self.id, properties, labels)
+        LINK_CACHE.invalidate_by(self.id)
+        if result is None:
+            NODE_CACHE.invalidate(self.id)
+            raise ValueError(f"Node ID:{self.id} not exist")
+        self.labels = result["labels"]
+        self.properties = result["properties"]
+        # 刷新同步接口已缓存的同一节点
+        Node.from_record(result)
+        changes = changed_fields(previous_labels, previous_properties, self.labels, self.properties)
+        _publish([{'event': 'node_updated', 'data': {'id': self.id, **changes, 'labels': self.labels}}]
+                 if changes else [])
+
+    async def connect(self, node_id, rel_type="CONNECTS_TO", properties=None):
+        """连接到另一个节点，返回新创建的AsyncLink对象"""
+        if properties is None:
+            properties = {}
+        return await AsyncLink.from_nodes(self.id, node_id, rel_type, properties)
+
+    def to_dict(self):
+        """序列化节点对象为字典"""
+        return {
+            'id': self.id,
+            'labels': self.labels,
+            'properties': self.properties
+        }
+
+    def __str__(self):
+        return str(self.to_dict())
+
+    async def get_nearby_nodes(self, max_depth=2):
+        """获取当前节点附近的所有节点"""
+        nodes_data = await get_async_graph().find_nodes_by_id_and_length(self.id, max_depth)
+        return [AsyncNode.from_record(node) for node in nodes_data]
+
+    @staticmethod
+    async def search(name=None, limit=3):
+        """按名字模糊搜索节点"""
+        results = await get_async_graph().search_nodes(name, limit)
+        return [AsyncNode.from_record(result) for result in results]
+
+    @staticmethod
+    async def get_all_nodes():
+        """获取数据库中的所有节点"""
+        return [AsyncNode.from_record(node) async for node in get_async_graph().iter_all_nodes()]
+
+
+async def _benchmark_hydration(count=100, rounds=5):
+    """对比同步逐个查询与异步并发查询获取 count 个节点的耗时
+
+    用法：python database/AsyncNeo4jDataProcessor.py [节点数量] [重复次数]
+    Returns:
+        dict: 节点数量和两种方式最快一轮的毫秒数
+    """
+    import time
+
+    async_graph = get_async_graph()
+    node_ids = []
+    async for node in async_graph.iter_all_nodes():
+        node_ids.append(node['node_id'])
+        if len(node_ids) >= count:
+            break
+    print(f"节点数量: {len(node_ids)}，重复次数: {rounds}")
+
+    sync_times = []
+    for _ in range(rounds):
+        # 清空身份映射缓存，保证每一轮同步获取都真正访问数据库
+        NODE_CACHE.clear()
+        started = time.perf_counter()
+        [Node.from_id(node_id) for node_id in node_ids]
+        sync_times.append(time.perf_counter() - started)
+
+    async_times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await AsyncNode.from_ids(node_ids)
+        async_times.append(time.perf_counter() - started)
+
+    sync_best = min(sync_times) * 1000
+    async_best = min(async_times) * 1000
+    print(f"同步 Node.from_id 逐个获取: 最快 {sync_best:.1f} ms")
+    print(f"异步 AsyncNode.from_ids 并发获取: 最快 {async_best:.1f} ms")
+    if async_best:
+        print(f"加速比: {sync_best / async_best:.2f}x")
+    await async_graph.close()
+    return {'nodes': len(node_ids), 'sync_ms': sync_best, 'async_ms': async_best}
+
+
+if __name__ == "__main__":
+    asyncio.run(_benchmark_hydration(*(int(arg) for arg in sys.argv[1:3])))
@@ -0,0 +1,200 @@
+import warnings
+from contextlib import asynccontextmanager
+
+# 忽略与 Neo4j 相关的废弃警告
+warnings.filterwarnings("ignore", message=".*deprecated.*")
+
+from neo4j import AsyncGraphDatabase
+
+from database.Neo4jStuff import (
+    ADD_NODE_QUERY,
+    GET_ALL_NODES_QUERY,
+    GET_NODE_BY_ID_QUERY,
+    REMOVE_NODE_BY_ID_QUERY,
+    REMOVE_RELATIONSHIP_BY_ID_QUERY,
+    SEARCH_NODES_QUERY,
+    _add_relationship_by_nodes_id_query,
+    _created_relationship_record,
+    NEIGHBOR_IDS_QUERY,
+    NODES_BY_IDS_QUERY,
+    _NeighborhoodExpansion,
+    _node_record,
+    _ordered_node_records,
+    _relationship_by_id_query,
+    _relationship_record,
+    _removed_node_record,
+    _update_node_query,
+    _update_relationship_query,
+)
+
+
+class AsyncNeo4jGraph:
+    """基于 neo4j.AsyncGraphDatabase 的 Neo4jGraph 异步版本
+
+    方法与 Neo4jGraph 同名且返回相同结构的结果，查询语句与同步版本共用。
+    每次调用使用独立的会话，因此多个查询可以通过 asyncio.gather 并发执行。
+    驱动绑定在首次使用它的事件循环上。
+    """
+
+    def __init__(self, uri, user, password, max_connection_pool_size=100,
+                 connection_acquisition_timeout=60.0, max_connection_lifetime=3600,
+                 fetch_size=1000, nearby_frontier_limit=1000):
+        self.driver = AsyncGraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=max_connection_pool_size,
+            connection_acquisition_timeout=connection_acquisition_timeout,
+            max_connection_lifetime=max_connection_lifetime
+        )
+        self.fetch_size = fetch_size
+        self.nearby_frontier_limit = nearby_frontier_limit
+
+    async def close(self):
+        if self.driver:
+            await self.driver.close()
+
+    @asynccontextmanager
+    async def begin_session(self):
+        session = self.driver.session(fetch_size=self.fetch_size)
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    async def add_node(self, node_name, properties):
+        async with self.begin_session() as session:
+            return await session.execute_write(self._add_node, node_name, properties)
+
+    async def _add_node(self, tx, node_name, properties):
+        result = await tx.run(ADD_NODE_QUERY, node_name=node_name, properties=properties)
+        record = await result.single()
+        return _node_record(record) if record else None
+
+    async def remove_node_by_id(self, node_id):
+        async with self.begin_session() as session:
+            return await session.execute_write(self._remove_node_by_id, node_id)
+
+    async def _remove_node_by_id(self, tx, node_id):
+        result = await tx.run(REMOVE_NODE_BY_ID_QUERY, node_id=node_id)
+        record = await result.single()
+        return _removed_node_record(record) if record else None
+
+    async def update_node_by_node_id(self, node_id, new_properties, new_labels=None):
+        if new_labels is None:
+            new_labels = []
+        if "Node" not in new_labels:
+            new_labels.append("Node")  # must have this label for global index
+        async with self.begin_session() as session:
+            return await session.execute_write(self._update_node_by_node_id, node_id, new_properties, new_labels)
+
+    async def _update_node_by_node_id(self, tx, node_id, new_properties, new_labels=None):
+        query = _update_node_query(bool(new_properties), new_labels is not None)
+        result = await tx.run(query, node_id=node_id, new_properties=new_properties, new_labels=new_labels)
+        record = await result.single()
+        return _node_record(record) if record else None
+
+    async def add_relationship_by_nodes_id(self, start_node_id, end_node_id, relationship_type, properties):
+        async with self.begin_session() as session:
+            return await session.execute_write(self._add_relationship_by_nodes_id,
+                                               start_node_id, end_node_id,
+                                               relationship_type, properties)
+
+    async def _add_relationship_by_nodes_id(self, tx, start_node_id, end_node_id, relationship_type, properties):
+        result = await tx.run(_add_relationship_by_nodes_id_query(relationship_type),
+                              start_node_id=start_node_id, end_node_id=end_node_id,
+                              properties=properties)
+        record = await result.single()
+        return _created_relationship_record(record, start_node_id, end_node_id)
+
+    async def remove_relationship_by_id(self, relationship_id):
+        async with self.begin_session() as session:
+            return await session.execute_write(self._remove_relationship_by_id, relationship_id)
+
+    async def _remove_relationship_by_id(self, tx, relationship_id):
+        result = await tx.run(REMOVE_RELATIONSHIP_BY_ID_QUERY, relationship_id=relationship_id)
+        record = await result.single()
+        return _relationship_record(record) if record else None
+
+    async def update_relationship_by_rel_id(self, rel_id, new_properties, new_type=None):
+        async with self.begin_session() as session:
+            return await session.execute_write(self._update_relationship_by_rel_id,
+                                               rel_id, new_properties, new_type)
+
+    async def _update_relationship_by_rel_id(self, tx, rel_id, new_properties, new_type=None):
+        query = _update_relationship_query(bool(new_type))
+        result = await tx.run(query, rel_id=rel_id, new_properties=new_properties, new_type=new_type)
+        record = await result.single()
+        return _relationship_record(record) if record else None
+
+    async def get_all_nodes(self):
+        async with self.begin_session() as session:
+            return await session.execute_read(self._get_all_nodes)
+
+    async def _get_all_nodes(self, tx):
+        result = await tx.run(GET_ALL_NODES_QUERY)
+        return [_node_record(record) async for record in result]
+
+    async def iter_all_nodes(self):
+        """流式遍历数据库中的所有节点"""
+        async with self.begin_session() as session:
+            result = await session.run(GET_ALL_NODES_QUERY)
+            async for record in result:
+                yield _node_record(record)
+
+    async def get_node_by_id(self, node_id):
+        async with self.begin_session() as session:
+            return await session.execute_read(self._get_node_by_id, node_id)
+
+    async def _get_node_by_id(self, tx, node_id):
+        result = await tx.run(GET_NODE_BY_ID_QUERY, node_id=node_id)
+        record = await result.single()
+        return _node_record(record) if record else None
+
+    async def get_relationship_by_id(self, relationship_id, with_nodes=False):
+        async with self.begin_session() as session:
+            return await session.execute_read(self._get_relationship_by_id, relationship_id, with_nodes)
+
+    async def _get_relationship_by_id(self, tx, relationship_id, with_nodes=False):
+        result = await tx.run(_relationship_by_id_query(with_nodes), relationship_id=relationship_id)
+        record = await result.single()
+        return _relationship_record(record) if record else []
+
+    async def find_nodes_by_id_and_length(self, start_node_id, length, frontier_limit=None):
+        async with self.begin_session() as session:
+            return await session.execute_read(self._find_nodes_by_id_and_length, start_node_id, length,
+                                              frontier_limit or self.nearby_frontier_limit)
+
+    async def _find_nodes_by_id_and_length(self, tx, start_node_id, length, frontier_limit):
+        expansion = _NeighborhoodExpansion(start_node_id, length, frontier_limit)
+        while not expansion.done:
+            result = await tx.run(NEIGHBOR_IDS_QUERY, node_ids=expansion.frontier)
+            expansion.advance([record['node_id'] async for record in result])
+        node_ids = expansion.reached
+        if not node_ids:
+            return []
+        result = await tx.run(NODES_BY_IDS_QUERY, node_ids=node_ids)
+        return _ordered_node_records([record async for record in result], node_ids)
+
+    async def search_nodes(self, name=None, limit=3):
+        async with self.begin_session() as session:
+            return await session.execute_read(self._search_nodes, name, limit)
+
+    async def _search_nodes(self, tx, name=None, limit=3):
+        if not name:
+            return []
+        result = await tx.run(SEARCH_NODES_QUERY, name=f'"{name}"', limit=limit)
+        return [_node_record(record) async for record in result]
+
+
+def get_async_graph_instance():
+    from Server.config import Config
+    return AsyncNeo4jGraph(
+        Config.NEO4J_URI,
+        Config.NEO4J_USER,
+        Config.NEO4J_PASSWORD,
+        max_connection_pool_size=Config.NEO4J_MAX_CONNECTION_POOL_SIZE,
+        connection_acquisition_timeout=Config.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+        max_connection_lifetime=Config.NEO4J_MAX_CONNECTION_LIFETIME,
+        fetch_size=Config.NEO4J_FETCH_SIZE,
+        nearby_frontier_limit=Config.NEARBY_FRONTIER_LIMIT
+    )
@@ -0,0 +1,318 @@
+"""节点度数索引
+
+在内存中保存每个节点的入度、出度和总度数，并按度数分组，孤立节点、连接数最多的节点和
+度数分布的查询只与结果数量有关，不扫描全图。
+
+索引在第一次查询时按ID分页加载，之后通过订阅 EVENTS 增量维护：创建、删除关系时更新两端节点的度数，
+删除节点时移除该节点。事件无法确定度数变化时（例如外部删除的关系没有两端节点ID，或被删除的节点
+仍有关系）索引被标记为过期，下一次查询时重新加载；超过 refresh_interval 秒后也会重新加载一次。
+加载时不持有锁，期间发布的事件先缓存，加载完成后重新应用。关系事件是否已包含在加载结果中由版本号判断：
+每页查询前后各读取一次图版本号，事件的版本号不大于查询前的版本号时已包含，大于查询后的版本号时未包含，
+介于两者之间无法确定时索引被标记为过期。
+
+分页使用键集游标：孤立节点按节点ID升序，度数最高的节点按 (度数降序, 节点ID升序) 排列，
+游标为上一页最后一项，图在分页期间变化时未变化的节点不会被跳过或重复。
+"""
+import bisect
+import threading
+import time
+
+DEGREE_DIRECTIONS = ("total", "in", "out")
+
+
+class _Buckets:
+    """按度数分组的节点ID，degrees 为非空分组的度数升序列表
+
+    每个分组是按ID升序的列表，增删时用 bisect 维护顺序，分页时不需要重新排序。
+    """
+
+    def __init__(self):
+        self.members = {}   # 度数 -> 升序的节点ID列表
+        self.degrees = []
+
+    def add(self, node_id, degree):
+        members = self.members.get(degree)
+        if members is None:
+            members = self.members[degree] = []
+            bisect.insort(self.degrees, degree)
+        bisect.insort(members, node_id)
+
+    def remove(self, node_id, degree):
+        members = self.members[degree]
+        del members[bisect.bisect_left(members, node_id)]
+        if not members:
+            del self.members[degree]
+            del self.degrees[bisect.bisect_left(self.degrees, degree)]
+
+    def move(self, node_id, old_degree, new_degree):
+        if old_degree != new_degree:
+            self.remove(node_id, old_degree)
+            self.add(node_id, new_degree)
+
+    def page(self, degree, limit, after_id=None):
+        """度数为 degree 的节点中ID大于 after_id 的前 limit 个，limit 为 None 时返回全部
+
+        Returns:
+            tuple[list[int], bool]: 节点ID，以及之后是否还有节点
+        """
+        ordered = self.members.get(degree, [])
+        start = 0 if after_id is None else bisect.bisect_right(ordered, after_id)
+        end = len(ordered) if limit is None else min(start + limit, len(ordered))
+        return ordered[start:end], end < len(ordered)
+
+    def descending(self, limit, after=None):
+        """按度数从高到低、度数相同时按节点ID升序返回 (节点ID, 度数)
+
+        Args:
+            after (tuple[int, int], optional): 上一页最后一项的 (度数, 节点ID)，从它之后开始
+        Returns:
+            tuple[list[tuple[int, int]], bool]: 最多 limit 项，以及之后是否还有节点
+        """
+        if after is None:
+            position = len(self.degrees) - 1
+            after_id = None
+        else:
+            position = bisect.bisect_right(self.degrees, after[0]) - 1
+            # 上一页最后一项的度数分组已为空时从更低的度数开始
+            after_id = after[1] if position >= 0 and self.degrees[position] == after[0] else None
+        ranked = []
+        while position >= 0:
+            degree = self.degrees[position]
+            node_ids, more = self.page(degree, limit - len(ranked), after_id)
+            ranked += [(node_id, degree) for node_id in node_ids]
+            if len(ranked) == limit:
+                return ranked, more or position > 0
+            position -= 1
+            after_id = None
+        return ranked, False
+
+
+class DegreeIndex:
+    """节点度数索引
+
+    Args:
+        graph (Neo4jGraph): 用于加载度数的图实例
+        refresh_interval (float): 重新全量加载的间隔秒数，0 表示只通过事件增量维护
+        page_size (int): 加载时每页的节点数量
+    """
+
+    def __init__(self, graph, refresh_interval=300.0, page_size=50000):
+        self.graph = graph
+        self.refresh_interval = refresh_interval
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()     # 同一时间只有一个加载
+        self._degrees = None    # 节点ID -> [入度, 出度]
+        self._buckets = None    # 方向 -> _Buckets
+        self._pending = None    # 加载期间收到的事件，加载完成后重新应用
+        self._stale = False
+        self._loaded_at = 0.0
+        self.load_seconds = 0.0
+
+    def on_event(self, event, data):
+        """作为 EVENTS 的订阅者维护索引"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((event, data))
+            if self._degrees is not None:
+                self._apply(event, data)
+
+    def _apply(self, event, data, pages=None):
+        """应用事件，调用时持有 _lock
+
+        Args:
+            pages: 重新应用加载期间的事件时传入加载各页的 (最后一个节点ID, 查询前版本号, 查询后版本号)，
+                   用于跳过已包含在加载结果中的关系变化
+        """
+        if event == 'graph_reset':
+            self._degrees = None
+            return
+        items = data['events'] if event == 'graph_batch' else [{'event': event, 'data': data}]
+        versions = data.get('versions', ())
+        for item in items:
+            kind, item_data = item['event'], item['data']
+            if kind == 'node_created':
+                self._add_node(item_data['id'])
+            elif kind == 'node_deleted':
+                self._remove_node(item_data['id'])
+            elif kind == 'relationship_created':
+                self._change(item_data['start_node_id'], item_data['end_node_id'], 1, versions, pages)
+            elif kind == 'relationship_deleted':
+                if 'start_node_id' in item_data:
+                    self._change(item_data['start_node_id'], item_data['end_node_id'], -1, versions, pages)
+                else:
+                    self._stale = True
+
+    def _loaded_before(self, node_id, versions, pages):
+        """版本号为 versions 的修改是否已包含在节点所在页的加载结果中，无法确定时返回 None"""
+        position = bisect.bisect_left(pages, (node_id,))
+        if position == len(pages):
+            position -= 1
+        _, before, after = pages[position]
+        if versions and max(versions) <= before:
+            return True
+        if versions and min(versions) > after:
+            return False
+        return None
+
+    def _add_node(self, node_id, in_degree=0, out_degree=0):
+        if node_id in self._degrees:
+            return
+        self._degrees[node_id] = [in_degree, out_degree]
+        self._buckets["in"].add(node_id, in_degree)
+        self._buckets["out"].add(node_id, out_degree)
+        self._buckets["total"].add(node_id, in_degree + out_degree)
+
+    def _remove_node(self, node_id):
+        degrees = self._degrees.pop(node_id, None)
+        if degrees is None:
+            return
+        in_degree, out_degree = degrees
+        if in_degree or out_degree:
+            # 没有收到这些关系的删除事件，相邻节点的度数已不准确
+            self._stale = True
+        self._buckets["in"].remove(node_id, in_degree)
+        self._buckets["out"].remove(node_id, out_degree)
+        self._buckets["total"].remove(node_id, in_degree + out_degree)
+
+    def _change(self, start_node_id, end_node_id, delta, versions=(), pages=None):
+        """关系增加或减少时更新起点的出度和终点的入度，pages 的含义见 _apply"""
+        for node_id, side in ((start_node_id, 1), (end_node_id, 0)):
+            degrees = self._degrees.get(node_id)
+            if degrees is None:
+                continue
+            if pages:
+                loaded = self._loaded_before(node_id, versions, pages)
+                if loaded is None:
+                    self._stale = True
+                if loaded is not False:
+                    continue
+            if degrees[side] + delta < 0:
+                self._stale = True
+                continue
+            total = degrees[0] + degrees[1]
+            self._buckets["in" if side == 0 else "out"].move(node_id, degrees[side], degrees[side] + delta)
+            self._buckets["total"].move(node_id, total, total + delta)
+            degrees[side] += delta
+
+    def _fresh(self):
+        """调用时持有 _lock"""
+        expired = self.refresh_interval and time.monotonic() - self._loaded_at > self.refresh_interval
+        return self._degrees is not None and not self._stale and not expired
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._fresh():
+                return
+        with self._load_lock:
+            with self._lock:
+                # 等待期间其他线程已完成加载
+                if self._fresh():
+                    return
+                self._pending = []
+            try:
+                # 加载期间不持有 _lock，避免阻塞发布事件的写操作
+                started = time.perf_counter()
+                rows = []
+                pages = []
+                after_id = None
+                while True:
+                    before = self.graph.graph_version
+                    page = self.graph.get_degrees(after_id, self.page_size)
+                    rows += page
+                    if len(page) < self.page_size:
+                        # 最后一页覆盖之后新建的所有节点
+                        pages.append((float('inf'), before, self.graph.graph_version))
+                        break
+                    after_id = page[-1][0]
+                    pages.append((after_id, before, self.graph.graph_version))
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                pending, self._pending = self._pending, None
+                self._degrees = {}
+                self._buckets = {direction: _Buckets() for direction in DEGREE_DIRECTIONS}
+                for node_id, in_degree, out_degree in rows:
+                    self._add_node(node_id, in_degree, out_degree)
+                self._stale = False
+                for event, data in pending:
+                    if event == 'graph_reset':
+                        # 加载期间图被整体重建，加载结果已经过时，下一次查询时重新加载
+                        self._stale = True
+                        break
+                    self._apply(event, data, pages)
+                self._loaded_at = time.monotonic()
+                self.load_seconds = time.perf_counter() - started
+
+    def isolated(self, limit=None, after_id=None):
+        """返回没有任何关系连接的节点ID，按节点ID升序
+
+        Args:
+            limit (int, optional): 返回数量，默认返回全部
+            after_id (int, optional): 上一页最后一个节点ID
+        Returns:
+            tuple[list[int], int, int]: 节点ID、下一页的游标（没有下一页时为 None），以及孤立节点总数
+        """
+        self._ensure_loaded()
+        with self._lock:
+            buckets = self._buckets["total"]
+            node_ids, more = buckets.page(0, limit, after_id)
+            next_cursor = node_ids[-1] if more and node_ids else None
+            return node_ids, next_cursor, len(buckets.members.get(0, ()))
+
+    def top(self, limit=10, after=None, direction="total"):
+        """返回度数最高的节点，度数相同时按节点ID升序排列
+
+        Args:
+            after (tuple[int, int], optional): 上一页最后一项的 (度数, 节点ID)
+        Returns:
+            tuple[list[tuple[int, int]], tuple[int, int]]: (节点ID, 度数)，以及下一页的游标 (度数, 节点ID)，
+                没有下一页时为 None
+        Raises:
+            ValueError: direction 不合法
+        """
+        if direction not in DEGREE_DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(DEGREE_DIRECTIONS)}")
+        self._ensure_loaded()
+        with self._lock:
+            ranked, more = self._buckets[direction].descending(limit, after)
+            next_cursor = (ranked[-1][1], ranked[-1][0]) if more and ranked else None
+            return ranked, next_cursor
+
+    def histogram(self, direction="total"):
+        """返回度数分布，按度数升序排列的 [度数, 节点数量]，只包含节点数量不为 0 的度数
+
+        Raises:
+            ValueError: direction 不合法
+        """
+        if direction not in DEGREE_DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(DEGREE_DIRECTIONS)}")
+        self._ensure_loaded()
+        with self._lock:
+            buckets = self._buckets[direction]
+            return [[degree, len(buckets.members[degree])] for degree in buckets.degrees]
+
+    def degree(self, node_id):
+        """返回节点的 {'in', 'out', 'total'} 度数，节点不存在时返回 None"""
+        self._ensure_loaded()
+        with self._lock:
+            degrees = self._degrees.get(node_id)
+            if degrees is None:
+                return None
+            return {'in': degrees[0], 'out': degrees[1], 'total': degrees[0] + degrees[1]}
+
+    def stats(self):
+        with self._lock:
+            if self._degrees is None:
+                return {'size': None, 'age': None, 'stale': self._stale}
+            total = self._buckets["total"]
+            return {
+                'size': len(self._degrees),
+                'isolated': len(total.members.get(0, ())),
+                'max_degree': total.degrees[-1] if total.degrees else None,
+                'stale': self._stale,
+                'age': time.monotonic() - self._loaded_at,
+                'load_seconds': self.load_seconds
+            }
@@ -0,0 +1,305 @@
+"""全图分析：连通分量、PageRank、度中心性和介数中心性近似
+
+分析基于一次导出的邻接矩阵 (scipy.sparse CSR)：拓扑镜像可用时直接从镜像取得，否则通过
+Neo4jGraph.export_topology 在一个读事务中读取。邻接矩阵和各项结果按图版本号缓存，版本号不变时
+直接返回缓存结果；cache_ttl 秒后重新导出，补上其他进程的写入。重新计算 PageRank 时以上一次的结果
+作为初始值，图只有少量变化时只需很少的迭代次数。
+
+邻接矩阵为 0/1 矩阵，同一对节点之间的多条关系只计一次。
+"""
+import threading
+import time
+
+import numpy as np
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import connected_components
+
+COMPONENT_KINDS = ("weak", "strong")
+# 介数中心性按批计算时，每批密集矩阵的最大元素数量
+_BETWEENNESS_BLOCK = 4_000_000
+
+
+class _Adjacency:
+    """某个图版本的邻接矩阵，matrix[i, j] 为 1 表示存在 node_ids[i] -> node_ids[j] 的关系"""
+
+    def __init__(self, node_ids, start_ids, end_ids, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.node_ids = np.unique(np.asarray(node_ids, dtype=np.int64))
+        n = len(self.node_ids)
+        start_ids = np.asarray(start_ids, dtype=np.int64)
+        end_ids = np.asarray(end_ids, dtype=np.int64)
+        source = np.searchsorted(self.node_ids, start_ids)
+        target = np.searchsorted(self.node_ids, end_ids)
+        valid = (source < n) & (target < n)
+        valid[valid] = (self.node_ids[source[valid]] == start_ids[valid]) & (self.node_ids[target[valid]] == end_ids[valid])
+        matrix = csr_array((np.ones(int(valid.sum())), (source[valid], target[valid])), shape=(n, n))
+        matrix.sum_duplicates()
+        matrix.data[:] = 1.0
+        self.matrix = matrix
+        self.transposed = matrix.T.tocsr()
+        self.results = {}   # (指标, 参数) -> 结果
+
+    def positions(self, node_ids):
+        """返回 node_ids 在矩阵中的位置，不存在的节点为 -1"""
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        positions = np.searchsorted(self.node_ids, node_ids)
+        found = positions < len(self.node_ids)
+        found[found] = self.node_ids[positions[found]] == node_ids[found]
+        return np.where(found, positions, -1)
+
+
+def _top(node_ids, scores, limit):
+    """返回分数最高的 limit 个 (节点ID, 分数)，分数相同时按节点ID升序"""
+    if not len(scores):
+        return []
+    limit = min(limit, len(scores))
+    candidates = np.argpartition(-scores, limit - 1)[:limit]
+    order = candidates[np.lexsort((node_ids[candidates], -scores[candidates]))]
+    return [(int(node_ids[i]), float(scores[i])) for i in order]
+
+
+def _pagerank(matrix, damping, tol, max_iter, start=None):
+    """幂迭代计算 PageRank，出度为 0 的节点的分数平均分给所有节点
+
+    Returns:
+        tuple[np.ndarray, int, bool]: 分数（和为 1）、迭代次数、是否收敛
+    """
+    n = matrix.shape[0]
+    out_degree = matrix.sum(axis=1)
+    dangling = out_degree == 0
+    inverse = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    coo = matrix.tocoo()
+    # transition[j, i] = 1 / 出度(i)，表示从 i 走到 j 的概率
+    transition = csr_array((inverse[coo.row], (coo.col, coo.row)), shape=(n, n))
+    ranks = np.full(n, 1.0 / n) if start is None else start
+    for iteration in range(1, max_iter + 1):
+        updated = damping * (transition @ ranks + ranks[dangling].sum() / n) + (1.0 - damping) / n
+        error = np.abs(updated - ranks).sum()
+        ranks = updated
+        if error < n * tol:
+            return ranks, iteration, True
+    return ranks, max_iter, False
+
+
+def _betweenness(matrix, transposed, sources):
+    """从 sources 出发按 Brandes 算法累计介数，多个源点作为密集矩阵的列同时按层推进
+
+    正向按层求每个节点的最短路径数 sigma 和距离 dist，反向按层累计依赖值 delta：
+    delta[v] = Σ sigma[v] / sigma[w] * (1 + delta[w])，w 为 v 在下一层的后继。
+    """
+    n = matrix.shape[0]
+    columns = np.arange(len(sources))
+    sigma = np.zeros((n, len(sources)))
+    sigma[sources, columns] = 1.0
+    dist = np.full((n, len(sources)), -1, dtype=np.int32)
+    dist[sources, columns] = 0
+    frontier = sigma.copy()
+    depth = 0
+    while True:
+        reached = transposed @ frontier
+        new = (reached > 0) & (dist < 0)
+        if not new.any():
+            break
+        depth += 1
+        dist[new] = depth
+        sigma[new] = reached[new]
+        frontier = np.where(new, reached, 0.0)
+
+    delta = np.zeros_like(sigma)
+    safe_sigma = np.where(sigma > 0, sigma, 1.0)
+    for level in range(depth, 0, -1):
+        coefficient = np.where(dist == level, (1.0 + delta) / safe_sigma, 0.0)
+        delta += np.where(dist == level - 1, sigma * (matrix @ coefficient), 0.0)
+    delta[sources, columns] = 0.0
+    return delta.sum(axis=1)
+
+
+class GraphAnalytics:
+    """全图分析，结果按图版本号缓存
+
+    Args:
+        graph (Neo4jGraph): 用于导出拓扑和读取版本号的图实例
+        mirror (GraphMirror, optional): 拓扑镜像，可用时从镜像取得邻接关系而不读取数据库
+        cache_ttl (float): 邻接矩阵的最长使用秒数，0 表示只在版本号变化时重新导出
+        betweenness_samples (int): 介数中心性近似默认抽取的源点数量
+    """
+
+    def __init__(self, graph, mirror=None, cache_ttl=60.0, betweenness_samples=64):
+        self.graph = graph
+        self.mirror = mirror
+        self.cache_ttl = cache_ttl
+        self.betweenness_samples = betweenness_samples
+        # 分析计算量大，同一时间只进行一项，也避免并发请求重复导出
+        self._lock = threading.Lock()
+        self._adjacency = None
+        self._pagerank = None   # 上一次 PageRank 的 (节点ID, 分数)，作为下一次迭代的初始值
+        self.stats_counters = {'exports': 0, 'mirror_loads': 0, 'computations': 0, 'cache_hits': 0,
+                               'export_seconds': 0.0}
+
+    def _load(self):
+        """返回当前版本的邻接矩阵，调用时持有 _lock"""
+        version = self.graph.graph_version
+        adjacency = self._adjacency
+        if (adjacency is not None and adjacency.version == version
+                and not (self.cache_ttl and time.monotonic() - adjacency.built_at > self.cache_ttl)):
+            return adjacency
+        started = time.perf_counter()
+        data = self.mirror.edge_list() if self.mirror is not None else None
+        if data is None:
+            data = self.graph.export_topology()
+            self.stats_counters['exports'] += 1
+        else:
+            self.stats_counters['mirror_loads'] += 1
+        self._adjacency = _Adjacency(data['node_ids'], data['start_node_ids'], data['end_node_ids'], version)
+        self.stats_counters['export_seconds'] = time.perf_counter() - started
+        return self._adjacency
+
+    def _cached(self, key, compute):
+        """按 (指标, 参数) 缓存当前版本的结果，compute(adjacency) 计算结果"""
+        with self._lock:
+            adjacency = self._load()
+            result = adjacency.results.get(key)
+            if result is not None:
+                self.stats_counters['cache_hits'] += 1
+                return result
+            started = time.perf_counter()
+            result = compute(adjacency)
+            result['nodes'] = len(adjacency.node_ids)
+            result['edges'] = int(adjacency.matrix.nnz)
+            result['version'] = adjacency.version
+            result['compute_seconds'] = time.perf_counter() - started
+            adjacency.results[key] = result
+            self.stats_counters['computations'] += 1
+            return result
+
+    @staticmethod
+    def _labels(adjacency, kind):
+        if kind not in COMPONENT_KINDS:
+            raise ValueError(f"kind must be one of {', '.join(COMPONENT_KINDS)}")
+        key = ('labels', kind)
+        if key not in adjacency.results:
+            adjacency.results[key] = connected_components(adjacency.matrix, directed=True, connection=kind)
+        return adjacency.results[key]
+
+    def components(self, kind="weak", limit=10, sample=5):
+        """计算弱连通或强连通分量
+
+        Args:
+            kind (str): 'weak' 忽略关系方向，'strong' 沿关系方向互相可达
+            limit (int): 返回的最大分量数量
+            sample (int): 每个分量返回的节点ID数量
+        Returns:
+            dict: count 分量总数；largest 按大小降序的分量 [{'component', 'size', 'node_ids'}]；
+                  distribution 按大小升序的 [分量大小, 分量数量]
+        Raises:
+            ValueError: kind 不合法
+        """
+        def compute(adjacency):
+            count, labels = self._labels(adjacency, kind)
+            sizes = np.bincount(labels, minlength=count)
+            size_values, size_counts = np.unique(sizes, return_counts=True)
+            largest = []
+            for component, size in _top(np.arange(count), sizes.astype(float), limit):
+                members = adjacency.node_ids[labels == component][:sample]
+                largest.append({'component': component, 'size': int(size), 'node_ids': members.tolist()})
+            return {
+                'kind': kind,
+                'count': int(count),
+                'largest': largest,
+                'distribution': [[int(size), int(number)] for size, number in zip(size_values, size_counts)]
+            }
+        return self._cached(('components', kind, limit, sample), compute)
+
+    def same_component(self, node_ids, kind="weak"):
+        """按分量对节点分组，同一组内的节点互相可达（'weak' 时忽略方向）
+
+        Returns:
+            dict: groups 为节点ID的分组列表，missing 为图中不存在的节点ID
+        Raises:
+            ValueError: kind 不合法
+        """
+        with self._lock:
+            adjacency = self._load()
+            _, labels = self._labels(adjacency, kind)
+            positions = adjacency.positions(node_ids)
+            groups = {}
+            missing = []
+            for node_id, position in zip(node_ids, positions.tolist()):
+                if position < 0:
+                    missing.append(node_id)
+                else:
+                    groups.setdefault(int(labels[position]), []).append(node_id)
+            return {'kind': kind, 'groups': list(groups.values()), 'missing': missing,
+                    'version': adjacency.version}
+
+    def pagerank(self, limit=10, damping=0.85, tol=1e-6, max_iter=100):
+        """计算 PageRank，以上一次的结果作为初始值
+
+        Returns:
+            dict: top 为分数最高的 [(节点ID, 分数)]，以及 iterations、converged
+        """
+        def compute(adjacency):
+            n = len(adjacency.node_ids)
+            if n == 0:
+                return {'top': [], 'iterations': 0, 'converged': True}
+            start = None
+            if self._pagerank is not None and len(self._pagerank[0]):
+                # 沿用仍存在的节点的分数，新节点取平均值
+                previous_ids, previous_ranks = self._pagerank
+                positions = np.minimum(np.searchsorted(previous_ids, adjacency.node_ids), len(previous_ids) - 1)
+                known = previous_ids[positions] == adjacency.node_ids
+                start = np.where(known, previous_ranks[positions], 1.0 / n)
+                start /= start.sum()
+            ranks, iterations, converged = _pagerank(adjacency.matrix, damping, tol, max_iter, start)
+            self._pagerank = (adjacency.node_ids, ranks)
+            return {'top': _top(adjacency.node_ids, ranks, limit), 'iterations': iterations,
+                    'converged': converged, 'warm_start': start is not None}
+        return self._cached(('pagerank', limit, damping, tol, max_iter), compute)
+
+    def degree_centrality(self, limit=10):
+        """度中心性：入度与出度之和除以 n - 1
+
+        Returns:
+            dict: top 为度中心性最高的 [(节点ID, 度中心性)]
+        """
+        def compute(adjacency):
+            n = len(adjacency.node_ids)
+            degree = (np.diff(adjacency.matrix.indptr) + np.diff(adjacency.transposed.indptr)).astype(float)
+            return {'top': _top(adjacency.node_ids, degree / max(n - 1, 1), limit)}
+        return self._cached(('degree', limit), compute)
+
+    def betweenness(self, limit=10, samples=None, seed=0):
+        """抽取 samples 个源点近似计算介数中心性（有向、未归一化），结果按 n / samples 放大
+
+        相同的 seed 在同一图版本上抽取相同的源点，结果可以缓存。
+
+        Returns:
+            dict: top 为介数最高的 [(节点ID, 介数估计值)]，以及实际使用的 samples
+        """
+        samples = self.betweenness_samples if samples is None else samples
+
+        def compute(adjacency):
+            n = len(adjacency.node_ids)
+            count = max(0, min(int(samples), n))
+            if count == 0:
+                return {'top': [], 'samples': 0}
+            sources = np.random.default_rng(seed).choice(n, size=count, replace=False)
+            scores = np.zeros(n)
+            batch = max(1, _BETWEENNESS_BLOCK // n)
+            for i in range(0, count, batch):
+                scores += _betweenness(adjacency.matrix, adjacency.transposed, sources[i:i + batch])
+            scores *= n / count
+            return {'top': _top(adjacency.node_ids, scores, limit), 'samples': count}
+        return self._cached(('betweenness', limit, samples, seed), compute)
+
+    def stats(self):
+        with self._lock:
+            adjacency = self._adjacency
+            return {
+                **self.stats_counters,
+                'version': adjacency.version if adjacency is not None else None,
+                'nodes': len(adjacency.node_ids) if adjacency is not None else None,
+                'edges': int(adjacency.matrix.nnz) if adjacency is not None else None,
+                'cached_results': len(adjacency.results) if adjacency is not None else 0
+            }
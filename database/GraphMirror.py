@@ -0,0 +1,485 @@
+"""图拓扑的内存镜像
+
+用一次读事务把全部节点ID和关系的 (ID, 起点, 终点, 类型) 加载为 NumPy 数组：
+    node_ids                    节点ID，升序 (int64)
+    edge_ids                    关系ID，升序 (int64)，关系在以下数组中的下标与此一致
+    edge_source / edge_target   关系起点、终点在 node_ids 中的位置 (int32)
+    edge_types                  关系类型在类型表中的下标 (int32)
+    out_offsets / out_edges     按起点分组的关系下标 (CSR)，位置 i 的出边为 out_edges[out_offsets[i]:out_offsets[i + 1]]
+    in_offsets / in_edges       按终点分组的关系下标 (CSC)
+    node_alive / edge_alive     删除标记
+
+加载后通过订阅 EVENTS 增量维护：删除只清除标记，新增的节点和关系放在字典形式的增量层中，
+增量超过 compact_threshold 时在后台线程中把增量层合并进新的数组，不再读取数据库；持有锁时只复制
+删除标记和增量层，合并完成后再替换，期间收到的事件与重新加载时一样在替换后重新应用。
+
+镜像只保存拓扑，遍历在内存中完成，节点和关系的内容仍按ID从数据库读取。写操作完成后图版本号
+先递增、事件随后发布，事件中带有这次写入产生的版本号（检测到的外部修改同样如此）。镜像记录
+已应用的版本号，只有更早的版本都已应用时才推进自己的版本号，因此并发写入时不会因为先收到
+较晚的事件而认为已经同步。版本号落后于图时查询返回 None，由调用方改用 Cypher；
+同一批缺少的版本超过 max_stale 秒仍未应用（例如有写操作没有发布事件）时在后台重新加载。
+"""
+import threading
+import time
+
+import numpy as np
+
+from database.Neo4jStuff import _NeighborhoodExpansion
+
+_DIRECTIONS = ("out", "in", "both")
+
+
+def _find(sorted_ids, item_id):
+    """返回 item_id 在升序数组中的位置，不存在时返回 None"""
+    position = int(np.searchsorted(sorted_ids, item_id))
+    if position < len(sorted_ids) and sorted_ids[position] == item_id:
+        return position
+    return None
+
+
+def _group(keys, count):
+    """按 keys 分组关系下标，返回 (offsets, edges)"""
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=count), out=offsets[1:])
+    return offsets, np.argsort(keys, kind='stable').astype(np.int32)
+
+
+def _live_arrays(topology, node_alive, edge_alive, edge_types, added_nodes, added_edges):
+    """合并数组和增量层中未删除的部分，返回 (节点ID, 关系ID, 起点ID, 终点ID, 类型下标)"""
+    added = list(added_edges.items())
+    return (
+        np.concatenate([topology.node_ids[node_alive],
+                        np.fromiter(added_nodes, dtype=np.int64, count=len(added_nodes))]),
+        np.concatenate([topology.edge_ids[edge_alive], np.asarray([rel_id for rel_id, _ in added], dtype=np.int64)]),
+        np.concatenate([topology.node_ids[topology.edge_source[edge_alive]],
+                        np.asarray([edge[0] for _, edge in added], dtype=np.int64)]),
+        np.concatenate([topology.node_ids[topology.edge_target[edge_alive]],
+                        np.asarray([edge[1] for _, edge in added], dtype=np.int64)]),
+        np.concatenate([edge_types[edge_alive], np.asarray([edge[2] for _, edge in added], dtype=np.int32)])
+    )
+
+
+class _Topology:
+    """一次构建得到的数组，构建后只修改删除标记和关系类型"""
+
+    def __init__(self, node_ids, edge_ids, start_ids, end_ids, type_codes):
+        self.node_ids = np.unique(np.asarray(node_ids, dtype=np.int64))
+        start_ids = np.asarray(start_ids, dtype=np.int64)
+        end_ids = np.asarray(end_ids, dtype=np.int64)
+        source = np.searchsorted(self.node_ids, start_ids)
+        target = np.searchsorted(self.node_ids, end_ids)
+        # 丢弃端点不在节点表中的关系
+        valid = (source < len(self.node_ids)) & (target < len(self.node_ids))
+        valid[valid] = (self.node_ids[source[valid]] == start_ids[valid]) & (self.node_ids[target[valid]] == end_ids[valid])
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)[valid]
+        order = np.argsort(edge_ids, kind='stable')
+        self.edge_ids = edge_ids[order]
+        self.edge_source = source[valid][order].astype(np.int32)
+        self.edge_target = target[valid][order].astype(np.int32)
+        self.edge_types = np.asarray(type_codes, dtype=np.int32)[valid][order]
+        self.out_offsets, self.out_edges = _group(self.edge_source, len(self.node_ids))
+        self.in_offsets, self.in_edges = _group(self.edge_target, len(self.node_ids))
+        self.node_alive = np.ones(len(self.node_ids), dtype=bool)
+        self.edge_alive = np.ones(len(self.edge_ids), dtype=bool)
+
+    def nbytes(self):
+        """全部数组占用的字节数，以及其中与关系数量成正比的部分"""
+        edge_arrays = (self.edge_ids, self.edge_source, self.edge_target, self.edge_types,
+                       self.out_edges, self.in_edges, self.edge_alive)
+        node_arrays = (self.node_ids, self.out_offsets, self.in_offsets, self.node_alive)
+        edge_bytes = sum(array.nbytes for array in edge_arrays)
+        return edge_bytes + sum(array.nbytes for array in node_arrays), edge_bytes
+
+    def adjacent(self, positions, direction):
+        """返回位置为 positions 的节点在一个方向上的 (节点位置, 关系下标) 两个数组，包含已删除的关系"""
+        if direction == "out":
+            offsets, edges = self.out_offsets, self.out_edges
+        else:
+            offsets, edges = self.in_offsets, self.in_edges
+        starts = offsets[positions]
+        counts = offsets[positions + 1] - starts
+        # 把每个节点的 [start, end) 区间展开为连续的下标
+        index = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return np.repeat(positions, counts), edges[index]
+
+
+class GraphMirror:
+    """图拓扑的内存镜像，查询在镜像不可用时返回 None
+
+    Args:
+        graph (Neo4jGraph): 用于加载拓扑和读取版本号的图实例
+        max_stale (float): 版本号落后超过该秒数时在后台重新加载
+        max_age (float): 加载超过该秒数后在后台重新加载一次，补上没有经过事件总线的修改；0 表示不定期重新加载
+        compact_threshold (int): 增量层的节点、关系和删除数量之和超过该值时合并进数组
+    """
+
+    def __init__(self, graph, max_stale=5.0, max_age=600.0, compact_threshold=10000):
+        self.graph = graph
+        self.max_stale = max_stale
+        self.max_age = max_age
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+        self._topology = None
+        self._types = []            # 关系类型表
+        self._type_codes = {}       # 关系类型 -> 在类型表中的下标
+        self._reset_overlay()
+        self._version = None        # 镜像已包含全部修改的最高图版本号
+        self._applied = set()       # 已应用、但更早的版本尚未全部应用的版本号
+        self._lag = None            # (开始落后的时间, 当时的图版本号)
+        self._failed_at = None      # 最近一次加载失败的时间，max_stale 秒内不重试
+        self.last_error = None
+        self._building = False
+        self._pending = None        # 加载期间收到的事件，加载完成后重新应用
+        self._generation = 0        # 每次 graph_reset 递增，加载期间图被重建时丢弃加载结果
+        self._built_at = 0.0
+        self.stats_counters = {'builds': 0, 'build_failures': 0, 'compactions': 0, 'queries': 0, 'fallbacks': 0,
+                               'build_seconds': 0.0}
+
+    def _reset_overlay(self):
+        self._added_nodes = set()
+        self._added_edges = {}      # 关系ID -> (起点ID, 终点ID, 类型下标)
+        self._added_adjacency = {"out": {}, "in": {}}  # 节点ID -> 增量层中该节点的关系ID集合
+        self._deleted = 0
+
+    def _type_code(self, rel_type):
+        code = self._type_codes.get(rel_type)
+        if code is None:
+            code = self._type_codes[rel_type] = len(self._types)
+            self._types.append(rel_type)
+        return code
+
+    # ---------- 加载 ----------
+
+    def refresh(self):
+        """在后台重新加载镜像，已在加载时不重复加载"""
+        with self._lock:
+            self._start_build()
+
+    def _start_build(self, frozen=None):
+        """在后台重新加载，传入 frozen（见 _frozen）时改为合并增量层；调用时持有 _lock"""
+        if self._building:
+            return
+        self._building = True
+        self._pending = []
+        threading.Thread(target=self._build, args=(frozen,), daemon=True).start()
+
+    def _frozen(self):
+        """复制删除标记、关系类型和增量层，供后台合并使用；其余数组构建后不再修改，直接共用。调用时持有 _lock"""
+        topology = self._topology
+        return (topology, topology.node_alive.copy(), topology.edge_alive.copy(), topology.edge_types.copy(),
+                set(self._added_nodes), dict(self._added_edges))
+
+    def _build(self, frozen=None):
+        started = time.perf_counter()
+        with self._lock:
+            generation = self._generation
+        version = self.graph.graph_version
+        try:
+            if frozen is not None:
+                topology = _Topology(*_live_arrays(*frozen))
+            else:
+                data = self.graph.export_topology()
+                with self._lock:
+                    type_codes = [self._type_code(rel_type) for rel_type in data['types']]
+                topology = _Topology(data['node_ids'], data['rel_ids'], data['start_node_ids'],
+                                     data['end_node_ids'], type_codes)
+        except Exception as e:
+            # 加载失败时镜像保持不可用，查询继续使用 Cypher，错误记录在 stats 中
+            with self._lock:
+                self._building = False
+                self._pending = None
+                self._failed_at = time.monotonic()
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.stats_counters['build_failures'] += 1
+            return
+
+        with self._lock:
+            self._building = False
+            pending, self._pending = self._pending, None
+            if generation != self._generation:
+                # 加载期间图被整体重建，结果已经过时
+                self._start_build()
+                return
+            self._topology = topology
+            self._reset_overlay()
+            if frozen is not None:
+                # 合并结果与复制时的镜像相同，版本号不变，复制之后收到的事件在下面重新应用
+                self.stats_counters['compactions'] += 1
+            else:
+                # 版本号在加载前读取，不大于它的写入都已包含在加载结果中
+                self._version = version
+                self._applied = {applied for applied in self._applied if applied > version}
+                self._lag = None
+                self._failed_at = None
+                self.last_error = None
+                self._built_at = time.monotonic()
+                self.stats_counters['builds'] += 1
+                self.stats_counters['build_seconds'] = time.perf_counter() - started
+            for event, data in pending:
+                self._apply(event, data)
+
+    # ---------- 增量维护 ----------
+
+    def on_event(self, event, data):
+        """作为 EVENTS 的订阅者维护镜像"""
+        with self._lock:
+            if event == 'graph_reset':
+                self._topology = None
+                self._generation += 1
+                self._start_build()
+                return
+            if self._pending is not None:
+                self._pending.append((event, data))
+            if self._topology is not None:
+                self._apply(event, data)
+                if len(self._added_nodes) + len(self._added_edges) + self._deleted > self.compact_threshold:
+                    self._start_build(self._frozen())
+
+    def _apply(self, event, data):
+        items = data['events'] if event == 'graph_batch' else [{'event': event, 'data': data}]
+        for item in items:
+            kind, item_data = item['event'], item['data']
+            if kind == 'node_created':
+                self._add_node(item_data['id'])
+            elif kind == 'node_deleted':
+                self._remove_node(item_data['id'])
+            elif kind == 'relationship_created':
+                self._add_edge(item_data['id'], item_data['start_node_id'], item_data['end_node_id'],
+                               item_data['type'])
+            elif kind == 'relationship_deleted':
+                self._remove_edge(item_data['id'])
+            elif kind == 'relationship_updated' and 'type' in item_data:
+                self._retype_edge(item_data['id'], item_data['type'])
+        self._advance(data.get('versions', ()))
+
+    def _advance(self, versions):
+        """记录已应用的版本号，只在更早的版本都已应用时推进 _version；调用时持有 _lock"""
+        self._applied.update(version for version in versions if version > self._version)
+        while self._version + 1 in self._applied:
+            self._version += 1
+            self._applied.discard(self._version)
+
+    def _add_node(self, node_id):
+        position = _find(self._topology.node_ids, node_id)
+        if position is None:
+            self._added_nodes.add(node_id)
+        else:
+            # ID 可能被重用，原节点的关系已随原节点删除
+            self._topology.node_alive[position] = True
+
+    def _remove_node(self, node_id):
+        """删除节点以及与它相连的关系，与 DETACH DELETE 一致"""
+        topology = self._topology
+        position = _find(topology.node_ids, node_id)
+        if position is not None and topology.node_alive[position]:
+            topology.node_alive[position] = False
+            positions = np.asarray([position])
+            for direction in ("out", "in"):
+                _, edges = topology.adjacent(positions, direction)
+                self._deleted += int(topology.edge_alive[edges].sum())
+                topology.edge_alive[edges] = False
+        self._added_nodes.discard(node_id)
+        for direction in ("out", "in"):
+            for rel_id in list(self._added_adjacency[direction].get(node_id, ())):
+                self._remove_added_edge(rel_id)
+
+    def _add_edge(self, rel_id, start_node_id, end_node_id, rel_type):
+        topology = self._topology
+        code = self._type_code(rel_type)
+        index = _find(topology.edge_ids, rel_id)
+        if index is not None and topology.edge_alive[index]:
+            if (topology.node_ids[topology.edge_source[index]] == start_node_id
+                    and topology.node_ids[topology.edge_target[index]] == end_node_id):
+                # 加载结果中已经包含这个关系
+                topology.edge_types[index] = code
+                return
+            topology.edge_alive[index] = False
+            self._deleted += 1
+        self._remove_added_edge(rel_id)
+        self._added_edges[rel_id] = (start_node_id, end_node_id, code)
+        self._added_adjacency["out"].setdefault(start_node_id, set()).add(rel_id)
+        self._added_adjacency["in"].setdefault(end_node_id, set()).add(rel_id)
+
+    def _remove_added_edge(self, rel_id):
+        edge = self._added_edges.pop(rel_id, None)
+        if edge is None:
+            return
+        for direction, node_id in (("out", edge[0]), ("in", edge[1])):
+            rel_ids = self._added_adjacency[direction][node_id]
+            rel_ids.discard(rel_id)
+            if not rel_ids:
+                del self._added_adjacency[direction][node_id]
+
+    def _remove_edge(self, rel_id):
+        if rel_id in self._added_edges:
+            self._remove_added_edge(rel_id)
+            return
+        index = _find(self._topology.edge_ids, rel_id)
+        if index is not None and self._topology.edge_alive[index]:
+            self._topology.edge_alive[index] = False
+            self._deleted += 1
+
+    def _retype_edge(self, rel_id, rel_type):
+        code = self._type_code(rel_type)
+        if rel_id in self._added_edges:
+            start_node_id, end_node_id, _ = self._added_edges[rel_id]
+            self._added_edges[rel_id] = (start_node_id, end_node_id, code)
+            return
+        index = _find(self._topology.edge_ids, rel_id)
+        if index is not None:
+            self._topology.edge_types[index] = code
+
+    # ---------- 查询 ----------
+
+    def _usable(self):
+        """镜像是否与图同步，不同步时按需触发重新加载；调用时持有 _lock"""
+        self.stats_counters['queries'] += 1
+        now = time.monotonic()
+        if self._topology is None:
+            if self._failed_at is None or now - self._failed_at > self.max_stale:
+                self._start_build()
+        elif self._version < self.graph.graph_version:
+            if self._lag is None or self._version >= self._lag[1]:
+                # 开始落后，或者上次落后时缺少的版本都已应用，重新计时
+                self._lag = (now, self.graph.graph_version)
+            elif now - self._lag[0] > self.max_stale:
+                self._start_build()
+        else:
+            if self.max_age and now - self._built_at > self.max_age:
+                self._start_build()
+            return True
+        self.stats_counters['fallbacks'] += 1
+        return False
+
+    def _neighbors(self, node_ids, direction, type_codes=None):
+        """返回 node_ids 的一跳邻居：(起点ID, 关系ID, 邻居ID) 三个列表，已删除的关系被忽略
+
+        direction 为 'in' 时起点ID是 node_ids 中的节点，邻居是关系的起点。
+        """
+        topology = self._topology
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        positions = np.searchsorted(topology.node_ids, node_ids)
+        found = positions < len(topology.node_ids)
+        found[found] = topology.node_ids[positions[found]] == node_ids[found]
+        positions = positions[found]
+        positions = positions[topology.node_alive[positions]]
+
+        sources, rel_ids, neighbors = [], [], []
+        for side in (("out", "in") if direction == "both" else (direction,)):
+            source_positions, edges = topology.adjacent(positions, side)
+            keep = topology.edge_alive[edges]
+            if type_codes is not None:
+                keep &= np.isin(topology.edge_types[edges], type_codes)
+            edges = edges[keep]
+            other = topology.edge_target[edges] if side == "out" else topology.edge_source[edges]
+            sources += topology.node_ids[source_positions[keep]].tolist()
+            rel_ids += topology.edge_ids[edges].tolist()
+            neighbors += topology.node_ids[other].tolist()
+
+            adjacency = self._added_adjacency[side]
+            if adjacency:
+                for node_id in node_ids.tolist():
+                    for rel_id in adjacency.get(node_id, ()):
+                        start_node_id, end_node_id, code = self._added_edges[rel_id]
+                        if type_codes is None or code in type_codes:
+                            sources.append(node_id)
+                            rel_ids.append(rel_id)
+                            neighbors.append(end_node_id if side == "out" else start_node_id)
+        return sources, rel_ids, neighbors
+
+    def nearby_ids(self, start_node_id, max_depth, frontier_limit, rng=None):
+        """与 Neo4jGraph.find_nodes_by_id_and_length 相同地沿出边逐层扩展，返回到达的节点ID
+
+        边界超过 frontier_limit 时保留ID最小的节点，传入 rng 时改为随机保留，见 _next_frontier。
+
+        Returns:
+            list[int] | None: 按到达的跳数排列的节点ID（不含起始节点），镜像不可用时为 None
+        """
+        with self._lock:
+            if not self._usable():
+                return None
+            expansion = _NeighborhoodExpansion(start_node_id, max_depth, frontier_limit, rng)
+            while not expansion.done:
+                expansion.advance(self._neighbors(expansion.frontier, "out")[2])
+            return expansion.reached
+
+    def shortest_path(self, start_node_id, end_node_id, max_depth, direction="out", rel_types=None):
+        """按跳数最短的一条路径，方向和关系类型的含义同 Neo4jGraph.find_paths_by_id
+
+        Returns:
+            tuple[list[int], list[int]] | list | None: (节点ID列表, 关系ID列表)，不可达时为空列表，
+            镜像不可用时为 None
+        Raises:
+            ValueError: direction 不合法
+        """
+        if direction not in _DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(_DIRECTIONS)}")
+        with self._lock:
+            if not self._usable():
+                return None
+            type_codes = None
+            if rel_types:
+                type_codes = [self._type_codes[t] for t in rel_types if t in self._type_codes]
+                if not type_codes:
+                    return []
+            parents = {start_node_id: None}     # 节点ID -> (上一个节点ID, 关系ID)
+            frontier = [start_node_id]
+            for _ in range(max_depth):
+                next_frontier = []
+                for source, rel_id, neighbor in zip(*self._neighbors(frontier, direction, type_codes)):
+                    if neighbor in parents:
+                        continue
+                    parents[neighbor] = (source, rel_id)
+                    if neighbor == end_node_id:
+                        return self._trace(parents, end_node_id)
+                    next_frontier.append(neighbor)
+                if not next_frontier:
+                    break
+                frontier = next_frontier
+            return []
+
+    def edge_list(self):
+        """返回当前全部节点ID以及关系的起点ID、终点ID数组，镜像不可用时为 None"""
+        with self._lock:
+            if not self._usable():
+                return None
+            topology = self._topology
+            node_ids, _, start_ids, end_ids, _ = _live_arrays(topology, topology.node_alive, topology.edge_alive,
+                                                              topology.edge_types, self._added_nodes,
+                                                              self._added_edges)
+            return {'node_ids': node_ids, 'start_node_ids': start_ids, 'end_node_ids': end_ids}
+
+    @staticmethod
+    def _trace(parents, end_node_id):
+        node_ids, rel_ids = [end_node_id], []
+        while parents[node_ids[-1]] is not None:
+            node_id, rel_id = parents[node_ids[-1]]
+            node_ids.append(node_id)
+            rel_ids.append(rel_id)
+        return node_ids[::-1], rel_ids[::-1]
+
+    def stats(self):
+        """镜像的大小和内存占用，bytes_per_million_edges 只计算与关系数量成正比的数组"""
+        with self._lock:
+            topology = self._topology
+            result = {
+                'ready': topology is not None and self._version == self.graph.graph_version,
+                'building': self._building,
+                'version': self._version,
+                'last_error': self.last_error,
+                **self.stats_counters
+            }
+            if topology is None:
+                return result
+            total_bytes, edge_bytes = topology.nbytes()
+            result.update({
+                'nodes': int(topology.node_alive.sum()) + len(self._added_nodes),
+                'edges': int(topology.edge_alive.sum()) + len(self._added_edges),
+                'types': len(self._types),
+                'overlay': len(self._added_nodes) + len(self._added_edges) + self._deleted,
+                'bytes': total_bytes,
+                'bytes_per_million_edges': round(edge_bytes / len(topology.edge_ids) * 1e6)
+                if len(topology.edge_ids) else None,
+                'age': time.monotonic() - self._built_at
+            })
+            return result
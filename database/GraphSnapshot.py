@@ -0,0 +1,320 @@
+"""图快照的磁盘存储
+
+每个快照是 snapshots 目录下的一个子目录，按列存储：
+    meta.json               名称、创建时间、数量，以及标签组合、关系类型、属性名的字典表
+    node_ids.npy            原节点ID (int64)
+    node_fingerprints.npy   节点的内容指纹 (uint64)，用于与当前图比较差异
+    node_labels.npy         节点的标签组合在字典表中的下标 (int32)
+    node_prop_offsets.npy   第 i 个节点的属性在属性数组中的范围为 [offsets[i], offsets[i+1])
+    node_prop_keys.npy      属性名下标 (int32)
+    node_prop_values.npy    属性值下标 (int32)
+    edge_source.npy         关系起点在节点数组中的位置 (int32)
+    edge_target.npy         关系终点在节点数组中的位置 (int32)
+    edge_types.npy          关系类型下标 (int32)
+    edge_ids.npy            原关系ID (int64)
+    edge_fingerprints.npy   关系的内容指纹 (uint64)
+    edge_prop_offsets.npy / edge_prop_keys.npy / edge_prop_values.npy  关系属性，格式同节点
+    values.bin              去重后的属性值，每个值为一段 JSON 编码的 UTF-8 字节
+    value_offsets.npy       第 i 个属性值在 values.bin 中的范围为 [offsets[i], offsets[i+1])
+
+打开快照时数组以内存映射方式加载，只有读取到的节点和关系才会转换为字典。
+快照数据中没有指纹时（例如不是由 Graph.freeze() 生成）不写入指纹数组。
+写入时使用以 . 开头的临时目录，快照名称不能以 . 开头，列出快照时跳过这些目录。
+属性值按 JSON 存储，Neo4j 的时间、空间类型等无法用 JSON 表示的值会使保存失败并抛出 ValueError。
+"""
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+import numpy as np
+
+SNAPSHOT_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]*$')
+# 列出快照时返回的元数据
+SNAPSHOT_SUMMARY_KEYS = ('name', 'created', 'nodes', 'relationships', 'dropped_relationships', 'bytes',
+                         'journal_position')
+
+
+class _Interner:
+    """把值映射为连续的下标，相同的值共用一个下标"""
+
+    def __init__(self):
+        self.index = {}
+        self.items = []
+
+    def __call__(self, key, item=None):
+        position = self.index.get(key)
+        if position is None:
+            position = self.index[key] = len(self.items)
+            self.items.append(key if item is None else item)
+        return position
+
+
+def _encode_properties(items, keys, values):
+    """把属性字典列表编码为 (offsets, key_ids, value_ids) 三个数组"""
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    key_ids = []
+    value_ids = []
+    for i, properties in enumerate(items):
+        for key, value in properties.items():
+            try:
+                encoded = json.dumps(value, ensure_ascii=False, sort_keys=True)
+            except TypeError:
+                raise ValueError(f"Property {key} has a {type(value).__name__} value that cannot be stored in "
+                                 f"a snapshot, only JSON values are supported") from None
+            key_ids.append(keys(key))
+            value_ids.append(values(encoded))
+        offsets[i + 1] = len(key_ids)
+    return offsets, np.asarray(key_ids, dtype=np.int32), np.asarray(value_ids, dtype=np.int32)
+
+
+class _LazyRecords:
+    """按下标或切片读取快照中的节点或关系，读取时才转换为字典"""
+
+    def __init__(self, count, build):
+        self._count = count
+        self._build = build
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._build(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._build(index)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._build(i)
+
+
+class GraphSnapshot:
+    """以内存映射方式打开的快照，nodes 和 relationships 的格式与 Graph.freeze() 返回的相同"""
+
+    def __init__(self, path):
+        started = time.perf_counter()
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self._arrays = {
+            name[:-4]: np.load(os.path.join(path, name), mmap_mode='r')
+            for name in os.listdir(path) if name.endswith('.npy')
+        }
+        values_path = os.path.join(path, 'values.bin')
+        self._values = np.memmap(values_path, dtype=np.uint8, mode='r') if os.path.getsize(values_path) else b''
+        self._label_sets = self.meta['label_sets']
+        self._types = self.meta['types']
+        self._keys = self.meta['keys']
+        self.nodes = _LazyRecords(len(self._arrays['node_ids']), self._node)
+        self.relationships = _LazyRecords(len(self._arrays['edge_source']), self._relationship)
+        self.load_seconds = time.perf_counter() - started
+
+    def __getitem__(self, key):
+        """与 Graph.freeze() 返回的字典一样通过 snapshot['nodes'] 访问"""
+        if key not in ('nodes', 'relationships'):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def fingerprints(self):
+        """返回节点和关系的ID、指纹数组，快照中没有指纹时返回 None"""
+        if 'node_fingerprints' not in self._arrays:
+            return None
+        return {
+            'node_ids': self._arrays['node_ids'],
+            'node_fingerprints': self._arrays['node_fingerprints'],
+            'relationship_ids': self._arrays['edge_ids'],
+            'relationship_fingerprints': self._arrays['edge_fingerprints']
+        }
+
+    def _value(self, value_id):
+        offsets = self._arrays['value_offsets']
+        return json.loads(bytes(self._values[offsets[value_id]:offsets[value_id + 1]]).decode('utf-8'))
+
+    def _properties(self, prefix, i):
+        offsets = self._arrays[f'{prefix}_prop_offsets']
+        start, end = offsets[i], offsets[i + 1]
+        keys = self._arrays[f'{prefix}_prop_keys'][start:end]
+        values = self._arrays[f'{prefix}_prop_values'][start:end]
+        return {self._keys[key]: self._value(value) for key, value in zip(keys, values)}
+
+    def _node(self, i):
+        return {
+            'node_id': int(self._arrays['node_ids'][i]),
+            'labels': list(self._label_sets[self._arrays['node_labels'][i]]),
+            'properties': self._properties('node', i)
+        }
+
+    def _relationship(self, i):
+        node_ids = self._arrays['node_ids']
+        return {
+            'rel_id': int(self._arrays['edge_ids'][i]),
+            'type': self._types[self._arrays['edge_types'][i]],
+            'properties': self._properties('edge', i),
+            'start_node_id': int(node_ids[self._arrays['edge_source'][i]]),
+            'end_node_id': int(node_ids[self._arrays['edge_target'][i]])
+        }
+
+
+class SnapshotStore:
+    """管理 directory 下的命名快照
+
+    替换、删除、打开和列出快照共用一把锁，不会看到替换快照时两次改名之间的状态。
+    上次替换在两次改名之间中断留下的旧快照只在创建时恢复一次，见 _recover。
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._recover()
+
+    def _path(self, name):
+        if not SNAPSHOT_NAME_PATTERN.match(name or ''):
+            raise ValueError(f"Invalid snapshot name: {name}")
+        return os.path.join(self.directory, name)
+
+    def _work_path(self, name, kind):
+        """写入快照时使用的临时目录，kind 为 tmp（新内容）或 old（被替换的旧快照）"""
+        return os.path.join(self.directory, f'.{kind}-{name}')
+
+    def _recover(self):
+        """上次替换在两次改名之间中断时旧快照仍然完整，把它改回原名，并清理残留的临时目录"""
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.listdir(self.directory):
+            kind, _, name = entry[1:].partition('-')
+            if not entry.startswith('.') or kind not in ('tmp', 'old') or not SNAPSHOT_NAME_PATTERN.match(name):
+                continue
+            work_path = os.path.join(self.directory, entry)
+            path = os.path.join(self.directory, name)
+            if kind == 'old' and not os.path.exists(path):
+                os.replace(work_path, path)
+            else:
+                shutil.rmtree(work_path, ignore_errors=True)
+
+    def exists(self, name):
+        with self._lock:
+            return os.path.exists(os.path.join(self._path(name), 'meta.json'))
+
+    def list(self):
+        """返回所有快照的元数据，按创建时间排序"""
+        if not os.path.isdir(self.directory):
+            return []
+        snapshots = []
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if name.startswith('.'):
+                    continue
+                meta_path = os.path.join(self.directory, name, 'meta.json')
+                if os.path.exists(meta_path):
+                    with open(meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                    snapshots.append({key: meta.get(key) for key in SNAPSHOT_SUMMARY_KEYS})
+        return sorted(snapshots, key=lambda meta: meta['created'])
+
+    def save(self, name, snapshot, journal_position=None, measure_json=False):
+        """把 Graph.freeze() 返回的快照写入磁盘，同名快照被替换
+
+        端点不在快照节点中的关系不写入，数量记录在元数据的 dropped_relationships 中。
+
+        Args:
+            journal_position (int, optional): 快照对应的变更日志位置，从该快照重放日志时从这里开始
+            measure_json (bool): 是否另外计算同一快照按 JSON 序列化的大小 json_bytes，
+                                 需要把整个图再序列化一遍，只在比较存储格式时使用
+
+        Returns:
+            dict: 快照的元数据，包含磁盘大小 bytes 和写入用时 write_seconds
+        """
+        started = time.perf_counter()
+        path = self._path(name)
+        tmp_path = self._work_path(name, 'tmp')
+        old_path = self._work_path(name, 'old')
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        nodes, relationships = snapshot['nodes'], snapshot['relationships']
+        label_sets, types, keys, values = _Interner(), _Interner(), _Interner(), _Interner()
+        positions = {node['node_id']: i for i, node in enumerate(nodes)}
+        edges = [rel for rel in relationships
+                 if rel['start_node_id'] in positions and rel['end_node_id'] in positions]
+
+        arrays = {
+            'node_ids': np.asarray([node['node_id'] for node in nodes], dtype=np.int64),
+            'node_labels': np.asarray([label_sets(tuple(sorted(node['labels'])), sorted(node['labels']))
+                                       for node in nodes], dtype=np.int32),
+            'edge_source': np.asarray([positions[rel['start_node_id']] for rel in edges], dtype=np.int32),
+            'edge_target': np.asarray([positions[rel['end_node_id']] for rel in edges], dtype=np.int32),
+            'edge_types': np.asarray([types(rel['type']) for rel in edges], dtype=np.int32),
+            'edge_ids': np.asarray([rel['rel_id'] for rel in edges], dtype=np.int64),
+        }
+        if all('fingerprint' in item for item in nodes) and all('fingerprint' in rel for rel in edges):
+            arrays['node_fingerprints'] = np.asarray([node['fingerprint'] for node in nodes], dtype=np.uint64)
+            arrays['edge_fingerprints'] = np.asarray([rel['fingerprint'] for rel in edges], dtype=np.uint64)
+        try:
+            (arrays['node_prop_offsets'], arrays['node_prop_keys'],
+             arrays['node_prop_values']) = _encode_properties([node['properties'] for node in nodes], keys, values)
+            (arrays['edge_prop_offsets'], arrays['edge_prop_keys'],
+             arrays['edge_prop_values']) = _encode_properties([rel['properties'] for rel in edges], keys, values)
+        except ValueError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        encoded_values = [value.encode('utf-8') for value in values.items]
+        value_offsets = np.zeros(len(encoded_values) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded_values], out=value_offsets[1:])
+        arrays['value_offsets'] = value_offsets
+        with open(os.path.join(tmp_path, 'values.bin'), 'wb') as f:
+            for value in encoded_values:
+                f.write(value)
+        for array_name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f'{array_name}.npy'), array)
+
+        size = sum(os.path.getsize(os.path.join(tmp_path, file)) for file in os.listdir(tmp_path))
+        meta = {
+            'name': name,
+            'created': time.time(),
+            'nodes': len(nodes),
+            'relationships': len(edges),
+            'dropped_relationships': len(relationships) - len(edges),
+            'bytes': size,
+            'journal_position': journal_position,
+            'label_sets': label_sets.items,
+            'types': types.items,
+            'keys': keys.items
+        }
+        with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        # 写完后再替换：旧快照先改名留在一边，新快照改名到位后才删除旧快照，
+        # 任何时刻中断都至少保留一份完整的快照，见 _recover
+        with self._lock:
+            shutil.rmtree(old_path, ignore_errors=True)
+            if os.path.exists(path):
+                os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        stats = {key: meta[key] for key in SNAPSHOT_SUMMARY_KEYS}
+        if measure_json:
+            stats['json_bytes'] = len(json.dumps(snapshot, ensure_ascii=False).encode('utf-8'))
+        stats['write_seconds'] = time.perf_counter() - started
+        return stats
+
+    def open(self, name):
+        """以内存映射方式打开快照，快照不存在时抛出 KeyError"""
+        with self._lock:
+            if not self.exists(name):
+                raise KeyError(name)
+            return GraphSnapshot(self._path(name))
+
+    def delete(self, name):
+        """删除快照，快照不存在时返回 False"""
+        with self._lock:
+            if not self.exists(name):
+                return False
+            shutil.rmtree(self._path(name))
+            return True
@@ -0,0 +1,159 @@
+"""图变更日志
+
+作为 EVENTS 的订阅者把每个图变更事件追加写入本地日志，用于从快照重放到任意位置。
+日志按大小分段，每段是一个 JSONL 文件，文件名为该段第一条记录的序号，每条记录为
+{'seq': 序号, 'ts': 时间戳, 'event': 事件名, 'data': 事件数据}。
+
+这是提交后日志而不是预写日志：事件在 Neo4j 事务提交之后才发布并追加到日志，写入只进入文件缓冲区，
+由后台线程每隔 fsync_interval 秒统一 flush 和 fsync，写操作的线程不会等待磁盘。因此进程崩溃时
+已提交的写入最多丢失最后一个间隔内（以及提交与发布之间）的记录，重放得到的是崩溃前不久的状态。
+
+恢复快照会写入 event 为 graph_reset 的标记记录（整体重建时就是 graph_reset 事件本身，按差异恢复时
+由 graph_batch 中的 restore 给出），重放不会越过它；带 journal: False 的 graph_batch（重放日志时的写入）不记录。
+"""
+import json
+import os
+import threading
+import time
+
+SEGMENT_SUFFIX = '.jsonl'
+
+
+class MutationJournal:
+    """追加写入的分段变更日志
+
+    Args:
+        directory (str): 日志目录
+        segment_size (int): 单个分段的最大字节数，超过后切换到新分段
+        fsync_interval (float): 后台 fsync 的间隔秒数
+    """
+
+    def __init__(self, directory, segment_size=64 * 1024 * 1024, fsync_interval=1.0):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        os.makedirs(directory, exist_ok=True)
+        self.position = self._recover_position()
+        self._file = None
+        self._open_segment(self.position + 1, reuse_last=True)
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def _segment_starts(self):
+        """按顺序返回所有分段的起始序号"""
+        return sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+                      if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit())
+
+    def _segment_path(self, start_seq):
+        return os.path.join(self.directory, f'{start_seq:012d}{SEGMENT_SUFFIX}')
+
+    def _recover_position(self):
+        """从最后一个分段读取最后一条完整记录的序号，截掉崩溃时写了一半的记录"""
+        starts = self._segment_starts()
+        if not starts:
+            return 0
+        path = self._segment_path(starts[-1])
+        position = starts[-1] - 1
+        valid_bytes = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    position = json.loads(line)['seq']
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        return position
+
+    def _open_segment(self, start_seq, reuse_last=False):
+        starts = self._segment_starts()
+        if reuse_last and starts and os.path.getsize(self._segment_path(starts[-1])) < self.segment_size:
+            start_seq = starts[-1]
+        self._file = open(self._segment_path(start_seq), 'a', encoding='utf-8')
+
+    def __call__(self, event, data):
+        """作为 EVENTS 的订阅者记录事件，graph_batch 中的事件逐条记录
+
+        先序列化整批事件再分配序号，某个事件无法序列化时整批都不写入，序号不会出现空缺。
+        """
+        if event == 'graph_batch':
+            if data.get('journal') is False:
+                return
+            items = list(data['events'])
+            if data.get('restore') is not None:
+                items.insert(0, {'event': 'graph_reset', 'data': data['restore']})
+        else:
+            items = [{'event': event, 'data': data}]
+        if not items:
+            return
+        payloads = [(json.dumps(item['event']), json.dumps(item['data'], ensure_ascii=False)) for item in items]
+        with self._lock:
+            ts = json.dumps(time.time())
+            for event_name, payload in payloads:
+                self.position += 1
+                self._file.write(f'{{"seq": {self.position}, "ts": {ts}, "event": {event_name}, "data": {payload}}}\n')
+            self._dirty = True
+            if self._file.tell() >= self.segment_size:
+                self._sync()
+                self._file.close()
+                self._open_segment(self.position + 1)
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._dirty = False
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.fsync_interval):
+            with self._lock:
+                if self._dirty:
+                    try:
+                        self._sync()
+                    except OSError as e:
+                        print(f"Failed to sync mutation journal: {str(e)}")
+
+    def flush(self):
+        """立即把缓冲的记录写入磁盘"""
+        with self._lock:
+            if self._dirty:
+                self._sync()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._sync()
+            self._file.close()
+
+    def read(self, after=0, until=None):
+        """按顺序读取序号在 (after, until] 范围内的记录，until 为 None 时读到末尾"""
+        self.flush()
+        until = self.position if until is None else until
+        starts = self._segment_starts()
+        for i, start_seq in enumerate(starts):
+            next_start = starts[i + 1] if i + 1 < len(starts) else None
+            if next_start is not None and next_start <= after + 1:
+                continue
+            if start_seq > until:
+                return
+            with open(self._segment_path(start_seq), 'r', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record['seq'] > until:
+                        return
+                    if record['seq'] > after:
+                        yield record
+
+    def stats(self):
+        starts = self._segment_starts()
+        return {
+            'position': self.position,
+            'segments': [{'start': start_seq, 'bytes': os.path.getsize(self._segment_path(start_seq))}
+                         for start_seq in starts]
+        }
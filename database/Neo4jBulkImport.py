@@ -0,0 +1,240 @@
+"""把 JSONL/CSV 文件批量导入图数据库
+
+用法:
+    python -m database.Neo4jBulkImport nodes nodes.jsonl --batch-size 5000 --key-map keys.csv
+    python -m database.Neo4jBulkImport relationships relationships.csv --checkpoint rels.ckpt
+
+节点文件每行/每条记录包含:
+    key: 外部主键（导入关系时用它找到节点）
+    labels: 标签列表，CSV 中用分号分隔
+    properties: 属性字典；没有该字段时其余所有字段都作为属性
+关系文件每行/每条记录包含:
+    start, end: 两端节点的外部主键
+    type: 关系类型，默认为 CONNECTS_TO
+    key: 可选的关系外部主键
+    properties: 属性字典；没有该字段时其余所有字段都作为属性
+外部主键统一转换为字符串，JSONL 中的 1 与 CSV 中的 "1" 是同一个主键。
+
+输入按行流式读取，每批一个事务。每批提交后把读取位置写入检查点文件，
+导入中断后用相同参数重新运行即可从检查点继续。没有外部主键的记录使用 "<文件绝对路径>#<记录结束位置>"
+作为主键，批次已提交、检查点尚未写入时中断，重新导入这一批也不会产生重复的节点或关系。
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+NODE_FIELDS = ('key', 'labels')
+RELATIONSHIP_FIELDS = ('start', 'end', 'type', 'key')
+
+
+class _LineReader:
+    """按行读取文件并记录已读取的字节位置，用于写入检查点"""
+
+    def __init__(self, path, offset=0):
+        self.file = open(path, 'rb')
+        self.file.seek(offset)
+        self.offset = offset
+
+    def __iter__(self):
+        for line in self.file:
+            self.offset += len(line)
+            yield line.decode('utf-8')
+
+    def close(self):
+        self.file.close()
+
+
+def _split_fields(record, fields):
+    """拆分出固定字段，未提供 properties 时其余字段都作为属性"""
+    if 'properties' in record:
+        properties = record.get('properties') or {}
+    else:
+        properties = {k: v for k, v in record.items() if k not in fields and v not in (None, '')}
+    return properties
+
+
+def _key(value):
+    """外部主键统一为字符串，空值为 None"""
+    return str(value) if value not in ('', None) else None
+
+
+def _node_row(record, csv_format):
+    if csv_format:
+        # CSV 中标签列为空字符串时节点没有额外标签
+        labels = [label.strip() for label in (record.get('labels') or '').split(';') if label.strip()]
+    else:
+        labels = record.get('labels') or []
+    return {
+        'key': _key(record.get('key')),
+        'labels': labels,
+        'properties': _split_fields(record, NODE_FIELDS)
+    }
+
+
+def _relationship_row(record, csv_format):
+    return {
+        'start_key': _key(record['start']),
+        'end_key': _key(record['end']),
+        'type': record.get('type') or 'CONNECTS_TO',
+        'key': _key(record.get('key')),
+        'properties': _split_fields(record, RELATIONSHIP_FIELDS)
+    }
+
+
+def _read_records(reader, csv_format, header):
+    """逐条返回 (记录, 记录结束的文件位置)"""
+    if csv_format:
+        for row in csv.DictReader(iter(reader), fieldnames=header):
+            yield row, reader.offset
+    else:
+        for line in reader:
+            if line.strip():
+                yield json.loads(line), reader.offset
+
+
+def _keyed_rows(records, to_row, source):
+    """把记录转换为行，没有外部主键的行使用 source 和记录结束位置生成确定的主键"""
+    for record, end_offset in records:
+        row = to_row(record)
+        if row['key'] is None:
+            row['key'] = f"{source}#{end_offset}"
+        yield row
+
+
+def _read_csv_header(path):
+    with open(path, 'rb') as f:
+        first_line = f.readline()
+    header = next(csv.reader(io.StringIO(first_line.decode('utf-8-sig'))))
+    return header, len(first_line)
+
+
+def _load_checkpoint(path, input_path, kind):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('input') != os.path.abspath(input_path) or checkpoint.get('kind') != kind:
+        raise ValueError(f"检查点 {path} 不属于 {kind} 导入 {input_path}")
+    return checkpoint
+
+
+def _save_checkpoint(path, checkpoint):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def run_import(graph, kind, input_path, batch_size=1000, checkpoint_path=None,
+               key_map_path=None, input_format=None):
+    """执行一次导入
+
+    Args:
+        graph: Neo4jGraph 实例
+        kind: 'nodes' 或 'relationships'
+        input_path: JSONL 或 CSV 文件路径
+        batch_size: 每个事务写入的记录数量
+        checkpoint_path: 检查点文件路径，存在时从检查点继续
+        key_map_path: 节点导入时追加写入 "外部主键,节点ID" 的文件，没有外部主键的节点写入生成的主键
+        input_format: 'jsonl' 或 'csv'，默认根据文件扩展名判断
+    Returns:
+        dict: 导入统计
+    """
+    csv_format = (input_format or os.path.splitext(input_path)[1].lstrip('.').lower()) == 'csv'
+
+    header = None
+    offset = 0
+    if csv_format:
+        header, offset = _read_csv_header(input_path)
+
+    checkpoint = _load_checkpoint(checkpoint_path, input_path, kind)
+    if checkpoint:
+        offset = checkpoint['offset']
+        print(f"从检查点继续：已导入 {checkpoint['rows']} 条，文件位置 {offset}")
+    else:
+        checkpoint = {'input': os.path.abspath(input_path), 'kind': kind, 'offset': offset, 'rows': 0}
+
+    reader = _LineReader(input_path, offset)
+    key_map = open(key_map_path, 'a', encoding='utf-8', newline='') if key_map_path and kind == 'nodes' else None
+    key_map_writer = csv.writer(key_map) if key_map else None
+    file_size = os.path.getsize(input_path)
+    started = time.perf_counter()
+    resumed_rows = checkpoint['rows']
+
+    def on_batch(batch, result):
+        if key_map_writer:
+            key_map_writer.writerows((item['key'], item['node_id']) for item in result if item['key'] is not None)
+            key_map.flush()
+        checkpoint['rows'] += len(batch)
+        checkpoint['offset'] = reader.offset
+        if checkpoint_path:
+            _save_checkpoint(checkpoint_path, checkpoint)
+        elapsed = time.perf_counter() - started
+        rate = (checkpoint['rows'] - resumed_rows) / elapsed if elapsed else 0.0
+        progress = reader.offset / file_size * 100 if file_size else 100.0
+        print(f"已导入 {checkpoint['rows']} 条 ({progress:.1f}%)，{rate:.0f} 条/秒")
+
+    try:
+        records = _read_records(reader, csv_format, header)
+        if kind == 'nodes':
+            rows = _keyed_rows(records, lambda record: _node_row(record, csv_format), checkpoint['input'])
+            graph.add_nodes_bulk(rows, batch_size, on_batch)
+        else:
+            rows = _keyed_rows(records, lambda record: _relationship_row(record, csv_format), checkpoint['input'])
+            graph.add_relationships_bulk(rows, batch_size, on_batch)
+    finally:
+        reader.close()
+        if key_map:
+            key_map.close()
+
+    elapsed = time.perf_counter() - started
+    imported = checkpoint['rows'] - resumed_rows
+    stats = {
+        'rows': checkpoint['rows'],
+        'imported': imported,
+        'seconds': elapsed,
+        'rows_per_second': imported / elapsed if elapsed else 0.0
+    }
+    print(f"导入完成：本次导入 {imported} 条，用时 {elapsed:.1f} 秒，{stats['rows_per_second']:.0f} 条/秒")
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把 JSONL/CSV 文件批量导入图数据库")
+    parser.add_argument('kind', choices=['nodes', 'relationships'], help="导入节点还是关系")
+    parser.add_argument('input', help="JSONL 或 CSV 文件路径")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="输入格式，默认根据扩展名判断")
+    parser.add_argument('--batch-size', type=int, default=1000, help="每个事务写入的记录数量")
+    parser.add_argument('--checkpoint', help="检查点文件路径，默认为 <input>.<kind>.ckpt")
+    parser.add_argument('--key-map', help="导入节点时追加写入 \"外部主键,节点ID\" 的 CSV 文件")
+    args = parser.parse_args(argv)
+
+    from database.Neo4jStuff import get_graph_instance
+    graph = get_graph_instance()
+    try:
+        run_import(
+            graph,
+            args.kind,
+            args.input,
+            batch_size=args.batch_size,
+            checkpoint_path=args.checkpoint or f"{args.input}.{args.kind}.ckpt",
+            key_map_path=args.key_map,
+            input_format=args.format
+        )
+    finally:
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
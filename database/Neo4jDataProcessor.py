@@ -1,78 +1,1207 @@
+import functools
 import os
+import random
 import sys
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional
 
+import numpy as np
+
 # 添加项目根目录到 Python 路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
+from database.DegreeIndex import DegreeIndex
+from database.GraphAnalytics import GraphAnalytics
+from database.GraphMirror import GraphMirror
+from database.MutationJournal import MutationJournal
+from database.NodeDedup import DuplicateFinder
 from database.Neo4jStuff import get_graph_instance
+from Server.config import Config
 GRAPH = get_graph_instance()
 
+
+class IdentityMap:
+    """进程级的对象身份映射，按ID缓存 Node/Link 对象
+
+    使用 LRU 淘汰，可选 TTL 过期，并记录命中/未命中次数。
+    index_fn 返回对象的二级键（例如关系两端的节点ID），用于按二级键精确失效。
+    """
+
+    def __init__(self, max_size=10000, ttl=None, index_fn=None):
+        self.max_size = max_size
+        self.ttl = ttl or None
+        self._index_fn = index_fn
+        self._entries = OrderedDict()  # key -> (obj, stored_at)
+        self._index = {}               # secondary key -> set(key)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """获取缓存对象，不存在或已过期时返回 None 并计为未命中"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[1] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key):
+        """获取缓存对象，不影响 LRU 顺序和命中统计"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def put(self, key, obj):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (obj, time.monotonic())
+            if self._index_fn:
+                for secondary in self._index_fn(obj):
+                    self._index.setdefault(secondary, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_by(self, secondary):
+        """失效所有二级键为 secondary 的缓存对象"""
+        with self._lock:
+            for key in list(self._index.get(secondary, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+
+    def _remove(self, key):
+        obj, _ = self._entries.pop(key)
+        if self._index_fn:
+            for secondary in self._index_fn(obj):
+                keys = self._index.get(secondary)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._index[secondary]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+NODE_CACHE = IdentityMap(Config.NODE_CACHE_SIZE, Config.CACHE_TTL)
+LINK_CACHE = IdentityMap(Config.LINK_CACHE_SIZE, Config.CACHE_TTL,
+                         index_fn=lambda link: {link.start_node_id, link.end_node_id})
+# 路径查询结果缓存，键中包含图版本号，写入后旧结果不再命中；TTL 用于兜底其他进程的写入
+PATH_CACHE = IdentityMap(Config.PATH_CACHE_SIZE, Config.PATH_CACHE_TTL)
+
+
+def cache_stats():
+    """返回节点和关系缓存的统计信息"""
+    return {
+        'nodes': NODE_CACHE.stats(),
+        'links': LINK_CACHE.stats(),
+        'paths': PATH_CACHE.stats(),
+        'sampler': NODE_SAMPLER.stats(),
+        'degrees': DEGREE_INDEX.stats(),
+        'analytics': GRAPH_ANALYTICS.stats(),
+        'mirror': GRAPH_MIRROR.stats() if GRAPH_MIRROR is not None else None
+    }
+
+class EventBus:
+    """进程内的图变更事件总线
+
+    事件为 node_created/node_updated/node_deleted、relationship_created/relationship_updated/
+    relationship_deleted，以及整个图被重建后的 graph_reset 事件。写操作通过 publish_changes
+    把一次写入的全部事件合并为一个 graph_batch 事件发布：{'events': [...], 'versions': [...]}，
+    versions 为这次写入产生的图版本号。订阅者在发布者的线程中被同步调用。
+    """
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """订阅事件，callback(event, data)"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers.remove(callback)
+
+    def publish(self, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event, data)
+            except Exception as e:
+                print(f"Event subscriber failed on {event}: {str(e)}")
+
+
+EVENTS = EventBus()
+
+
+def publish_changes(events, versions=None, journal=True, restore=None):
+    """把一次写操作的事件作为一个 graph_batch 事件发布，并带上当前线程尚未发布的图版本号
+
+    没有事件时仍然发布（events 为空），确认这些版本号已经处理完，订阅者据此判断是否落后于图版本号。
+    Args:
+        events (list[dict]): [{'event', 'data'}]
+        versions (list[int], optional): 额外的版本号
+        journal (bool): 为 False 时带上 journal: False，变更日志不记录这批事件（例如重放日志本身的写入）
+        restore (dict, optional): 这批事件来自恢复快照时的说明，变更日志在事件之前写入恢复标记
+    """
+    versions = list(versions or ()) + GRAPH.take_write_versions()
+    if events or versions or restore is not None:
+        data = {'events': events, 'versions': versions}
+        if not journal:
+            data['journal'] = False
+        if restore is not None:
+            data['restore'] = restore
+        EVENTS.publish('graph_batch', data)
+
+
+def _write_operation(method):
+    """写操作的装饰器：方法内的写会话产生的版本号随事件发布，方法结束时（包括抛出异常）
+    发布没有随事件发布的图版本号
+
+    写入失败或内容没有变化时不产生事件，写会话仍然递增了版本号，需要在这里确认。
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with GRAPH.collect_versions():
+            try:
+                return method(*args, **kwargs)
+            finally:
+                publish_changes([])
+    return wrapper
+
+
+def _relationship_deleted(record):
+    """关系删除事件的数据，包含两端节点ID，用于按订阅过滤"""
+    return {'id': record['rel_id'], 'start_node_id': record['start_node_id'], 'end_node_id': record['end_node_id']}
+
+
+def changed_fields(old_labels, old_properties, new_labels, new_properties):
+    """比较更新前后的标签和属性，只返回变化的部分
+
+    Returns:
+        dict: 可能包含 properties（新增或修改的属性）、removed_properties（被删除的属性名）
+              和 labels（标签有变化时的完整标签列表），没有变化时为空字典。
+              node_updated 事件会另外带上当前的完整标签，供按标签订阅的客户端过滤
+    """
+    changes = {}
+    properties = {key: value for key, value in new_properties.items()
+                  if key not in old_properties or old_properties[key] != value}
+    if properties:
+        changes['properties'] = properties
+    removed = [key for key in old_properties if key not in new_properties]
+    if removed:
+        changes['removed_properties'] = removed
+    if new_labels is not None and sorted(old_labels or []) != sorted(new_labels):
+        changes['labels'] = new_labels
+    return changes
+
+
+def _snapshot_fingerprints(snapshot):
+    """返回快照中节点和关系的ID、指纹数组，快照中没有指纹时返回 None"""
+    if hasattr(snapshot, 'fingerprints'):
+        return snapshot.fingerprints()
+    nodes, relationships = snapshot['nodes'], snapshot['relationships']
+    if not all('fingerprint' in item for item in nodes) or not all('fingerprint' in rel for rel in relationships):
+        return None
+    return {
+        'node_ids': np.asarray([node['node_id'] for node in nodes], dtype=np.int64),
+        'node_fingerprints': np.asarray([node['fingerprint'] for node in nodes], dtype=np.uint64),
+        'relationship_ids': np.asarray([rel['rel_id'] for rel in relationships], dtype=np.int64),
+        'relationship_fingerprints': np.asarray([rel['fingerprint'] for rel in relationships], dtype=np.uint64)
+    }
+
+
+def _diff_fingerprints(ids, fingerprints, current):
+    """比较快照与当前图的指纹
+
+    Args:
+        ids, fingerprints: 快照中的ID和指纹数组
+        current (dict): 当前图中的 ID -> 指纹
+    Returns:
+        dict: create 为快照中有而当前图中没有的快照下标，revert 为两边都有但内容不同的快照下标，
+              delete 为当前图中多出的ID
+    """
+    current_ids = np.fromiter(current.keys(), dtype=np.int64, count=len(current))
+    current_fingerprints = np.fromiter(current.values(), dtype=np.uint64, count=len(current))
+    _, snapshot_index, current_index = np.intersect1d(ids, current_ids, assume_unique=True, return_indices=True)
+    changed = fingerprints[snapshot_index] != current_fingerprints[current_index]
+    missing = np.ones(len(ids), dtype=bool)
+    missing[snapshot_index] = False
+    extra = np.ones(len(current_ids), dtype=bool)
+    extra[current_index] = False
+    return {
+        'create': np.flatnonzero(missing).tolist(),
+        'revert': snapshot_index[changed].tolist(),
+        'delete': current_ids[extra].tolist()
+    }
+
+
+def _journal_operation(record, id_maps, created):
+    """把一条变更日志记录转换为 execute_batch 操作
+
+    本批次中创建的对象用 ref 引用，其余ID通过 id_maps 转换为当前ID。
+    """
+    event, data = record['event'], record['data']
+    kind, action = event.rsplit('_', 1)
+    journal_id = data['id']
+
+    def resolve(item_kind, item_id):
+        if item_id in created[item_kind]:
+            return f'{item_kind}:{item_id}'
+        return id_maps[item_kind].get(item_id, item_id)
+
+    properties = dict(data.get('properties') or {})
+    properties.update((key, None) for key in data.get('removed_properties', []))
+    if action == 'created':
+        created[kind].add(journal_id)
+        operation = {'op': f'create_{kind}', 'ref': f'{kind}:{journal_id}', 'properties': properties}
+        if kind == 'node':
+            operation['labels'] = data.get('labels') or []
+        else:
+            operation['type'] = data['type']
+            operation['start'] = resolve('node', data['start_node_id'])
+            operation['end'] = resolve('node', data['end_node_id'])
+    elif action == 'updated':
+        operation = {'op': f'update_{kind}', 'id': resolve(kind, journal_id), 'properties': properties}
+        if kind == 'node' and 'labels' in data:
+            operation['labels'] = data['labels']
+        if kind == 'relationship' and 'type' in data:
+            operation['type'] = data['type']
+    else:
+        operation = {'op': f'delete_{kind}', 'id': resolve(kind, journal_id)}
+        created[kind].discard(journal_id)
+    operation['journal_id'] = journal_id
+    return operation
+
+
+def scan_fingerprints(chunk_size=None):
+    """按ID区间分块读取当前图中全部节点和关系的内容指纹
+
+    Returns:
+        tuple[dict, dict]: 节点ID -> 指纹，关系ID -> (指纹, 起点ID, 终点ID)
+    """
+    chunk_size = chunk_size or Config.FINGERPRINT_CHUNK_SIZE
+    max_ids = GRAPH.get_max_ids()
+    tables = []
+    for max_id, fetch in ((max_ids['node'], GRAPH.get_node_fingerprints),
+                          (max_ids['relationship'], GRAPH.get_relationship_fingerprints)):
+        fingerprints = {}
+        for start_id in range(0, max_id + 1, chunk_size):
+            fingerprints.update(fetch(start_id, start_id + chunk_size))
+        tables.append(fingerprints)
+    return tables[0], tables[1]
+
+
+class ExternalChangeWatcher:
+    """检测应用之外（例如直接在 Neo4j 中）对图的修改并发布到 EVENTS
+
+    每次检测按ID区间分块读取 (ID, 内容指纹)，与内存中的指纹表比较，只为新增或内容变化的
+    ID 读取完整记录。应用内的写操作已经直接发布事件，观察者订阅这些事件记录涉及的ID，
+    下一次检测时只更新这些ID的指纹而不重复发布。
+
+    检测间隔自适应：有变化后缩短到 min_interval，连续无变化时逐次加倍直到 max_interval。
+    调用 pause() 后（以及第一次检测之前）不记录写操作涉及的ID，恢复检测时重新建立指纹表；
+    两次检测之间记录的ID超过 max_touched 时同样放弃记录，下一次检测重新建立指纹表。
+    """
+
+    def __init__(self, min_interval=None, max_interval=None, chunk_size=None, max_touched=None):
+        self.min_interval = min_interval or Config.CHANGE_POLL_MIN_INTERVAL
+        self.max_interval = max_interval or Config.CHANGE_POLL_MAX_INTERVAL
+        self.chunk_size = chunk_size or Config.FINGERPRINT_CHUNK_SIZE
+        self.max_touched = max_touched or Config.CHANGE_TOUCHED_LIMIT
+        self.interval = self.min_interval
+        self._lock = threading.Lock()
+        self._node_fingerprints = None   # 节点ID -> 指纹
+        self._relationship_fingerprints = None
+        self._touched_nodes = set()      # 上次检测后应用内写操作涉及的ID
+        self._touched_relationships = set()
+        self._rebaseline = False
+        self._paused = True
+        self.stats = {'polls': 0, 'events': 0, 'fetched': 0, 'rebaselines': 0, 'last_poll_ms': 0.0}
+        EVENTS.subscribe(self._on_event)
+
+    def pause(self):
+        """暂停检测，不再记录写操作涉及的ID；之后的 poll() 重新建立指纹表"""
+        with self._lock:
+            self._paused = True
+            self._touched_nodes = set()
+            self._touched_relationships = set()
+
+    def _on_event(self, event, data):
+        items = data['events'] if event == 'graph_batch' else [{'event': event, 'data': data}]
+        with self._lock:
+            if self._paused:
+                return
+            if event == 'graph_reset':
+                # 图已被整体重建，下一次检测重新建立指纹表
+                self._rebaseline = True
+                return
+            for item in items:
+                touched = self._touched_nodes if item['event'].startswith('node_') else self._touched_relationships
+                touched.add(item['data']['id'])
+            if len(self._touched_nodes) + len(self._touched_relationships) > self.max_touched:
+                # 长时间没有检测，放弃逐个记录，下一次检测重新建立指纹表
+                self._touched_nodes = set()
+                self._touched_relationships = set()
+                self._rebaseline = True
+        # 应用内有写入，说明图正在被编辑，尽快检测
+        self.interval = self.min_interval
+
+    @staticmethod
+    def _diff(known, current, touched):
+        """比较指纹表，返回新增、修改和删除的ID，应用内写操作涉及的ID已经发布过事件"""
+        new = [item_id for item_id in current if item_id not in known and item_id not in touched]
+        changed = [item_id for item_id, fingerprint in current.items()
+                   if item_id in known and known[item_id] != fingerprint and item_id not in touched]
+        deleted = [item_id for item_id in known if item_id not in current and item_id not in touched]
+        return new, changed, deleted
+
+    def poll(self):
+        """执行一次检测并更新 interval，返回发布的事件数量；第一次调用只建立指纹表"""
+        started = time.perf_counter()
+        with self._lock:
+            touched_nodes, self._touched_nodes = self._touched_nodes, set()
+            touched_relationships, self._touched_relationships = self._touched_relationships, set()
+            if self._rebaseline or self._paused:
+                self._node_fingerprints = None
+                self._rebaseline = False
+                self._paused = False
+        node_fingerprints, relationship_fingerprints = scan_fingerprints(self.chunk_size)
+
+        if self._node_fingerprints is None:
+            self._node_fingerprints = node_fingerprints
+            self._relationship_fingerprints = relationship_fingerprints
+            self.stats['rebaselines'] += 1
+            return 0
+
+        new_nodes, changed_nodes, deleted_nodes = self._diff(
+            self._node_fingerprints, node_fingerprints, touched_nodes)
+        known_relationships = self._relationship_fingerprints
+        new_relationships, changed_relationships, deleted_relationships = self._diff(
+            known_relationships, relationship_fingerprints, touched_relationships)
+        self._node_fingerprints = node_fingerprints
+        self._relationship_fingerprints = relationship_fingerprints
+
+        events = []
+        new_node_ids = set(new_nodes)
+        node_ids = new_nodes + changed_nodes
+        for record in (GRAPH.get_nodes_by_ids(node_ids) if node_ids else []):
+            if record['node_id'] in new_node_ids:
+                events.append(('node_created', Node.from_record(record).to_dict()))
+            else:
+                events.append(('node_updated', self._updated_event(record, NODE_CACHE.peek(record['node_id']))))
+                Node.from_record(record)
+        new_relationship_ids = set(new_relationships)
+        relationship_ids = new_relationships + changed_relationships
+        for record in (GRAPH.get_relationships_by_ids(relationship_ids) if relationship_ids else []):
+            if record['rel_id'] in new_relationship_ids:
+                events.append(('relationship_created', Link.from_record(record).to_dict(include_nodes=False)))
+            else:
+                events.append(('relationship_updated',
+                               self._updated_event(record, LINK_CACHE.peek(record['rel_id']))))
+                Link.from_record(record)
+        for rel_id in deleted_relationships:
+            # 两端节点ID来自上一次检测的指纹表，关系未被缓存时同样可以按订阅过滤
+            _, start_node_id, end_node_id = known_relationships[rel_id]
+            events.append(('relationship_deleted',
+                           {'id': rel_id, 'start_node_id': start_node_id, 'end_node_id': end_node_id}))
+        events += [('node_deleted', {'id': node_id}) for node_id in deleted_nodes]
+        for node_id in deleted_nodes:
+            NODE_CACHE.invalidate(node_id)
+            LINK_CACHE.invalidate_by(node_id)
+        for rel_id in deleted_relationships:
+            LINK_CACHE.invalidate(rel_id)
+
+        if events:
+            # 外部修改此时才被本进程看到，递增版本号使按版本号缓存的结果失效，镜像也据此确认已应用
+            version = GRAPH.advance_version()
+            publish_changes([{'event': event, 'data': data} for event, data in events], versions=[version])
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
+        self.stats['polls'] += 1
+        self.stats['events'] += len(events)
+        self.stats['fetched'] += len(node_ids) + len(relationship_ids)
+        self.stats['last_poll_ms'] = (time.perf_counter() - started) * 1000
+        return len(events)
+
+    @staticmethod
+    def _updated_event(record, cached):
+        """生成修改事件：已缓存时只包含变化的字段，否则包含完整内容；节点事件总是带有完整的标签列表"""
+        if 'node_id' in record:
+            if cached is not None:
+                return {'id': record['node_id'],
+                        **changed_fields(cached.labels, cached.properties, record['labels'], record['properties']),
+                        'labels': record['labels']}
+            return {'id': record['node_id'], 'labels': record['labels'], 'properties': record['properties']}
+        endpoints = {'id': record['rel_id'], 'start_node_id': record['start_node_id'],
+                     'end_node_id': record['end_node_id']}
+        if cached is not None:
+            return {**endpoints, **changed_fields(None, cached.properties, None, record['properties'])}
+        return {**endpoints, 'type': record['type'], 'properties': record['properties']}
+
+
+class NodeSampler:
+    """在内存中维护全部节点ID的表，随机抽样的开销只与样本数量有关
+
+    ID表在第一次抽样时按ID分页加载，之后通过订阅 EVENTS 增量维护；超过 refresh_interval 秒后
+    重新加载一次，补上没有经过事件总线的外部修改。抽中的ID在一次查询中读取节点，
+    已不存在的节点从表中移除并重新抽取。
+    """
+
+    def __init__(self, refresh_interval=None, page_size=None):
+        self.refresh_interval = Config.SAMPLER_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self.page_size = page_size or Config.SAMPLER_PAGE_SIZE
+        self._lock = threading.Lock()
+        self._ids = None        # 节点ID列表
+        self._positions = {}    # 节点ID -> 在列表中的位置
+        self._loaded_at = 0.0
+        EVENTS.subscribe(self._on_event)
+
+    def _on_event(self, event, data):
+        items = data['events'] if event == 'graph_batch' else [{'event': event, 'data': data}]
+        with self._lock:
+            if self._ids is None:
+                return
+            if event == 'graph_reset':
+                self._ids = None
+                return
+            for item in items:
+                if item['event'] == 'node_created':
+                    self._add(item['data']['id'])
+                elif item['event'] == 'node_deleted':
+                    self._remove(item['data']['id'])
+
+    def _add(self, node_id):
+        if node_id not in self._positions:
+            self._positions[node_id] = len(self._ids)
+            self._ids.append(node_id)
+
+    def _remove(self, node_id):
+        """用最后一个ID填补被删除的位置，O(1) 删除"""
+        position = self._positions.pop(node_id, None)
+        if position is None:
+            return
+        last = self._ids.pop()
+        if position < len(self._ids):
+            self._ids[position] = last
+            self._positions[last] = position
+
+    def _ensure_loaded(self):
+        with self._lock:
+            expired = self.refresh_interval and time.monotonic() - self._loaded_at > self.refresh_interval
+            if self._ids is not None and not expired:
+                return
+        # 加载期间不持有锁，避免阻塞发布事件的写操作
+        ids = []
+        after_id = None
+        while True:
+            page = GRAPH.get_node_ids(after_id, self.page_size)
+            ids += page
+            if len(page) < self.page_size:
+                break
+            after_id = page[-1]
+        with self._lock:
+            self._ids = ids
+            self._positions = {node_id: i for i, node_id in enumerate(ids)}
+            self._loaded_at = time.monotonic()
+
+    def _sample_ids(self, count, rng):
+        with self._lock:
+            if count >= len(self._ids):
+                return list(self._ids)
+            return [self._ids[i] for i in rng.sample(range(len(self._ids)), count)]
+
+    def sample(self, count, seed=None):
+        """随机抽取 count 个不重复的节点
+
+        Args:
+            count (int): 样本数量，超过节点总数时返回全部节点
+            seed (int, optional): 随机种子；图和ID表的变更顺序相同时，相同的种子得到相同的样本
+        Returns:
+            list[dict]: 节点字典，按抽样顺序排列
+        """
+        self._ensure_loaded()
+        rng = random.Random(seed)
+        for _ in range(3):
+            node_ids = self._sample_ids(count, rng)
+            records = {record['node_id']: record for record in GRAPH.get_nodes_by_ids(node_ids)} if node_ids else {}
+            missing = [node_id for node_id in node_ids if node_id not in records]
+            if not missing:
+                break
+            # 节点已在事件总线之外被删除，从表中移除后重新抽样
+            with self._lock:
+                for node_id in missing:
+                    self._remove(node_id)
+        return [records[node_id] for node_id in node_ids if node_id in records]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._ids) if self._ids is not None else None,
+                'age': time.monotonic() - self._loaded_at if self._ids is not None else None
+            }
+
+
+NODE_SAMPLER = NodeSampler()
+
+# 节点度数索引，用于孤立节点、连接数最多的节点和度数分布查询
+DEGREE_INDEX = DegreeIndex(GRAPH, Config.DEGREE_REFRESH_INTERVAL, Config.DEGREE_PAGE_SIZE)
+EVENTS.subscribe(DEGREE_INDEX.on_event)
+
+# 图拓扑的内存镜像，未启用时为 None，遍历全部使用 Cypher
+GRAPH_MIRROR = GraphMirror(GRAPH, Config.MIRROR_MAX_STALE, Config.MIRROR_MAX_AGE,
+                           Config.MIRROR_COMPACT_THRESHOLD) if Config.MIRROR_ENABLED else None
+if GRAPH_MIRROR is not None:
+    EVENTS.subscribe(GRAPH_MIRROR.on_event)
+
+# 变更日志：记录事件总线上的每个图变更，用于从快照重放到任意位置。在这里订阅，
+# 使 agent 等不经过 Web 服务的写入同样被记录；未启用时为 None
+JOURNAL = MutationJournal(Config.JOURNAL_DIR, Config.JOURNAL_SEGMENT_BYTES,
+                          Config.JOURNAL_FSYNC_INTERVAL) if Config.JOURNAL_ENABLED else None
+if JOURNAL is not None:
+    EVENTS.subscribe(JOURNAL)
+
+# 全图分析，结果按图版本号缓存
+GRAPH_ANALYTICS = GraphAnalytics(GRAPH, GRAPH_MIRROR, Config.ANALYTICS_CACHE_TTL, Config.ANALYTICS_BETWEENNESS_SAMPLES)
+
+# 重复节点检测，结果按 (图版本号, 阈值) 缓存；TTL 用于兜底其他进程的写入
+DUPLICATE_CACHE = IdentityMap(16, Config.ANALYTICS_CACHE_TTL)
+
+
+def _nodes_in_order(node_ids):
+    """在一次查询中按ID读取节点并保持 node_ids 的顺序，不存在的ID被忽略"""
+    records = {record['node_id']: record for record in GRAPH.get_nodes_by_ids(node_ids)} if node_ids else {}
+    return [records[node_id] for node_id in node_ids if node_id in records]
+
+
+def _mirror_paths(start_node_id, end_node_id, k, max_depth, direction, rel_types):
+    """用拓扑镜像查找最短路径，只处理 k 为 1 的情况；镜像不可用或与数据库不一致时返回 None"""
+    if GRAPH_MIRROR is None or int(k) > 1 or start_node_id == end_node_id:
+        return None
+    max_depth = GRAPH.path_max_depth if max_depth is None else max(1, min(int(max_depth), GRAPH.path_max_depth))
+    path = GRAPH_MIRROR.shortest_path(start_node_id, end_node_id, max_depth, direction, rel_types)
+    if not path:
+        return path
+    node_ids, rel_ids = path
+    nodes = _nodes_in_order(node_ids)
+    relationships = {record['rel_id']: record for record in GRAPH.get_relationships_by_ids(rel_ids)}
+    if len(nodes) < len(node_ids) or len(relationships) < len(rel_ids):
+        return None
+    return [{
+        'length': len(rel_ids),
+        'nodes': nodes,
+        'relationships': [relationships[rel_id] for rel_id in rel_ids]
+    }]
+
+
+def format_path(path):
+    """把路径格式化为 (ID:名字)-[:类型]->(ID:名字) 形式的字符串"""
+    def describe(node):
+        name = node['properties'].get('name')
+        return f"({node['node_id']}:{name})" if name is not None else f"({node['node_id']})"
+
+    parts = [describe(path['nodes'][0])]
+    for relationship, node in zip(path['relationships'], path['nodes'][1:]):
+        if relationship['start_node_id'] == node['node_id']:
+            parts.append(f"<-[:{relationship['type']}]-")
+        else:
+            parts.append(f"-[:{relationship['type']}]->")
+        parts.append(describe(node))
+    return "".join(parts)
+
 class Graph:
 
     def addNode():
         pass
 
+    @staticmethod
+    @_write_operation
+    def execute_batch(operations, journal=True):
+        """在一个事务中执行一组节点和关系操作，并根据写入结果同步缓存
+
+        操作格式见 Neo4jGraph.execute_batch；journal 为 False 时变更日志不记录这批事件。
+        Returns:
+            tuple[list[dict], list[dict]]: 每个操作的 {'op', 'ref', 'result'}，
+                以及合并后的事件列表（同时作为 graph_batch 事件发布）
+        Raises:
+            ValueError: 任一操作失败，此时所有操作都已回滚
+        """
+        results = GRAPH.execute_batch(operations)
+        for item in results:
+            op, record = item['op'], item['result']
+            if op in ('create_node', 'update_node'):
+                Node.from_record(record)
+                LINK_CACHE.invalidate_by(record['node_id'])
+            elif op == 'delete_node':
+                NODE_CACHE.invalidate(record['node_id'])
+                LINK_CACHE.invalidate_by(record['node_id'])
+            elif op == 'update_relationship':
+                LINK_CACHE.invalidate(record['previous_rel_id'])
+                Link.from_record(record)
+            elif op == 'delete_relationship':
+                LINK_CACHE.invalidate(record['rel_id'])
+        events = Graph.coalesce_batch_events(results)
+        publish_changes(events, journal=journal)
+        return results, events
+
+    @staticmethod
+    def freeze():
+        """在一个读事务中读取整个图作为快照
+
+        Returns:
+            dict: {'nodes': [节点字典], 'relationships': [关系字典（只包含两端节点ID）]}
+        """
+        return GRAPH.export_graph()
+
+    @staticmethod
+    @_write_operation
+    def restore(snapshot, progress=None, chunk_size=None):
+        """清空当前图并从快照重建
+
+        按阶段执行：分块 DETACH DELETE 清空图，分块 UNWIND 重建节点，再分块重建关系，
+        每块一个事务。进度记录在 progress 中，某一块失败时用同一个 progress 再次调用
+        会从失败的块继续，不会重复删除或创建已完成的部分。完成后发布 graph_reset 事件。
+
+        Args:
+            snapshot: freeze() 返回的快照，或以内存映射方式打开的 GraphSnapshot
+            progress (dict, optional): 上一次未完成的进度，默认从头开始
+            chunk_size (int, optional): 每个事务处理的数量，默认为 Config.RESET_CHUNK_SIZE
+        Returns:
+            dict: 进度，其中 timings 为各阶段用时（秒），deleted/nodes/relationships 为各阶段处理的数量，
+                node_id_map/relationship_id_map 为快照中的ID到重建后ID的映射
+        """
+        chunk_size = chunk_size or Config.RESET_CHUNK_SIZE
+        if progress is None:
+            progress = {}
+        progress.setdefault('phase', 'clear')
+        progress.setdefault('node_offset', 0)
+        progress.setdefault('relationship_offset', 0)
+        progress.setdefault('node_id_map', {})
+        progress.setdefault('relationship_id_map', {})
+        progress.setdefault('timings', {'clear': 0.0, 'nodes': 0.0, 'relationships': 0.0})
+        progress.setdefault('deleted', 0)
+        progress.setdefault('relationships', 0)
+        nodes, relationships = snapshot['nodes'], snapshot['relationships']
+        try:
+            if progress['phase'] == 'clear':
+                started = time.perf_counter()
+                try:
+                    def on_chunk(deleted):
+                        progress['deleted'] += deleted
+                    GRAPH.clear_graph(chunk_size, on_chunk)
+                finally:
+                    progress['timings']['clear'] += time.perf_counter() - started
+                progress['phase'] = 'nodes'
+
+            if progress['phase'] == 'nodes':
+                started = time.perf_counter()
+                try:
+                    while progress['node_offset'] < len(nodes):
+                        chunk = nodes[progress['node_offset']:progress['node_offset'] + chunk_size]
+                        progress['node_id_map'].update(GRAPH.restore_nodes(chunk))
+                        progress['node_offset'] += len(chunk)
+                finally:
+                    progress['timings']['nodes'] += time.perf_counter() - started
+                progress['phase'] = 'relationships'
+
+            if progress['phase'] == 'relationships':
+                started = time.perf_counter()
+                try:
+                    while progress['relationship_offset'] < len(relationships):
+                        offset = progress['relationship_offset']
+                        chunk = relationships[offset:offset + chunk_size]
+                        created = GRAPH.restore_relationships(chunk, progress['node_id_map'])
+                        progress['relationship_id_map'].update(
+                            (record['snapshot_rel_id'], record['rel_id']) for record in created)
+                        progress['relationships'] += len(created)
+                        progress['relationship_offset'] += len(chunk)
+                finally:
+                    progress['timings']['relationships'] += time.perf_counter() - started
+                progress['phase'] = 'done'
+        finally:
+            # 无论是否完成，图都已被整体修改，缓存和客户端需要重新加载
+            NODE_CACHE.clear()
+            LINK_CACHE.clear()
+            PATH_CACHE.clear()
+            # 订阅者收到 graph_reset 后整体重新加载，各块写入产生的版本号不需要逐个确认
+            GRAPH.take_write_versions()
+            EVENTS.publish('graph_reset', {'mode': 'full', 'phase': progress['phase']})
+        progress['nodes'] = progress['node_offset']
+        return progress
+
+    @staticmethod
+    @_write_operation
+    def restore_diff(snapshot, max_changes=None):
+        """只把与快照不同的节点和关系恢复为快照中的状态，未改动的节点和关系保持原ID
+
+        比较快照中的内容指纹和当前图的指纹：当前图多出的对象被删除，快照中有而当前图中没有的对象被重建，
+        内容不同的对象恢复为快照中的标签和属性。所有修改在一个事务中完成，并作为 graph_batch 事件发布。
+
+        Args:
+            snapshot: freeze() 返回的快照，或以内存映射方式打开的 GraphSnapshot
+            max_changes (int, optional): 差异数量上限，默认为 Config.RESET_DIFF_MAX_CHANGES
+        Returns:
+            dict | None: 各类修改的数量、各阶段用时（秒），以及被重建对象从快照中的ID到新ID的映射
+                node_id_map/relationship_id_map；快照中没有指纹或差异超过上限时返回 None，
+                此时应使用 restore() 整体重建
+        """
+        max_changes = Config.RESET_DIFF_MAX_CHANGES if max_changes is None else max_changes
+        expected = _snapshot_fingerprints(snapshot)
+        if expected is None:
+            return None
+        timings = {}
+        started = time.perf_counter()
+        node_fingerprints, relationship_fingerprints = scan_fingerprints()
+        timings['scan'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        node_diff = _diff_fingerprints(expected['node_ids'], expected['node_fingerprints'], node_fingerprints)
+        relationship_diff = _diff_fingerprints(expected['relationship_ids'], expected['relationship_fingerprints'],
+                                               {rel_id: entry[0] for rel_id, entry in relationship_fingerprints.items()})
+        if sum(len(ids) for diff in (node_diff, relationship_diff) for ids in diff.values()) > max_changes:
+            return None
+        nodes, relationships = snapshot['nodes'], snapshot['relationships']
+        diff = {
+            'delete_nodes': node_diff['delete'],
+            'delete_relationships': relationship_diff['delete'],
+            'revert_nodes': [nodes[i] for i in node_diff['revert']],
+            'revert_relationships': [relationships[i] for i in relationship_diff['revert']],
+            'create_nodes': [nodes[i] for i in node_diff['create']],
+            'create_relationships': [relationships[i] for i in relationship_diff['create']]
+        }
+        # 读取将被修改或删除的对象的当前内容，事件中只包含变化的字段
+        reverted_node_ids = [node['node_id'] for node in diff['revert_nodes']]
+        current_nodes = {record['node_id']: record for record in GRAPH.get_nodes_by_ids(reverted_node_ids)} \
+            if reverted_node_ids else {}
+        relationship_ids = [rel['rel_id'] for rel in diff['revert_relationships']] + diff['delete_relationships']
+        current_relationships = {record['rel_id']: record
+                                 for record in GRAPH.get_relationships_by_ids(relationship_ids)} \
+            if relationship_ids else {}
+        timings['diff'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = GRAPH.apply_graph_diff(diff)
+        timings['apply'] = time.perf_counter() - started
+
+        for node_id in diff['delete_nodes'] + reverted_node_ids:
+            NODE_CACHE.invalidate(node_id)
+            LINK_CACHE.invalidate_by(node_id)
+        for rel_id in relationship_ids:
+            LINK_CACHE.invalidate(rel_id)
+
+        events = [{'event': 'node_created',
+                   'data': {'id': result['node_id_map'][node['node_id']], 'labels': node['labels'],
+                            'properties': node['properties']}}
+                  for node in diff['create_nodes'] if node['node_id'] in result['node_id_map']]
+        for node in diff['revert_nodes']:
+            current = current_nodes.get(node['node_id'])
+            if current is not None:
+                changes = changed_fields(current['labels'], current['properties'], node['labels'], node['properties'])
+                events.append({'event': 'node_updated',
+                               'data': {'id': node['node_id'], **changes, 'labels': node['labels']}})
+        events += [{'event': 'relationship_created', 'data': Link.from_record(record).to_dict(include_nodes=False)}
+                   for record in result['relationships']]
+        for rel in diff['revert_relationships']:
+            current = current_relationships.get(rel['rel_id'])
+            if current is not None:
+                changes = changed_fields(None, current['properties'], None, rel['properties'])
+                events.append({'event': 'relationship_updated',
+                               'data': {**_relationship_deleted(current), **changes}})
+        events += [{'event': 'relationship_deleted',
+                    'data': _relationship_deleted(current_relationships[rel_id])
+                    if rel_id in current_relationships else {'id': rel_id}}
+                   for rel_id in diff['delete_relationships']]
+        events += [{'event': 'node_deleted', 'data': {'id': node_id}} for node_id in diff['delete_nodes']]
+        # 没有 graph_reset 事件，由 restore 让变更日志写入恢复标记
+        publish_changes(events, restore={'mode': 'diff'})
+
+        return {
+            'created_nodes': len(result['node_id_map']),
+            'reverted_nodes': len(diff['revert_nodes']),
+            'deleted_nodes': len(diff['delete_nodes']),
+            'created_relationships': len(result['relationships']),
+            'reverted_relationships': len(diff['revert_relationships']),
+            'deleted_relationships': len(diff['delete_relationships']),
+            'timings': timings,
+            'node_id_map': result['node_id_map'],
+            'relationship_id_map': {record['snapshot_rel_id']: record['rel_id'] for record in result['relationships']}
+        }
+
+    @staticmethod
+    def replay(records, node_id_map=None, relationship_id_map=None, batch_size=None):
+        """把变更日志中的记录重新应用到当前图
+
+        连续的记录合并为一个 execute_batch 事务。日志中的ID是记录写入时的ID，重放时创建的对象会得到新ID，
+        映射表记录日志中的ID到当前ID的对应关系，不在映射表中的ID视为未变化。
+        重放的写入照常发布事件，但不再写入变更日志，否则再次重放到末尾时这些记录会被应用两次；
+        重放之前恢复快照时写入的恢复标记使之前的日志不会被再次越过。
+
+        Args:
+            records: MutationJournal.read() 返回的记录
+            node_id_map (dict, optional): 日志节点ID -> 当前节点ID，例如从快照恢复时的ID映射，重放时会被更新
+            relationship_id_map (dict, optional): 日志关系ID -> 当前关系ID，重放时会被更新
+            batch_size (int, optional): 每个事务包含的记录数量，默认为 Config.JOURNAL_REPLAY_BATCH_SIZE
+        Returns:
+            dict: 重放的记录数量 replayed 和最后一条记录的序号 position
+        Raises:
+            ValueError: 某一批操作失败（该批已回滚，之前的批次已提交），或遇到 graph_reset 记录
+        """
+        batch_size = batch_size or Config.JOURNAL_REPLAY_BATCH_SIZE
+        id_maps = {'node': {} if node_id_map is None else node_id_map,
+                   'relationship': {} if relationship_id_map is None else relationship_id_map}
+        stats = {'replayed': 0, 'position': None}
+        batch = []
+
+        def apply():
+            operations = []
+            created = {'node': set(), 'relationship': set()}
+            for record in batch:
+                operation = _journal_operation(record, id_maps, created)
+                if operation is not None:
+                    operations.append(operation)
+            try:
+                results = Graph.execute_batch(operations, journal=False)[0] if operations else []
+            except ValueError as e:
+                raise ValueError(f"Replay failed after journal position {stats['position']}: {e}") from e
+            for operation, item in zip(operations, results):
+                if operation.get('journal_id') is None:
+                    continue
+                kind = 'node' if operation['op'].endswith('_node') else 'relationship'
+                new_id = item['result']['node_id'] if kind == 'node' else item['result']['rel_id']
+                if operation['op'].startswith('delete_'):
+                    id_maps[kind].pop(operation['journal_id'], None)
+                else:
+                    id_maps[kind][operation['journal_id']] = new_id
+            stats['replayed'] += len(batch)
+            stats['position'] = batch[-1]['seq']
+            batch.clear()
+
+        for record in records:
+            if record['event'] == 'graph_reset':
+                raise ValueError(f"Journal position {record['seq']} is a graph reset, "
+                                 f"replay from a snapshot taken after it")
+            batch.append(record)
+            if len(batch) >= batch_size:
+                apply()
+        if batch:
+            apply()
+        return stats
+
+    @staticmethod
+    def coalesce_batch_events(results):
+        """把批量操作的结果合并为最终状态的事件
+
+        同一批次内先创建后删除的对象不产生事件，多次更新只保留最后一次。
+        事件按先创建节点、再创建关系、先删除关系、再删除节点的顺序排列。
+        """
+        nodes = {}
+        relationships = {}
+
+        def mark(changes, key, state, data):
+            previous = changes.get(key)
+            if previous and previous[0] == 'created':
+                if state == 'deleted':
+                    del changes[key]
+                    return
+                state = 'created'
+            changes[key] = (state, data)
+
+        for item in results:
+            op, record = item['op'], item['result']
+            if op == 'create_node':
+                mark(nodes, record['node_id'], 'created', Node.from_record(record).to_dict())
+            elif op == 'update_node':
+                mark(nodes, record['node_id'], 'updated', Node.from_record(record).to_dict())
+            elif op == 'delete_node':
+                for rel in record['relationships']:
+                    mark(relationships, rel['rel_id'], 'deleted', _relationship_deleted(rel))
+                mark(nodes, record['node_id'], 'deleted', {'id': record['node_id']})
+            elif op == 'create_relationship':
+                mark(relationships, record['rel_id'], 'created',
+                     Link.from_record(record).to_dict(include_nodes=False))
+            elif op == 'update_relationship':
+                relationship = Link.from_record(record).to_dict(include_nodes=False)
+                if record['previous_rel_id'] != record['rel_id']:
+                    # 修改类型会重建关系
+                    mark(relationships, record['previous_rel_id'], 'deleted',
+                         {**_relationship_deleted(record), 'id': record['previous_rel_id']})
+                    mark(relationships, record['rel_id'], 'created', relationship)
+                else:
+                    mark(relationships, record['rel_id'], 'updated', relationship)
+            elif op == 'delete_relationship':
+                mark(relationships, record['rel_id'], 'deleted', _relationship_deleted(record))
+
+        order = [
+            ('node_created', nodes, 'created'),
+            ('node_updated', nodes, 'updated'),
+            ('relationship_created', relationships, 'created'),
+            ('relationship_updated', relationships, 'updated'),
+            ('relationship_deleted', relationships, 'deleted'),
+            ('node_deleted', nodes, 'deleted'),
+        ]
+        return [{'event': event, 'data': data}
+                for event, changes, wanted in order
+                for state, data in changes.values() if state == wanted]
+
+    @staticmethod
+    def analyze_components(kind="weak", limit=10):
+        """计算弱连通或强连通分量，返回值见 GraphAnalytics.components"""
+        return GRAPH_ANALYTICS.components(kind, limit)
+
+    @staticmethod
+    def check_reachability(node_ids, kind="weak"):
+        """按连通分量对节点分组，返回值见 GraphAnalytics.same_component"""
+        return GRAPH_ANALYTICS.same_component(node_ids, kind)
+
+    @staticmethod
+    def find_duplicates(threshold=None, limit=None, include_unnamed=False):
+        """扫描全部节点查找近似重复的节点簇
+        Args:
+            threshold (float, optional): 最小 Jaccard 相似度，默认为 Config.DEDUP_THRESHOLD
+            limit (int, optional): 返回的最多簇数量
+            include_unnamed (bool): 没有 name 属性的节点是否按其他属性参与检测
+        Returns:
+            dict: 见 DuplicateFinder.find
+        """
+        threshold = Config.DEDUP_THRESHOLD if threshold is None else threshold
+        key = (GRAPH.graph_version, threshold, include_unnamed)
+        result = DUPLICATE_CACHE.get(key)
+        if result is None:
+            finder = DuplicateFinder(threshold, Config.DEDUP_NUM_PERM, Config.DEDUP_BANDS,
+                                     Config.DEDUP_NGRAM, Config.DEDUP_MAX_BUCKET)
+            result = finder.find(GRAPH.iter_all_nodes(), include_unnamed=include_unnamed)
+            DUPLICATE_CACHE.put(key, result)
+        return {**result, 'clusters': result['clusters'][:limit] if limit is not None else result['clusters']}
+
+    @staticmethod
+    def rank_nodes(metric="pagerank", limit=10, **options):
+        """按中心性指标排列节点
+        Args:
+            metric (str): 'pagerank'、'degree' 或 'betweenness'
+            limit (int): 返回数量
+            options: 传给 GraphAnalytics 中对应方法的参数，例如 damping、samples、seed
+        Returns:
+            tuple[list[tuple[Node, float]], dict]: 按分数降序的 (节点对象, 分数)，以及迭代次数、图版本号等计算信息
+        Raises:
+            ValueError: metric 不合法
+        """
+        compute = {
+            'pagerank': GRAPH_ANALYTICS.pagerank,
+            'degree': GRAPH_ANALYTICS.degree_centrality,
+            'betweenness': GRAPH_ANALYTICS.betweenness
+        }.get(metric)
+        if compute is None:
+            raise ValueError("metric must be one of pagerank, degree, betweenness")
+        result = compute(limit, **options)
+        nodes = {node['node_id']: node for node in _nodes_in_order([node_id for node_id, _ in result['top']])}
+        ranked = [(Node.from_record(nodes[node_id]), score) for node_id, score in result['top'] if node_id in nodes]
+        return ranked, {key: value for key, value in result.items() if key != 'top'}
+
+    @staticmethod
+    def get_subgraph(seed_ids=None, q=None, depth=1, limit=None, labels=None, types=None):
+        """获取种子节点周围的子图，参数含义见 Neo4jGraph.get_subgraph
+
+        depth 和 limit 分别不超过 Config.SUBGRAPH_MAX_DEPTH 和 Config.SUBGRAPH_MAX_LIMIT。
+        Returns:
+            tuple[list[Node], list[Link], bool]: 节点、关系，以及节点数量是否达到上限
+        """
+        depth = max(0, min(depth, Config.SUBGRAPH_MAX_DEPTH))
+        if limit is None:
+            limit = Config.SUBGRAPH_DEFAULT_LIMIT
+        limit = max(1, min(limit, Config.SUBGRAPH_MAX_LIMIT))
+        subgraph = GRAPH.get_subgraph(seed_ids, q, depth, limit, labels, types, Config.SUBGRAPH_SEED_LIMIT)
+        nodes = [Node.from_record(node) for node in subgraph['nodes']]
+        links = [Link.from_record(relationship) for relationship in subgraph['relationships']]
+        return nodes, links, len(nodes) >= limit
+
 class Link:
     @classmethod
-    def from_id(cls, relationship_id):
-        """通过关系ID初始化Link对象"""
+    def from_id(cls, relationship_id, with_nodes=True):
+        """通过关系ID初始化Link对象，优先从缓存获取
+        Args:
+            relationship_id: 关系ID
+            with_nodes (bool, optional): 为 True 时在同一次查询中加载两端节点；
+                为 False 时只加载关系本身，两端节点在首次访问时再加载
+        """
+        cached = LINK_CACHE.get(relationship_id)
+        if cached is not None:
+            return cached
         instance = cls.__new__(cls)
         instance.id = relationship_id
-        instance.get()
+        instance.get(with_nodes)
+        LINK_CACHE.put(instance.id, instance)
         return instance
 
     @classmethod
+    @_write_operation
     def from_nodes(cls, start_node_id, end_node_id, rel_type, properties):
-        """通过节点ID和关系信息创建新的关系并初始化Link对象"""
-        instance = cls.__new__(cls)
+        """通过节点ID和关系信息创建新的关系并初始化Link对象
+
+        创建语句同时返回关系和两端节点，整个过程只需一次查询。
+
+        Raises:
+            ValueError: 起始节点或目标节点不存在
+        """
         result = GRAPH.add_relationship_by_nodes_id(start_node_id, end_node_id, rel_type, properties)
         if result:
-            instance.id = result["rel_id"]
-            instance.get()
+            # 新关系不会使已缓存的对象失效，直接放入缓存
+            instance = cls.from_record(result)
+            LINK_CACHE.put(instance.id, instance)
+            publish_changes([{'event': 'relationship_created', 'data': instance.to_dict(include_nodes=False)}])
             return instance
         raise Exception("Failed to create relationship")
 
+    @classmethod
+    def from_record(cls, record, nodes=None):
+        """通过查询返回的关系记录直接初始化Link对象，无需再次查询
+        Args:
+            record (dict): 关系字典，包含 start_node 和 end_node 时直接构建两端节点
+            nodes (dict, optional): 节点ID到Node对象的映射，用于在批量构建时复用相同的端点对象
+        """
+        cached = LINK_CACHE.peek(record['rel_id'])
+        instance = cached if cached is not None else cls.__new__(cls)
+        instance._load(record, nodes)
+        if cached is not None:
+            LINK_CACHE.put(instance.id, instance)
+        return instance
+
     def __init__(self):
         """默认初始化方法，不应直接调用"""
         raise NotImplementedError("Please use from_id() or from_nodes() to create a Link instance")
 
-    def get(self):
-        n = GRAPH.get_relationship_by_id(self.id)
+    def get(self, with_nodes=True):
+        n = GRAPH.get_relationship_by_id(self.id, with_nodes)
         if (n==[]):
             raise ValueError(f"Relationship ID:{self.id} not exist")
-        self.type = n["type"]
-        self.properties = n["properties"]
-        self.start_node = Node.from_id(n["start_node_id"])
-        self.end_node = Node.from_id(n["end_node_id"])
+        self._load(n)
+
+    def _load(self, record, nodes=None):
+        """从关系字典中读取关系信息，两端节点未包含在记录中时延迟加载"""
+        self.id = record['rel_id']
+        self.type = record['type']
+        self.properties = record['properties']
+        self.start_node_id = record['start_node_id']
+        self.end_node_id = record['end_node_id']
+        self._start_node = None
+        self._end_node = None
+        if 'start_node' in record:
+            if nodes is None:
+                nodes = {}
+            self._start_node = self._shared_node(record['start_node'], nodes)
+            self._end_node = self._shared_node(record['end_node'], nodes)
 
+    @staticmethod
+    def _shared_node(node_record, nodes):
+        node = nodes.get(node_record['node_id'])
+        if node is None:
+            node = Node.from_record(node_record)
+            nodes[node.id] = node
+        return node
+
+    @property
+    def start_node(self):
+        """起始节点，未加载时在首次访问时查询"""
+        if self._start_node is None:
+            self._start_node = Node.from_id(self.start_node_id)
+        return self._start_node
+
+    @property
+    def end_node(self):
+        """目标节点，未加载时在首次访问时查询"""
+        if self._end_node is None:
+            self._end_node = Node.from_id(self.end_node_id)
+        return self._end_node
+
+    @_write_operation
     def remove(self):
-        GRAPH.remove_relationship_by_id(self.id)
+        result = GRAPH.remove_relationship_by_id(self.id)
+        LINK_CACHE.invalidate(self.id)
+        if result is not None:
+            publish_changes([{'event': 'relationship_deleted', 'data': self._endpoint_event(self.id)}])
 
+    @_write_operation
     def update(self, new_properties, new_type=None):
-        GRAPH.update_relationship_by_rel_id(self.id, new_properties, new_type)
+        """更新关系属性和类型，并用写入后的结果刷新当前对象
 
-    def to_dict(self):
-        """序列化关系对象为字典"""
-        return {
+        修改类型会重建关系，更新后 self.id 为新关系的ID。
+        """
+        previous_id, previous_type, previous_properties = self.id, self.type, self.properties
+        result = GRAPH.update_relationship_by_rel_id(self.id, new_properties, new_type)
+        LINK_CACHE.invalidate(self.id)
+        if result is None:
+            raise ValueError(f"Relationship ID:{self.id} not exist")
+        self._load(result)
+        LINK_CACHE.put(self.id, self)
+        if self.id != previous_id:
+            events = [{'event': 'relationship_deleted', 'data': self._endpoint_event(previous_id)},
+                      {'event': 'relationship_created', 'data': self.to_dict(include_nodes=False)}]
+        else:
+            changes = changed_fields(None, previous_properties, None, self.properties)
+            if self.type != previous_type:
+                changes['type'] = self.type
+            events = [{'event': 'relationship_updated', 'data': {**self._endpoint_event(self.id), **changes}}] \
+                if changes else []
+        publish_changes(events)
+
+    def _endpoint_event(self, rel_id):
+        """关系事件的基本数据，包含两端节点ID，用于按订阅过滤"""
+        return {'id': rel_id, 'start_node_id': self.start_node_id, 'end_node_id': self.end_node_id}
+
+    def to_dict(self, include_nodes=True):
+        """序列化关系对象为字典
+        Args:
+            include_nodes (bool, optional): 为 False 时只输出两端节点ID，不会触发端点加载
+        """
+        data = {
             'id': self.id,
             'type': self.type,
             'properties': self.properties,
-            'start_node': self.start_node.to_dict(),
-            'end_node': self.end_node.to_dict()
+            'start_node_id': self.start_node_id,
+            'end_node_id': self.end_node_id
         }
+        if include_nodes:
+            data['start_node'] = self.start_node.to_dict()
+            data['end_node'] = self.end_node.to_dict()
+        return data
     
     def __str__(self):
         """序列化关系对象为字典"""
-        return str({
-            'id': self.id,
-            'type': self.type,
-            'properties': self.properties,
-            'start_node': self.start_node.to_dict(),
-            'end_node': self.end_node.to_dict()
-        })
+        return str(self.to_dict())
 
     @staticmethod
     def search(rel_type=None, limit=3):
@@ -84,17 +1213,39 @@ class Link:
             list[Link]: 匹配的关系对象列表
         """
         results = GRAPH.search_relationships(rel_type, limit)
-        return [Link.from_id(result['rel_id']) for result in results]
+        nodes = {}
+        return [Link.from_record(result, nodes) for result in results]
     
     @staticmethod
     def get_all_relationships():
-        """获取数据库中的所有节点
+        """获取数据库中的所有关系，关系及其两端节点由一次流式查询构建
         
         Returns:
-            list[Node]: 所有节点对象列表
+            list[Link]: 所有关系对象列表
+        """
+        nodes = {}
+        return [Link.from_record(relationship, nodes) for relationship in GRAPH.iter_all_relationships()]
+
+    @staticmethod
+    def get_relationships_page(cursor=None, limit=None):
+        """按关系ID分页获取关系，两端节点只加载ID
+        Args:
+            cursor (int, optional): 上一页返回的游标
+            limit (int, optional): 每页数量，默认为 Config.API_PAGE_SIZE
+        Returns:
+            tuple[list[Link], int | None]: 当前页关系和下一页游标，没有下一页时游标为 None
         """
-        relationships_data = GRAPH.get_all_relationships()
-        return [Link.from_id(relationship['rel_id']) for relationship in relationships_data]
+        if limit is None:
+            limit = Config.API_PAGE_SIZE
+        links = [Link.from_record(relationship) for relationship in GRAPH.get_relationships_page(cursor, limit)]
+        next_cursor = links[-1].id if len(links) == limit else None
+        return links, next_cursor
+
+    @staticmethod
+    def iter_all_relationships():
+        """流式遍历所有关系，两端节点只加载ID，每次只构建一个 Link 对象"""
+        for relationship in GRAPH.iter_all_relationships(with_nodes=False):
+            yield Link.from_record(relationship)
 
 pass
 
@@ -102,23 +1253,44 @@ pass
 class Node:
     @classmethod
     def from_id(cls, node_id):
-        """通过节点ID初始化Node对象"""
+        """通过节点ID初始化Node对象，优先从缓存获取"""
+        cached = NODE_CACHE.get(node_id)
+        if cached is not None:
+            return cached
         instance = cls.__new__(cls)
         instance.id = node_id
         instance.get()
+        NODE_CACHE.put(instance.id, instance)
         return instance
 
     @classmethod
+    @_write_operation
     def from_node(cls, labels, properties):
-        """通过标签和属性创建新的节点并初始化Node对象"""
-        instance = cls.__new__(cls)
+        """通过标签和属性创建新的节点并初始化Node对象，创建语句直接返回节点，无需再次查询"""
         result = GRAPH.add_node(labels, properties)
         if result:
-            instance.id = result.id
-            instance.get()
+            instance = cls.from_record(result)
+            NODE_CACHE.put(instance.id, instance)
+            publish_changes([{'event': 'node_created', 'data': instance.to_dict()}])
             return instance
         raise Exception("Failed to create node")
 
+    @classmethod
+    def from_record(cls, record):
+        """通过查询返回的节点记录直接初始化Node对象，无需再次查询
+
+        节点已在缓存中时用新数据刷新并返回缓存中的对象；未缓存的节点不会写入缓存，
+        避免批量查询把常用节点挤出缓存。
+        """
+        cached = NODE_CACHE.peek(record['node_id'])
+        instance = cached if cached is not None else cls.__new__(cls)
+        instance.id = record['node_id']
+        instance.labels = record['labels']
+        instance.properties = record['properties']
+        if cached is not None:
+            NODE_CACHE.put(instance.id, instance)
+        return instance
+
     def __init__(self):
         """默认初始化方法，不应直接调用"""
         raise NotImplementedError("Please use from_id() or from_properties() to create a Node instance")
@@ -130,24 +1302,109 @@ class Node:
         self.labels = n["labels"]
         self.properties = n["properties"]
 
+    @_write_operation
     def remove(self):
-        GRAPH.remove_node_by_id(self.id)
+        result = GRAPH.remove_node_by_id(self.id)
+        NODE_CACHE.invalidate(self.id)
+        # DETACH DELETE 同时删除了与该节点相连的关系
+        LINK_CACHE.invalidate_by(self.id)
+        if result is not None:
+            events = [{'event': 'relationship_deleted', 'data': _relationship_deleted(relationship)}
+                      for relationship in result['relationships']]
+            events.append({'event': 'node_deleted', 'data': {'id': self.id}})
+            publish_changes(events)
 
+    @_write_operation
     def update(self, properties, labels=None):
         """更新节点属性和标签
         Args:
             properties (dict): 要更新的属性
             labels (list, optional): 要更新的标签列表. 默认为 None 表示不更新标签
         """
-        if labels is not None:
-            self.labels = labels
+        previous_labels, previous_properties = self.labels, self.properties
+        result = GRAPH.update_node_by_node_id(self.id, properties,labels)
+        LINK_CACHE.invalidate_by(self.id)
+        if result is None:
+            NODE_CACHE.invalidate(self.id)
+            raise ValueError(f"Node ID:{self.id} not exist")
+
+        self.labels = result["labels"]
+        self.properties = result["properties"]
+        NODE_CACHE.put(self.id, self)
+        changes = changed_fields(previous_labels, previous_properties, self.labels, self.properties)
+        publish_changes([{'event': 'node_updated', 'data': {'id': self.id, **changes, 'labels': self.labels}}]
+                        if changes else [])
+
+    @staticmethod
+    @_write_operation
+    def merge_nodes(node_ids, properties="discard"):
+        """在一个事务中把一组节点合并到第一个节点，参数含义见 Neo4jGraph.merge_nodes
 
-        GRAPH.update_node_by_node_id(self.id, properties,labels)
+        关系改接到第一个节点，其余节点被删除，变更作为一个 graph_batch 事件发布。
+        Returns:
+            Node: 合并后的节点
+        Raises:
+            ValueError: 参数不合法或有节点不存在
+        """
+        node_ids = list(dict.fromkeys(node_ids))
+        previous = NODE_CACHE.peek(node_ids[0]) if node_ids else None
+        previous_labels = previous.labels if previous is not None else None
+        previous_properties = previous.properties if previous is not None else None
+        result = GRAPH.merge_nodes(node_ids, properties)
+        for node_id in node_ids:
+            LINK_CACHE.invalidate_by(node_id)
+        if result is None:
+            raise ValueError(f"Some of nodes {node_ids} do not exist")
+        for node_id in node_ids[1:]:
+            NODE_CACHE.invalidate(node_id)
+        node = Node.from_record(result['node'])
 
-        self.get()
+        if previous is not None:
+            changes = changed_fields(previous_labels, previous_properties, node.labels, node.properties)
+        else:
+            changes = {'labels': node.labels, 'properties': node.properties}
+        events = [{'event': 'node_updated', 'data': {'id': node.id, **changes, 'labels': node.labels}}] \
+            if changes else []
+        events += [{'event': 'relationship_created', 'data': Link.from_record(record).to_dict(include_nodes=False)}
+                   for record in result['created_relationships']]
+        events += [{'event': 'relationship_updated',
+                    'data': {**_relationship_deleted(record), 'properties': record['properties']}}
+                   for record in result['updated_relationships']]
+        events += [{'event': 'relationship_deleted', 'data': _relationship_deleted(record)}
+                   for record in result['deleted_relationships']]
+        events += [{'event': 'node_deleted', 'data': {'id': node_id}} for node_id in node_ids[1:]]
+        publish_changes(events)
+        return node
+
+    def to(self, node, k=1, max_depth=None, direction="out", rel_types=None):
+        """查找从当前节点到目标节点的最短路径
+        Args:
+            node (Node | int): 目标节点或目标节点ID
+            k (int): 返回的路径数量
+            max_depth (int, optional): 最大跳数，默认为 Config.PATH_MAX_DEPTH
+            direction (str): 'out' 沿关系方向，'in' 逆关系方向，'both' 忽略方向
+            rel_types (list[str], optional): 只经过这些类型的关系
+        Returns:
+            list[dict]: 按跳数排序的路径，每条路径包含 length, nodes 和 relationships
+        Raises:
+            TimeoutError: 查询超时
+        """
+        end_node_id = node.id if isinstance(node, Node) else node
+        return Node.find_paths(self.id, end_node_id, k, max_depth, direction, rel_types)
 
-    def to(self,node):
-        GRAPH.find_path(self.id,node.id)
+    @staticmethod
+    def find_paths(start_node_id, end_node_id, k=1, max_depth=None, direction="out", rel_types=None):
+        """按节点ID查找路径，结果按图版本号缓存，参数含义同 Node.to"""
+        # 先读取版本号再查询，查询期间发生的写入会使这条缓存不再被命中
+        key = (GRAPH.graph_version, start_node_id, end_node_id, k, max_depth, direction,
+               tuple(sorted(rel_types or ())))
+        paths = PATH_CACHE.get(key)
+        if paths is None:
+            paths = _mirror_paths(start_node_id, end_node_id, k, max_depth, direction, rel_types)
+            if paths is None:
+                paths = GRAPH.find_paths_by_id(start_node_id, end_node_id, k, max_depth, direction, rel_types)
+            PATH_CACHE.put(key, paths)
+        return paths
 
     def connect(self, node_id, rel_type="CONNECTS_TO", properties=None):
         """连接到另一个节点
@@ -157,19 +1414,12 @@ class Node:
             properties (dict, optional): 关系属性. 默认为 None
         Returns:
             Link: 新创建的关系对象
+        Raises:
+            ValueError: 目标节点或当前节点不存在
         """
         if properties is None:
             properties = {}
-        
-        result = GRAPH.add_relationship_by_nodes_id(
-            self.id, 
-            node_id, 
-            rel_type, 
-            properties
-        )
-        if result:
-            return Link.from_id(result['rel_id'])
-        raise Exception("Failed to create relationship")
+        return Link.from_nodes(self.id, node_id, rel_type, properties)
 
     def to_dict(self):
         """序列化节点对象为字典"""
@@ -194,30 +1444,41 @@ class Node:
         Returns:
             list[Node]: 附近节点列表
         """
-        nodes_data = GRAPH.find_nodes_by_id_and_length(self.id, max_depth)
-        return [Node.from_id(node['node_id']) for node in nodes_data]
+        node_ids = GRAPH_MIRROR.nearby_ids(self.id, max_depth, GRAPH.nearby_frontier_limit) if GRAPH_MIRROR else None
+        if node_ids is None:
+            nodes_data = GRAPH.find_nodes_by_id_and_length(self.id, max_depth)
+        else:
+            nodes_data = _nodes_in_order(node_ids)
+        return [Node.from_record(node) for node in nodes_data]
 
     @staticmethod
-    def get_random_nodes(count=5):
-        """获取随机节点
+    def get_random_nodes(count=5, seed=None):
+        """获取随机节点，开销只与 count 有关，与图的大小无关
         Args:
             count (int): 需要获取的随机节点数量
+            seed (int, optional): 随机种子，用于得到可重复的样本
         Returns:
             list[Node]: 随机节点列表
         """
-        nodes_data = GRAPH.get_random_nodes(count)
-        return [Node.from_id(node['node_id']) for node in nodes_data]
+        nodes_data = NODE_SAMPLER.sample(count, seed)
+        return [Node.from_record(node) for node in nodes_data]
 
-    def get_random_nearby_nodes(self, count=3, max_depth=2):
+    def get_random_nearby_nodes(self, count=3, max_depth=2, seed=None):
         """获取当前节点附近的随机节点
         Args:
             count (int): 需要获取的随机节点数量
             max_depth (int): 最大搜索深度
+            seed (int, optional): 随机种子，用于得到可重复的样本
         Returns:
             list[Node]: 随机附近节点列表
         """
-        nearby_nodes = GRAPH.get_random_nearby_nodes(self.id, count, max_depth)
-        return [Node.from_id(node['node_id']) for node in nearby_nodes]
+        rng = random.Random(seed)
+        reached = GRAPH_MIRROR.nearby_ids(self.id, max_depth, GRAPH.nearby_frontier_limit, rng) if GRAPH_MIRROR else None
+        if reached is None:
+            nearby_nodes = GRAPH.get_random_nearby_nodes(self.id, count, max_depth, seed)
+        else:
+            nearby_nodes = _nodes_in_order(rng.sample(reached, min(count, len(reached))))
+        return [Node.from_record(node) for node in nearby_nodes]
 
     @staticmethod
     def search(name=None, limit=3):
@@ -229,27 +1490,116 @@ class Node:
             list[Node]: 匹配的节点对象列表
         """
         results = GRAPH.search_nodes(name, limit)
-        return [Node.from_id(result['node_id']) for result in results]
+        return [Node.from_record(result) for result in results]
 
     @staticmethod
-    def get_isolated_nodes():
-        """获取数据库中的所有孤立节点（没有任何关系连接的节点）
-        
+    def get_isolated_nodes(limit=None):
+        """获取孤立节点（没有任何关系连接的节点），由度数索引直接给出，开销只与返回数量有关
+
+        Args:
+            limit (int, optional): 返回数量，默认返回全部
+        Returns:
+            list[Node]: 孤立节点对象列表，按节点ID升序
+        """
+        return Node.get_isolated_nodes_page(None, limit)[0]
+
+    @staticmethod
+    def get_isolated_nodes_page(cursor=None, limit=None):
+        """按节点ID分页获取孤立节点
+        Args:
+            cursor (int, optional): 上一页返回的游标，即上一页最后一个孤立节点的ID
+            limit (int, optional): 每页数量，默认返回全部
+        Returns:
+            tuple[list[Node], int | None]: 当前页节点和下一页游标，没有下一页时游标为 None。
+                游标由索引给出，索引中已被删除但尚未收到事件的节点不会使分页提前结束
+        """
+        node_ids, next_cursor, _ = DEGREE_INDEX.isolated(limit, cursor)
+        return [Node.from_record(node) for node in _nodes_in_order(node_ids)], next_cursor
+
+    @staticmethod
+    def count_isolated_nodes():
+        """返回孤立节点的数量"""
+        return DEGREE_INDEX.isolated(0)[2]
+
+    @staticmethod
+    def get_hub_nodes(limit=10, direction="total"):
+        """获取度数最高的节点
+        Args:
+            limit (int): 返回数量
+            direction (str): 按 'total' 总度数、'in' 入度或 'out' 出度排序
+        Returns:
+            list[tuple[Node, int]]: (节点对象, 度数)，按度数从高到低排列
+        """
+        return Node.get_hub_nodes_page(None, limit, direction)[0]
+
+    @staticmethod
+    def get_hub_nodes_page(cursor=None, limit=10, direction="total"):
+        """按 (度数降序, 节点ID升序) 分页获取度数最高的节点
+        Args:
+            cursor (tuple[int, int], optional): 上一页返回的游标 (度数, 节点ID)
+            limit (int): 每页数量
+            direction (str): 按 'total' 总度数、'in' 入度或 'out' 出度排序
+        Returns:
+            tuple[list[tuple[Node, int]], tuple[int, int] | None]: 当前页的 (节点对象, 度数) 和下一页游标，
+                没有下一页时游标为 None
+        """
+        ranked, next_cursor = DEGREE_INDEX.top(limit, cursor, direction)
+        nodes = {node['node_id']: node for node in _nodes_in_order([node_id for node_id, _ in ranked])}
+        return [(Node.from_record(nodes[node_id]), degree) for node_id, degree in ranked if node_id in nodes], \
+            next_cursor
+
+    @staticmethod
+    def degree_histogram(direction="total"):
+        """返回度数分布，按度数升序排列的 [度数, 节点数量]"""
+        return DEGREE_INDEX.histogram(direction)
+
+    @staticmethod
+    def warm_cache(limit=None):
+        """用连接数最多的节点预热缓存
+        Args:
+            limit (int, optional): 预热的节点数量，默认为 Config.CACHE_WARM_SIZE
         Returns:
-            list[Node]: 孤立节点对象列表
+            int: 放入缓存的节点数量
         """
-        nodes_data = GRAPH.get_isolated_nodes()
-        return [Node.from_id(node['node_id']) for node in nodes_data]
+        if limit is None:
+            limit = Config.CACHE_WARM_SIZE
+        ranked, _ = DEGREE_INDEX.top(min(limit, NODE_CACHE.max_size))
+        nodes_data = _nodes_in_order([node_id for node_id, _ in ranked])
+        # 按度数从低到高放入，使度数最高的节点最后被淘汰
+        for node_data in reversed(nodes_data):
+            node = Node.from_record(node_data)
+            NODE_CACHE.put(node.id, node)
+        return len(nodes_data)
 
     @staticmethod
     def get_all_nodes():
-        """获取数据库中的所有节点
+        """获取数据库中的所有节点，节点由一次流式查询直接构建
         
         Returns:
             list[Node]: 所有节点对象列表
         """
-        nodes_data = GRAPH.get_all_nodes()
-        return [Node.from_id(node['node_id']) for node in nodes_data]
+        return [Node.from_record(node) for node in GRAPH.iter_all_nodes()]
+
+    @staticmethod
+    def get_nodes_page(cursor=None, limit=None):
+        """按节点ID分页获取节点
+        Args:
+            cursor (int, optional): 上一页返回的游标
+            limit (int, optional): 每页数量，默认为 Config.API_PAGE_SIZE
+        Returns:
+            tuple[list[Node], int | None]: 当前页节点和下一页游标，没有下一页时游标为 None
+        """
+        if limit is None:
+            limit = Config.API_PAGE_SIZE
+        nodes = [Node.from_record(node) for node in GRAPH.get_nodes_page(cursor, limit)]
+        next_cursor = nodes[-1].id if len(nodes) == limit else None
+        return nodes, next_cursor
+
+    @staticmethod
+    def iter_all_nodes():
+        """流式遍历所有节点，每次只构建一个 Node 对象"""
+        for node in GRAPH.iter_all_nodes():
+            yield Node.from_record(node)
 
     
 
@@ -1,51 +1,563 @@
+import random
+import threading
+import time
 import warnings
+from contextlib import contextmanager
+from itertools import islice
 
 # 忽略与 Neo4j 相关的废弃警告
 warnings.filterwarnings("ignore", message=".*deprecated.*")
 
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, unit_of_work
+from neo4j.exceptions import ClientError, ServiceUnavailable, SessionExpired
 
 # 添加常量定义在文件开头
 NODE_INDEX_NAME = "test"
 RELATIONSHIP_INDEX_NAME = "test_rel"
+# 批量导入时保存外部主键的属性，导入关系时通过它找到节点
+IMPORT_KEY_PROPERTY = "import_key"
+IMPORT_KEY_INDEX_NAME = "node_import_key"
+# 写入时记录的时间戳属性，用于增量检测应用之外的修改，不作为普通属性返回
+UPDATED_AT_PROPERTY = "updated_at"
+UPDATED_AT_INDEX_NAME = "node_updated_at"
+
+
+def _visible_keys(var):
+    """节点或关系的属性名，不包含 UPDATED_AT_PROPERTY"""
+    return f"[k in keys({var}) WHERE k <> '{UPDATED_AT_PROPERTY}']"
+
+
+def _visible_properties(var):
+    """节点或关系的属性字典，不包含 UPDATED_AT_PROPERTY"""
+    return f"apoc.map.removeKey(properties({var}), '{UPDATED_AT_PROPERTY}')"
+
+
+def _node_columns(var, prefix="node"):
+    """生成返回节点完整信息的列，列名形如 node_id, node_labels, node_keys, node_values"""
+    return (f"id({var}) as {prefix}_id, labels({var}) as {prefix}_labels, "
+            f"{_visible_keys(var)} as {prefix}_keys, "
+            f"[k in {_visible_keys(var)} | {var}[k]] as {prefix}_values")
+
+
+def _node_record(record, prefix="node"):
+    """把 _node_columns 生成的列转换为节点字典"""
+    return {
+        'node_id': record[f'{prefix}_id'],
+        'labels': record[f'{prefix}_labels'],
+        'properties': dict(zip(record[f'{prefix}_keys'], record[f'{prefix}_values']))
+    }
+
+
+def _relationship_columns(var="r", start="a", end="b", with_nodes=False):
+    """生成返回关系信息的列，with_nodes 为 True 时同时返回两端节点的完整信息"""
+    columns = (f"id({var}) as rel_id, type({var}) as rel_type, "
+               f"{_visible_keys(var)} as rel_keys, [k in {_visible_keys(var)} | {var}[k]] as rel_values")
+    if with_nodes:
+        return f"{columns}, {_node_columns(start, 'start_node')}, {_node_columns(end, 'end_node')}"
+    return f"{columns}, id({start}) as start_node_id, id({end}) as end_node_id"
+
+
+def _relationship_record(record):
+    """把 _relationship_columns 生成的列转换为关系字典，包含两端节点时一并转换"""
+    relationship = {
+        'rel_id': record['rel_id'],
+        'type': record['rel_type'],
+        'properties': dict(zip(record['rel_keys'], record['rel_values'])),
+        'start_node_id': record['start_node_id'],
+        'end_node_id': record['end_node_id']
+    }
+    if 'start_node_labels' in record.keys():
+        relationship['start_node'] = _node_record(record, 'start_node')
+        relationship['end_node'] = _node_record(record, 'end_node')
+    return relationship
+
+
+# 同步与异步实现共用的查询语句
+GET_NODE_BY_ID_QUERY = f"""
+MATCH (n)
+WHERE id(n) = $node_id
+RETURN {_node_columns("n")}
+"""
+
+GET_ALL_NODES_QUERY = f"""
+MATCH (n:Node)
+RETURN {_node_columns("n")}
+"""
+
+SEARCH_NODES_QUERY = f"""
+CALL db.index.fulltext.queryNodes('{NODE_INDEX_NAME}', $name)
+YIELD node
+RETURN {_node_columns("node")}
+LIMIT $limit
+"""
+
+ADD_NODE_QUERY = f"""
+CREATE (n:Node {{name: $node_name}})
+SET n += $properties, n.{UPDATED_AT_PROPERTY} = timestamp()
+RETURN {_node_columns("n")}
+"""
+
+# 删除前读取节点以及随之删除的关系，供调用方同步缓存和广播事件
+REMOVE_NODE_BY_ID_QUERY = f"""
+MATCH (n:Node)
+WHERE id(n) = $node_id
+OPTIONAL MATCH (n)-[r]-()
+WITH n, [x IN collect(DISTINCT r) | {{
+    rel_id: id(x), type: type(x),
+    start_node_id: id(startNode(x)), end_node_id: id(endNode(x))
+}}] as relationships
+WITH n, relationships, {_node_columns("n")}
+DETACH DELETE n
+RETURN node_id, node_labels, node_keys, node_values, relationships
+"""
+
+REMOVE_RELATIONSHIP_BY_ID_QUERY = f"""
+MATCH (a)-[r]->(b)
+WHERE id(r) = $relationship_id
+WITH r, {_relationship_columns()}
+DELETE r
+RETURN rel_id, rel_type, rel_keys, rel_values, start_node_id, end_node_id
+"""
+
+
+# 一组节点相连的全部关系，合并节点前后各读取一次，比较得到被删除、新建和修改的关系
+RELATIONSHIPS_OF_NODES_QUERY = f"""
+MATCH (a)-[r]->(b)
+WHERE id(a) IN $node_ids
+RETURN {_relationship_columns()}
+UNION
+MATCH (a)-[r]->(b)
+WHERE id(b) IN $node_ids
+RETURN {_relationship_columns()}
+"""
+
+# 按 $node_ids 的顺序收集节点并合并到第一个节点，有节点不存在时不返回结果
+MERGE_NODES_QUERY = f"""
+UNWIND range(0, size($node_ids) - 1) as i
+MATCH (n:Node)
+WHERE id(n) = $node_ids[i]
+WITH n, i ORDER BY i
+WITH collect(n) as nodes
+WHERE size(nodes) = size($node_ids)
+CALL apoc.refactor.mergeNodes(nodes, {{properties: $properties, mergeRels: true, produceSelfRel: false}})
+YIELD node
+SET node.{UPDATED_AT_PROPERTY} = timestamp()
+RETURN {_node_columns("node")}
+"""
+
+MERGE_PROPERTY_POLICIES = ("discard", "overwrite", "combine")
+
+
+def _fingerprint_column(var):
+    """内容指纹列：apoc.hashing.fingerprint（不含 UPDATED_AT_PROPERTY）的前 16 位十六进制"""
+    return f"left(apoc.hashing.fingerprint({var}, ['{UPDATED_AT_PROPERTY}']), 16) as fingerprint"
+
+
+# 按ID区间计算内容指纹，id(n) IN range(...) 使用按ID查找而不是全量扫描
+NODE_FINGERPRINT_QUERY = f"""
+MATCH (n)
+WHERE id(n) IN range($start_id, $end_id - 1) AND n:Node
+RETURN id(n) as id, {_fingerprint_column("n")}
+"""
+
+RELATIONSHIP_FINGERPRINT_QUERY = f"""
+MATCH (a)-[r]->(b)
+WHERE id(r) IN range($start_id, $end_id - 1)
+RETURN id(r) as id, id(a) as start_node_id, id(b) as end_node_id, {_fingerprint_column("r")}
+"""
+
+
+# 一组节点沿出边的一跳邻居，只返回ID
+NEIGHBOR_IDS_QUERY = """
+UNWIND $node_ids as node_id
+MATCH (a)-->(b)
+WHERE id(a) = node_id
+RETURN DISTINCT id(b) as node_id
+"""
+
+NODES_BY_IDS_QUERY = f"""
+MATCH (n:Node)
+WHERE id(n) IN $node_ids
+RETURN {_node_columns("n")}
+"""
+
+
+class _NeighborhoodExpansion:
+    """逐层扩展邻域的状态，与查询方式无关，同步、异步查询和拓扑镜像共用
+
+    调用方查询 frontier 的一跳邻居后调用 advance，直到 done 为 True，reached 为按到达的跳数
+    排列的节点ID（不含起始节点）。rng 的含义见 _next_frontier。
+    """
+
+    def __init__(self, start_node_id, max_depth, frontier_limit, rng=None):
+        self.frontier_limit = frontier_limit
+        self.rng = rng
+        self.visited = {start_node_id}
+        self.frontier = [start_node_id]
+        self.reached = []
+        self.remaining = max_depth
+
+    @property
+    def done(self):
+        return self.remaining <= 0 or not self.frontier
+
+    def advance(self, neighbor_ids):
+        self.frontier = _next_frontier(neighbor_ids, self.visited, self.frontier_limit, self.rng)
+        self.reached += self.frontier
+        self.remaining -= 1
+
+
+def _next_frontier(neighbor_ids, visited, frontier_limit, rng=None):
+    """从一跳邻居中去掉已访问的节点得到按ID升序的下一层边界
+
+    超过 frontier_limit 时默认保留ID最小的 frontier_limit 个，同样的图总是得到同样的结果；
+    传入 rng 时改为随机保留。新的边界节点被加入 visited，之后的层次不会再次到达它们。
+    """
+    frontier = sorted(set(neighbor_ids) - visited)
+    if len(frontier) > frontier_limit:
+        frontier = rng.sample(frontier, frontier_limit) if rng is not None else frontier[:frontier_limit]
+    visited.update(frontier)
+    return frontier
+
+
+def _is_acquisition_timeout(error):
+    """判断异常是否为从连接池获取连接超时
+
+    服务端返回的 ClientError 都带有 Neo.ClientError.* 状态码，驱动在连接池已满、
+    等待超过 connection_acquisition_timeout 时在本地抛出不带状态码的 ClientError。
+    """
+    return isinstance(error, ClientError) and error.code is None
+
+
+def _ordered_node_records(records, node_ids):
+    """把按ID读取的节点记录按 node_ids 的顺序排列，不存在的ID被忽略"""
+    nodes = {node['node_id']: node for node in (_node_record(record) for record in records)}
+    return [nodes[node_id] for node_id in node_ids if node_id in nodes]
+
+
+# 按ID分页时用于确定ID上界的查询，由按ID有序的标签扫描取到第一条即可返回
+LAST_NODE_ID_QUERY = """
+MATCH (n:Node)
+RETURN id(n) as last_id ORDER BY last_id DESC LIMIT 1
+"""
+
+LAST_RELATIONSHIP_ID_QUERY = """
+MATCH ()-[r]->()
+RETURN id(r) as last_id ORDER BY last_id DESC LIMIT 1
+"""
+
+
+def _seek_page(tx, query, last_id_query, after_id, limit):
+    """按ID升序读取 after_id 之后的一页记录
+
+    `id(n) > $after_id` 不能按ID查找，每页都要扫描并排序全部元素。这里把 after_id 之后的ID区间切成
+    从 limit 开始倍增的窗口，每个窗口用 `id(n) IN range($start, $end)` 直接按ID查找，读够 limit 条或
+    超过当前最大ID时停止，每页的代价与 limit 而不是元素总数成正比。
+    query 需接受 $start, $end, $limit 参数并按ID升序返回。
+    """
+    last = tx.run(last_id_query).single()
+    if last is None or limit <= 0:
+        return []
+    records = []
+    start = -1 if after_id is None else after_id
+    start, size = start + 1, limit
+    while len(records) < limit and start <= last['last_id']:
+        end = min(start + size - 1, last['last_id'])
+        records.extend(tx.run(query, start=start, end=end, limit=limit - len(records)))
+        start, size = end + 1, size * 2
+    return records
+
+
+def _relationship_by_id_query(with_nodes=False):
+    return f"""
+    MATCH (a)-[r]->(b)
+    WHERE id(r) = $relationship_id
+    RETURN {_relationship_columns(with_nodes=with_nodes)}
+    """
+
+
+def _update_node_query(has_properties, has_labels):
+    clauses = ["MATCH (n)", "WHERE id(n) = $node_id", f"SET n.{UPDATED_AT_PROPERTY} = timestamp()"]
+    if has_properties:
+        clauses.append("SET n += $new_properties")
+    if has_labels:
+        clauses += ["WITH n",
+                    "CALL apoc.create.setLabels(n, $new_labels) YIELD node",
+                    "WITH node as n"]
+    clauses.append(f"RETURN {_node_columns('n')}")
+    return "\n".join(clauses)
+
+
+def _add_relationship_by_nodes_id_query(relationship_type):
+    # 两端节点不存在时不创建关系，并通过 start_node_exists/end_node_exists 报告
+    return f"""
+    OPTIONAL MATCH (a:Node) WHERE id(a) = $start_node_id
+    OPTIONAL MATCH (b:Node) WHERE id(b) = $end_node_id
+    CALL {{
+        WITH a, b
+        WITH a, b WHERE a IS NOT NULL AND b IS NOT NULL
+        CREATE (a)-[r:{relationship_type} $properties]->(b)
+        SET r.{UPDATED_AT_PROPERTY} = timestamp()
+        RETURN collect(r) as created
+    }}
+    WITH a, b, created[0] as r
+    RETURN a IS NOT NULL as start_node_exists, b IS NOT NULL as end_node_exists,
+           {_relationship_columns(with_nodes=True)}
+    """
+
+
+def _update_relationship_query(has_type):
+    clauses = ["MATCH (a)-[r]->(b)", "WHERE id(r) = $rel_id",
+               f"SET r += $new_properties, r.{UPDATED_AT_PROPERTY} = timestamp()"]
+    if has_type:
+        # apoc.refactor.setType 会用新类型重建关系，关系ID随之改变
+        clauses += ["WITH r, a, b",
+                    "CALL apoc.refactor.setType(r, $new_type) YIELD output",
+                    "WITH output as r, a, b"]
+    clauses.append(f"RETURN {_relationship_columns(with_nodes=True)}")
+    return "\n".join(clauses)
+
+
+_PATH_DIRECTIONS = ("out", "in", "both")
+
+# 返回路径 p 上的节点和关系
+PATH_COLUMNS = (f"[n IN nodes(p) | {{node_id: id(n), labels: labels(n), properties: {_visible_properties('n')}}}] "
+                f"as path_nodes, "
+                f"[r IN relationships(p) | {{rel_id: id(r), type: type(r), properties: {_visible_properties('r')}, "
+                f"start_node_id: id(startNode(r)), end_node_id: id(endNode(r))}}] as path_relationships")
+
+
+def _path_pattern(direction, rel_types, min_depth, max_depth):
+    """生成 (a) 与 (b) 之间的变长关系模式，关系类型用反引号转义"""
+    types = "|".join(_quote_identifier(t) for t in rel_types)
+    relationship = f"[{':' + types if types else ''}*{int(min_depth)}..{int(max_depth)}]"
+    if direction == "in":
+        return f"<-{relationship}-"
+    if direction == "both":
+        return f"-{relationship}-"
+    return f"-{relationship}->"
+
+
+def _shortest_path_query(pattern):
+    return f"""
+    MATCH (a), (b)
+    WHERE id(a) = $start_node_id AND id(b) = $end_node_id
+    MATCH p = shortestPath((a){pattern}(b))
+    RETURN {PATH_COLUMNS}
+    """
+
+
+def _paths_of_length_query(pattern):
+    # 只保留中间节点互不重复且不经过两端节点的路径
+    return f"""
+    MATCH (a), (b)
+    WHERE id(a) = $start_node_id AND id(b) = $end_node_id
+    MATCH p = (a){pattern}(b)
+    WITH p, a, b, nodes(p)[1..-1] as inner
+    WHERE NOT a IN inner AND NOT b IN inner
+      AND all(i IN range(0, size(inner) - 1) WHERE NOT inner[i] IN inner[i + 1..])
+    RETURN {PATH_COLUMNS}
+    LIMIT $limit
+    """
+
+
+def _path_record(record):
+    return {
+        'length': len(record['path_relationships']),
+        'nodes': record['path_nodes'],
+        'relationships': record['path_relationships']
+    }
+
+
+def _quote_identifier(name):
+    """用反引号转义标签、关系类型等无法参数化的标识符"""
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def _batches(rows, batch_size):
+    """把可迭代对象按 batch_size 切分成列表，每次只在内存中保留一批"""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _created_relationship_record(record, start_node_id, end_node_id):
+    """解析创建关系查询的结果，端点不存在时抛出 ValueError"""
+    if not record['start_node_exists']:
+        raise ValueError(f"Node ID:{start_node_id} not exist")
+    if not record['end_node_exists']:
+        raise ValueError(f"Node ID:{end_node_id} not exist")
+    return _relationship_record(record)
+
+
+def _removed_node_record(record):
+    """解析删除节点查询的结果，包含随节点一起删除的关系"""
+    node = _node_record(record)
+    node['relationships'] = record['relationships']
+    return node
+
 
 class Neo4jGraph:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-        self.session = None
+    def __init__(self, uri, user, password, max_connection_pool_size=100,
+                 connection_acquisition_timeout=60.0, max_connection_lifetime=3600,
+                 fetch_size=1000, path_max_depth=6, path_max_results=10, path_timeout=5.0,
+                 nearby_frontier_limit=1000):
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=max_connection_pool_size,
+            connection_acquisition_timeout=connection_acquisition_timeout,
+            max_connection_lifetime=max_connection_lifetime
+        )
+        self.max_connection_pool_size = max_connection_pool_size
+        self.fetch_size = fetch_size
+        # 会话使用计数，用于根据工作线程数量调整连接池大小
+        self._stats_lock = threading.Lock()
+        self._sessions_opened = 0
+        self._sessions_in_use = 0
+        self._peak_sessions_in_use = 0
+        self._acquisition_timeouts = 0
+        self._connection_failures = 0
+        self._session_seconds = 0.0
+        # 路径查询的上限，防止在有环的大图上枚举过多路径
+        self.path_max_depth = path_max_depth
+        self.path_max_results = path_max_results
+        self.path_timeout = path_timeout
+        # 邻域扩展时每一层保留的最多节点数量
+        self.nearby_frontier_limit = nearby_frontier_limit
+        # 图版本号，每次写操作后递增，用于使基于版本号的查询缓存失效
+        self._graph_version = 0
+        # 每个线程在 collect_versions 范围内产生、尚未随事件发布的版本号
+        self._local = threading.local()
 
     def close(self):
-        if self.session:
-            self.session.close()
         if self.driver:
             self.driver.close()
 
+    @contextmanager
     def begin_session(self):
-        self.session = self.driver.session()
-        return self.session
+        """为每次调用创建独立的会话
 
-    def end_session(self):
-        if self.session:
-            self.session.close()
-            self.session = None
+        会话不是线程安全的，因此不在实例上保存，Flask 线程、轮询线程和代理工具
+        可以同时使用同一个 Neo4jGraph。底层连接由驱动的连接池复用。
+        """
+        session = self.driver.session(fetch_size=self.fetch_size)
+        with self._stats_lock:
+            self._sessions_opened += 1
+            self._sessions_in_use += 1
+            self._peak_sessions_in_use = max(self._peak_sessions_in_use, self._sessions_in_use)
+        started = time.perf_counter()
+        try:
+            yield session
+        except ClientError as e:
+            if _is_acquisition_timeout(e):
+                with self._stats_lock:
+                    self._acquisition_timeouts += 1
+            raise
+        except (ServiceUnavailable, SessionExpired):
+            # 无法连接到数据库或连接中途断开，与连接池大小无关，单独计数
+            with self._stats_lock:
+                self._connection_failures += 1
+            raise
+        finally:
+            session.close()
+            with self._stats_lock:
+                self._sessions_in_use -= 1
+                self._session_seconds += time.perf_counter() - started
+
+    @contextmanager
+    def write_session(self):
+        """用于写操作的会话，结束后递增图版本号
+
+        在写入完成后才递增，保证并发读取拿到新版本号时一定能看到这次写入。
+        """
+        try:
+            with self.begin_session() as session:
+                yield session
+        finally:
+            self.advance_version()
+
+    def advance_version(self):
+        """递增图版本号，在 collect_versions 范围内时新版本号记为当前线程尚未发布的版本号
+
+        write_session 结束时自动调用；没有经过 write_session 的修改（例如检测到的外部修改、
+        异步驱动的写入）在修改可见之后显式调用，并把返回的版本号随事件发布。
+        不在 collect_versions 范围内的写入（例如批量导入、直接调用 GRAPH 的写方法）不发布事件，
+        版本号不被记录，订阅者发现缺少这些版本后自行重新加载，而不会把它们当作其他事件的版本号确认。
+        Returns:
+            int: 新的版本号
+        """
+        with self._stats_lock:
+            self._graph_version += 1
+            version = self._graph_version
+        versions = getattr(self._local, 'versions', None)
+        if versions is not None:
+            versions.append(version)
+        return version
+
+    @contextmanager
+    def collect_versions(self):
+        """在范围内记录当前线程产生的版本号，由 take_write_versions 取出后随事件发布；可以嵌套，
+        最外层结束时丢弃没有取出的版本号"""
+        if getattr(self._local, 'versions', None) is not None:
+            yield
+            return
+        self._local.versions = []
+        try:
+            yield
+        finally:
+            self._local.versions = None
+
+    def take_write_versions(self):
+        """取出当前线程产生、尚未随事件发布的版本号，发布事件时一并发布，供订阅者确认已应用到哪个版本"""
+        versions = getattr(self._local, 'versions', None)
+        if not versions:
+            return []
+        self._local.versions = []
+        return versions
+
+    @property
+    def graph_version(self):
+        """当前进程内的图版本号，本进程的写入和检测到的外部修改都会递增它"""
+        return self._graph_version
+
+    def pool_stats(self):
+        """返回连接池使用情况
+
+        Returns:
+            dict: 包含连接池大小、当前与峰值占用会话数、累计会话数、
+                  获取连接超时次数、连接失败次数和会话平均持续时间（毫秒）
+        """
+        with self._stats_lock:
+            opened = self._sessions_opened
+            return {
+                'max_connection_pool_size': self.max_connection_pool_size,
+                'fetch_size': self.fetch_size,
+                'sessions_in_use': self._sessions_in_use,
+                'peak_sessions_in_use': self._peak_sessions_in_use,
+                'peak_utilization': self._peak_sessions_in_use / self.max_connection_pool_size,
+                'sessions_opened': opened,
+                'acquisition_timeouts': self._acquisition_timeouts,
+                'connection_failures': self._connection_failures,
+                'avg_session_ms': (self._session_seconds / opened * 1000) if opened else 0.0
+            }
 
     def add_node(self, node_name, properties):
-        with self.begin_session() as session:
-            result = session.execute_write(self._add_node, node_name=node_name, **properties)
+        """创建节点并返回创建后的节点字典，包含 node_id, labels 和 properties"""
+        with self.write_session() as session:
+            result = session.execute_write(self._add_node, node_name, properties)
             return result
-    def _add_node(self, tx, node_name, **properties):
-        # 创建一个包含所有属性的字符串，格式为 "key1: $key1, key2: $key2, ..."
-        if properties:
-            properties_query = ", " + ", ".join([f"{key}: ${key}" for key in properties])
-        else:
-            properties_query = ""
-        query = f"CREATE (n:Node {{name: $node_name{properties_query}}}) RETURN n"
-        result = tx.run(query, node_name=node_name, **properties)
-        return result.single()[0] if result.peek() else None
+
+    def _add_node(self, tx, node_name, properties):
+        record = tx.run(ADD_NODE_QUERY, node_name=node_name, properties=properties).single()
+        return _node_record(record) if record else None
 
     # 删除节点并返回影响的节点
     def remove_node(self, node_name):
-        with self.begin_session() as session:
+        with self.write_session() as session:
             result = session.write_transaction(self._remove_node, node_name)
             return result
 
@@ -55,86 +567,99 @@ class Neo4jGraph:
         return result.single()[0] if result.peek() else None
 
     def remove_node_by_id(self, node_id):
-        with self.begin_session() as session:
+        """删除节点并返回删除前的节点字典，relationships 为随之删除的关系，节点不存在时返回 None"""
+        with self.write_session() as session:
             result = session.write_transaction(self._remove_node_by_id, node_id)
             return result
 
     def _remove_node_by_id(self, tx, node_id):
-        query = """
-        MATCH (n:Node)
-        WHERE id(n) = $node_id
-        DETACH DELETE n
-        RETURN n
-        """
-        result = tx.run(query, node_id=node_id)
-        return result.single()[0] if result.peek() else None
+        record = tx.run(REMOVE_NODE_BY_ID_QUERY, node_id=node_id).single()
+        return _removed_node_record(record) if record else None
 
-    # 更新节点并返回更新后的节点
+    # 更新节点并返回更新后的节点字典，节点不存在时返回 None
     def update_node_by_node_id(self, node_id, new_properties, new_labels=None):
         if (new_labels == None):new_labels = []
         if("Node" not in new_labels): new_labels.append("Node") #must have this label for global index
-        with self.begin_session() as session:
+        with self.write_session() as session:
             result = session.write_transaction(self._update_node_by_node_id, node_id, new_properties, new_labels)
             return result
 
     def _update_node_by_node_id(self, tx, node_id, new_properties, new_labels=None):
-        # Handle different update scenarios
-        if new_labels is not None and new_properties:
-            # Update both properties and labels
-            query = """
-            MATCH (n)
-            WHERE id(n) = $node_id
-            SET n += $new_properties
-            WITH n
-            CALL apoc.create.setLabels(n, $new_labels) YIELD node
-            RETURN node
-            """
-            result = tx.run(query, node_id=node_id, new_properties=new_properties, new_labels=new_labels)
-        elif new_labels is not None:
-            # Only update labels
-            query = """
-            MATCH (n)
-            WHERE id(n) = $node_id
-            CALL apoc.create.setLabels(n, $new_labels) YIELD node
-            RETURN node
-            """
-            result = tx.run(query, node_id=node_id, new_labels=new_labels)
-        elif new_properties:
-            # Only update properties
-            query = """
-            MATCH (n)
-            WHERE id(n) = $node_id
-            SET n += $new_properties
-            RETURN n
-            """
-            result = tx.run(query, node_id=node_id, new_properties=new_properties)
-        else:
-            # No updates to perform
-            query = """
-            MATCH (n)
-            WHERE id(n) = $node_id
-            RETURN n
-            """
-            result = tx.run(query, node_id=node_id)
-            
-        return result.single()[0] if result.peek() else None
+        query = _update_node_query(bool(new_properties), new_labels is not None)
+        record = tx.run(query, node_id=node_id, new_properties=new_properties, new_labels=new_labels).single()
+        return _node_record(record) if record else None
 
     def find_path(self, start_node_name, end_node_name):
+        """按节点名称查找路径，深度和返回数量受 path_max_depth/path_max_results 限制"""
         with self.begin_session() as session:
-            result = session.execute_read(self._find_path, start_node_name, end_node_name)
+            result = session.execute_read(unit_of_work(timeout=self.path_timeout)(self._find_path),
+                                          start_node_name, end_node_name)
             return result
 
     def _find_path(self, tx, start_node_name, end_node_name):
-        query = """
-        MATCH path = (a:Node {name: $start_node_name})-[*]->(b:Node {name: $end_node_name})
+        query = f"""
+        MATCH path = (a:Node {{name: $start_node_name}})-[*1..{int(self.path_max_depth)}]->(b:Node {{name: $end_node_name}})
         RETURN path
+        LIMIT $limit
         """
-        result = tx.run(query, start_node_name=start_node_name, end_node_name=end_node_name)
+        result = tx.run(query, start_node_name=start_node_name, end_node_name=end_node_name,
+                        limit=self.path_max_results)
         return [record["path"] for record in result]
 
+    def find_paths_by_id(self, start_node_id, end_node_id, k=1, max_depth=None,
+                         direction="out", rel_types=None, timeout=None):
+        """按节点ID查找最短的 k 条路径
+
+        k 为 1 时使用 shortestPath；k 大于 1 时从 1 跳开始逐层加深，每层只枚举恰好该长度的
+        无重复节点路径，凑够 k 条即停止，因此返回的是按跳数排序的 k 条最短路径。
+        Args:
+            start_node_id: 起始节点ID
+            end_node_id: 目标节点ID
+            k (int): 返回的路径数量，不超过 path_max_results
+            max_depth (int, optional): 最大跳数，不超过 path_max_depth
+            direction (str): 'out' 沿关系方向，'in' 逆关系方向，'both' 忽略方向
+            rel_types (list[str], optional): 只经过这些类型的关系
+            timeout (float, optional): 查询超时秒数，默认为 path_timeout
+        Returns:
+            list[dict]: 路径列表，每条路径包含 length, nodes 和 relationships
+        Raises:
+            ValueError: 参数不合法
+            TimeoutError: 查询超时
+        """
+        if direction not in _PATH_DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(_PATH_DIRECTIONS)}")
+        k = max(1, min(int(k), self.path_max_results))
+        max_depth = self.path_max_depth if max_depth is None else max(1, min(int(max_depth), self.path_max_depth))
+        timeout = self.path_timeout if timeout is None else timeout
+        work = unit_of_work(timeout=timeout)(self._find_paths_by_id)
+        try:
+            with self.begin_session() as session:
+                return session.execute_read(work, start_node_id, end_node_id, k, max_depth,
+                                            direction, list(rel_types or []))
+        except ClientError as e:
+            if "TransactionTimedOut" in (e.code or ""):
+                raise TimeoutError(f"Path query timed out after {timeout}s") from e
+            raise
+
+    def _find_paths_by_id(self, tx, start_node_id, end_node_id, k, max_depth, direction, rel_types):
+        if k == 1 and start_node_id != end_node_id:
+            query = _shortest_path_query(_path_pattern(direction, rel_types, 1, max_depth))
+            result = tx.run(query, start_node_id=start_node_id, end_node_id=end_node_id)
+            return [_path_record(record) for record in result]
+
+        paths = []
+        for depth in range(1, max_depth + 1):
+            query = _paths_of_length_query(_path_pattern(direction, rel_types, depth, depth))
+            result = tx.run(query, start_node_id=start_node_id, end_node_id=end_node_id,
+                            limit=k - len(paths))
+            paths += [_path_record(record) for record in result]
+            if len(paths) >= k:
+                break
+        return paths
+
     # 添加关系并返回新关系
     def add_relationship(self, start_node_name, end_node_name, relationship_type, properties):
-        with self.begin_session() as session:
+        with self.write_session() as session:
             result = session.write_transaction(self._add_relationship, start_node_name, end_node_name,
                                                relationship_type, properties)
             return result
@@ -150,7 +675,7 @@ class Neo4jGraph:
 
     # 删除关系并返回影响的关系
     def remove_relationship(self, start_node_name, end_node_name, relationship_type):
-        with self.begin_session() as session:
+        with self.write_session() as session:
             result = session.write_transaction(self._remove_relationship, start_node_name, end_node_name,
                                                relationship_type)
             return result
@@ -165,50 +690,139 @@ class Neo4jGraph:
         return result.single()[0] if result.peek() else None
 
     def remove_relationship_by_id(self, relationship_id):
-        with self.begin_session() as session:
+        """删除关系并返回删除前的关系字典，关系不存在时返回 None"""
+        with self.write_session() as session:
             result = session.write_transaction(self._remove_relationship_by_id, relationship_id)
             return result
 
     def _remove_relationship_by_id(self, tx, relationship_id):
-        query = """
-        MATCH (a)-[r]->(b)
-        WHERE id(r) = $relationship_id
-        DELETE r
-        RETURN r
-        """
-        result = tx.run(query, relationship_id=relationship_id)
-        return result.single()[0] if result.peek() else None
+        record = tx.run(REMOVE_RELATIONSHIP_BY_ID_QUERY, relationship_id=relationship_id).single()
+        return _relationship_record(record) if record else None
 
    
 
-    # 更新关系并返回更新后的关系
+    # 更新关系并返回更新后的关系字典（包含两端节点），关系不存在时返回 None
     def update_relationship_by_rel_id(self, rel_id, new_properties, new_type=None):
-        with self.begin_session() as session:
+        with self.write_session() as session:
             result = session.write_transaction(self._update_relationship_by_rel_id, rel_id, new_properties, new_type)
             return result
 
     def _update_relationship_by_rel_id(self, tx, rel_id, new_properties, new_type=None):
-        if new_type:
-            # Update both type and properties
-            query = """
-            MATCH ()-[r]->()
-            WHERE id(r) = $rel_id
-            SET r += $new_properties
-            WITH r
-            CALL apoc.refactor.setType(r, $new_type) YIELD input, output
-            RETURN output
-            """
-            result = tx.run(query, rel_id=rel_id, new_properties=new_properties, new_type=new_type)
-        else:
-            # Only update properties
-            query = """
-            MATCH ()-[r]->()
-            WHERE id(r) = $rel_id
-            SET r += $new_properties
-            RETURN r
-            """
-            result = tx.run(query, rel_id=rel_id, new_properties=new_properties)
-        return result.single()[0] if result.peek() else None
+        query = _update_relationship_query(bool(new_type))
+        record = tx.run(query, rel_id=rel_id, new_properties=new_properties, new_type=new_type).single()
+        return _relationship_record(record) if record else None
+
+    def execute_batch(self, operations):
+        """在一个事务中按顺序执行一组节点和关系操作，任一操作失败时整体回滚
+
+        每个操作是一个字典，op 为操作类型：
+            create_node:         labels, properties
+            update_node:         id, properties, labels（可选，不提供时不修改标签）
+            delete_node:         id
+            create_relationship: start, end, type, properties
+            update_relationship: id, properties, type（可选）
+            delete_relationship: id
+        创建操作可以提供 ref 作为临时ID，后续操作的 id/start/end 传入该字符串即引用创建出的对象。
+        Args:
+            operations (list[dict]): 操作列表
+        Returns:
+            list[dict]: 与 operations 一一对应的 {'op', 'ref', 'result'}，result 为写入后的记录，
+                        删除操作为删除前的记录
+        Raises:
+            ValueError: 操作类型未知、引用了不存在的临时ID或目标不存在
+        """
+        with self.write_session() as session:
+            return session.execute_write(self._execute_batch, operations)
+
+    def _execute_batch(self, tx, operations):
+        refs = {}
+        results = []
+        for index, operation in enumerate(operations):
+            op = operation.get('op')
+            handler = self._BATCH_OPERATIONS.get(op)
+            if handler is None:
+                raise ValueError(f"Operation {index}: unknown op '{op}'")
+            try:
+                result = handler(self, tx, operation, refs)
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"Operation {index} ({op}): {e}") from e
+            if operation.get('ref') is not None:
+                refs[operation['ref']] = result['node_id'] if 'node_id' in result else result['rel_id']
+            results.append({'op': op, 'ref': operation.get('ref'), 'result': result})
+        return results
+
+    @staticmethod
+    def _resolve_ref(value, refs):
+        """把临时ID解析为本批次中创建的对象ID，数字ID原样返回"""
+        if isinstance(value, str):
+            if value not in refs:
+                raise ValueError(f"unknown ref '{value}'")
+            return refs[value]
+        return value
+
+    def _batch_create_node(self, tx, operation, refs):
+        node = self._add_node(tx, "Node", operation.get('properties') or {})
+        labels = operation.get('labels')
+        if labels:
+            labels = list(labels)
+            if "Node" not in labels:
+                labels.append("Node")
+            node = self._update_node_by_node_id(tx, node['node_id'], {}, labels)
+        return node
+
+    def _batch_update_node(self, tx, operation, refs):
+        node_id = self._resolve_ref(operation['id'], refs)
+        labels = operation.get('labels')
+        if labels is not None:
+            labels = list(labels)
+            if "Node" not in labels:
+                labels.append("Node")
+        node = self._update_node_by_node_id(tx, node_id, operation.get('properties') or {}, labels)
+        if node is None:
+            raise ValueError(f"Node ID:{node_id} not exist")
+        return node
+
+    def _batch_delete_node(self, tx, operation, refs):
+        node_id = self._resolve_ref(operation['id'], refs)
+        node = self._remove_node_by_id(tx, node_id)
+        if node is None:
+            raise ValueError(f"Node ID:{node_id} not exist")
+        return node
+
+    def _batch_create_relationship(self, tx, operation, refs):
+        return self._add_relationship_by_nodes_id(tx,
+                                                  self._resolve_ref(operation['start'], refs),
+                                                  self._resolve_ref(operation['end'], refs),
+                                                  operation.get('type') or 'CONNECTS_TO',
+                                                  operation.get('properties') or {})
+
+    def _batch_update_relationship(self, tx, operation, refs):
+        rel_id = self._resolve_ref(operation['id'], refs)
+        relationship = self._update_relationship_by_rel_id(tx, rel_id, operation.get('properties') or {},
+                                                           operation.get('type'))
+        if relationship is None:
+            raise ValueError(f"Relationship ID:{rel_id} not exist")
+        relationship['previous_rel_id'] = rel_id
+        if isinstance(operation['id'], str):
+            # 修改类型后关系ID会变化，让后续操作引用新的关系
+            refs[operation['id']] = relationship['rel_id']
+        return relationship
+
+    def _batch_delete_relationship(self, tx, operation, refs):
+        rel_id = self._resolve_ref(operation['id'], refs)
+        relationship = self._remove_relationship_by_id(tx, rel_id)
+        if relationship is None:
+            raise ValueError(f"Relationship ID:{rel_id} not exist")
+        return relationship
+
+    _BATCH_OPERATIONS = {
+        'create_node': _batch_create_node,
+        'update_node': _batch_update_node,
+        'delete_node': _batch_delete_node,
+        'create_relationship': _batch_create_relationship,
+        'update_relationship': _batch_update_relationship,
+        'delete_relationship': _batch_delete_relationship,
+    }
 
     def get_all_nodes(self):
         """获取数据库中的所有节点
@@ -220,23 +834,76 @@ class Neo4jGraph:
             return session.execute_read(self._get_all_nodes)
 
     def _get_all_nodes(self, tx):
+        result = tx.run(GET_ALL_NODES_QUERY)
+        return [_node_record(record) for record in result]
+
+    def iter_all_nodes(self):
+        """流式遍历数据库中的所有节点，边读取边返回，不在内存中构建完整列表
+
+        Yields:
+            dict: 节点字典，包含 node_id, labels 和 properties
+        """
+        with self.begin_session() as session:
+            for record in session.run(GET_ALL_NODES_QUERY):
+                yield _node_record(record)
+
+    def get_nodes_page(self, after_id=None, limit=500):
+        """按节点ID升序分页获取节点
+
+        Args:
+            after_id: 上一页最后一个节点的ID，为 None 时从头开始
+            limit: 每页数量
+        Returns:
+            list: 节点字典列表，数量等于 limit 时可能还有下一页
+        """
+        with self.begin_session() as session:
+            return session.execute_read(self._get_nodes_page, after_id, limit)
+
+    def _get_nodes_page(self, tx, after_id, limit):
+        query = f"""
+        MATCH (n:Node)
+        WHERE id(n) IN range($start, $end)
+        WITH n ORDER BY id(n) LIMIT $limit
+        RETURN {_node_columns("n")}
+        """
+        return [_node_record(record) for record in _seek_page(tx, query, LAST_NODE_ID_QUERY, after_id, limit)]
+
+    def get_node_ids(self, after_id=None, limit=10000):
+        """按ID升序分页获取节点ID，只读取ID不读取属性
+
+        Returns:
+            list[int]: 节点ID列表，数量等于 limit 时可能还有下一页
+        """
+        with self.begin_session() as session:
+            return session.execute_read(self._get_node_ids, after_id, limit)
+
+    def _get_node_ids(self, tx, after_id, limit):
         query = """
         MATCH (n:Node)
-        RETURN id(n) as node_id, labels(n) as node_labels, 
-               keys(n) as node_keys, [k in keys(n) | n[k]] as node_values
+        WHERE id(n) IN range($start, $end)
+        WITH id(n) as node_id ORDER BY node_id LIMIT $limit
+        RETURN node_id
         """
-        result = tx.run(query)
-        
-        nodes = []
-        for record in result:
-            node = {
-                'node_id': record['node_id'],
-                'labels': record['node_labels'],
-                'properties': dict(zip(record['node_keys'], record['node_values']))
-            }
-            nodes.append(node)
-        
-        return nodes
+        return [record['node_id'] for record in _seek_page(tx, query, LAST_NODE_ID_QUERY, after_id, limit)]
+
+    def get_degrees(self, after_id=None, limit=10000):
+        """按ID升序分页获取节点的入度和出度，度数由 COUNT 子查询从节点的关系链读取，不展开关系
+
+        Returns:
+            list[tuple[int, int, int]]: (节点ID, 入度, 出度)，数量等于 limit 时可能还有下一页
+        """
+        with self.begin_session() as session:
+            return session.execute_read(self._get_degrees, after_id, limit)
+
+    def _get_degrees(self, tx, after_id, limit):
+        query = """
+        MATCH (n:Node)
+        WHERE id(n) IN range($start, $end)
+        WITH n ORDER BY id(n) LIMIT $limit
+        RETURN id(n) as node_id, COUNT { (n)<--() } as in_degree, COUNT { (n)-->() } as out_degree
+        """
+        return [(record['node_id'], record['in_degree'], record['out_degree'])
+                for record in _seek_page(tx, query, LAST_NODE_ID_QUERY, after_id, limit)]
 
     def get_nodes_by_name(self, node_name):
         with self.begin_session() as session:
@@ -254,26 +921,8 @@ class Neo4jGraph:
             return result
 
     def _get_node_by_id(self, tx, node_id):
-        query = """
-        MATCH (n)
-        WHERE id(n) = $node_id
-        RETURN id(n) as node_id, labels(n) as node_labels, keys(n) as node_keys, 
-               [k in keys(n) | n[k]] as node_values
-        """
-        params = {'node_id': node_id}
-        result = tx.run(query, **params)
-
-        # 构建结果字典，包含节点的详细信息
-        node = None
-        for record in result:
-            node = {
-                'node_id': record['node_id'],
-                'labels': record['node_labels'],
-                'properties': dict(zip(record['node_keys'], record['node_values'])),
-            }
-
-
-        return node
+        record = tx.run(GET_NODE_BY_ID_QUERY, node_id=node_id).single()
+        return _node_record(record) if record else None
 
     def get_relationships_by_nodes_id(self, start_node_id, end_node_id):
         with self.begin_session() as session:
@@ -281,10 +930,10 @@ class Neo4jGraph:
             return result
 
     def _get_relationships_by_nodes_id(self, tx, start_node_id, end_node_id):
-        query = """
+        query = f"""
         MATCH (a:Node)-[r]-(b:Node)
         WHERE id(a) = $start_node_id AND id(b) = $end_node_id
-        RETURN id(r) as rel_id, keys(r) as rel_keys, [k in keys(r) | r[k] ] as rel_values, 
+        RETURN id(r) as rel_id, {_visible_keys("r")} as rel_keys, [k in {_visible_keys("r")} | r[k] ] as rel_values, 
                type(r) as rel_type, id(a) as start_node_id, id(b) as end_node_id
         """
         params = {'start_node_id': start_node_id, 'end_node_id': end_node_id}
@@ -304,37 +953,26 @@ class Neo4jGraph:
 
         return relationships
 
-    def get_relationship_by_id(self, relationship_id):
-        with self.begin_session() as session:
-            result = session.read_transaction(self._get_relationship_by_id, relationship_id)
-            return result
+    def get_relationship_by_id(self, relationship_id, with_nodes=False):
+        """根据ID获取关系
 
-    def _get_relationship_by_id(self, tx, relationship_id):
-        query = """
-        MATCH (a)-[r]->(b)
-        WHERE id(r) = $relationship_id
-        RETURN id(r) as rel_id, keys(r) as rel_keys, [k in keys(r) | r[k] ] as rel_values, 
-               type(r) as rel_type, id(a) as start_node_id, id(b) as end_node_id
+        Args:
+            relationship_id: 关系ID
+            with_nodes: 为 True 时在同一条查询中一并返回两端节点的完整信息
+        Returns:
+            dict: 关系字典，关系不存在时返回空列表
         """
-        params = {'relationship_id': relationship_id}
-        result = tx.run(query, **params)
-
-        # 构建结果列表，每个结果是一个字典，包含关系的详细信息
-        relationship = []
-        for record in result:
-            relationship = {
-                'rel_id': record['rel_id'],
-                'properties': dict(zip(record['rel_keys'], record['rel_values'])),
-                'type': record['rel_type'],
-                'start_node_id': record['start_node_id'],
-                'end_node_id': record['end_node_id']
-            }
-
+        with self.begin_session() as session:
+            result = session.read_transaction(self._get_relationship_by_id, relationship_id, with_nodes)
+            return result
 
-        return relationship
+    def _get_relationship_by_id(self, tx, relationship_id, with_nodes=False):
+        result = tx.run(_relationship_by_id_query(with_nodes), relationship_id=relationship_id)
+        record = result.single()
+        return _relationship_record(record) if record else []
 
     def find_nodes_by_length(self, start_node_name, length):
-        with self.driver.session() as session:
+        with self.begin_session() as session:
             return session.execute_read(self._find_nodes_by_length, start_node_name, length)
 
     def _find_nodes_by_length(self, tx, start_node_name, length):
@@ -347,74 +985,74 @@ class Neo4jGraph:
         nodes = [record["b"] for record in result]
         return nodes
 
-    def find_nodes_by_id_and_length(self, start_node_id, length):
+    def find_nodes_by_id_and_length(self, start_node_id, length, frontier_limit=None):
+        """获取从起始节点沿出边 length 跳以内可到达的节点，按到达的跳数排列
+
+        逐层扩展并记录已访问的节点，开销取决于到达的节点数量而不是路径数量；
+        每一层最多保留 frontier_limit 个节点（超过时保留ID最小的），默认为 nearby_frontier_limit。
+        """
         with self.begin_session() as session:
-            return session.execute_read(self._find_nodes_by_id_and_length, start_node_id, length)
+            return session.execute_read(self._find_nodes_by_id_and_length, start_node_id, length,
+                                        frontier_limit or self.nearby_frontier_limit)
 
-    def _find_nodes_by_id_and_length(self, tx, start_node_id, length):
-        query = """
-        MATCH (a)-[*1..{}]->(b)
-        WHERE id(a) = $start_node_id AND id(a) <> id(b)
-        RETURN DISTINCT id(b) as node_id
-        """.format(length)
-        result = tx.run(query, start_node_id=start_node_id)
-        return [record for record in result]
+    def _find_nodes_by_id_and_length(self, tx, start_node_id, length, frontier_limit):
+        node_ids = self._expand_neighborhood(tx, start_node_id, length, frontier_limit)
+        return _ordered_node_records(tx.run(NODES_BY_IDS_QUERY, node_ids=node_ids), node_ids) if node_ids else []
+
+    def _expand_neighborhood(self, tx, start_node_id, max_depth, frontier_limit, rng=None):
+        """按层扩展邻域，返回到达的节点ID（不含起始节点），rng 的含义见 _next_frontier"""
+        expansion = _NeighborhoodExpansion(start_node_id, max_depth, frontier_limit, rng)
+        while not expansion.done:
+            result = tx.run(NEIGHBOR_IDS_QUERY, node_ids=expansion.frontier)
+            expansion.advance([record['node_id'] for record in result])
+        return expansion.reached
 
     def get_random_nodes(self, n):
-        with self.driver.session() as session:
+        """按 ORDER BY rand() 随机获取节点，需要扫描全部节点；应用中使用 Neo4jDataProcessor.NodeSampler"""
+        with self.begin_session() as session:
             return session.execute_read(self._get_random_nodes, n)
 
     def _get_random_nodes(self, tx, n):
-        query = "MATCH (n:Node) RETURN id(n) AS node_id ORDER BY RAND() LIMIT $n"
+        query = f"""
+        MATCH (n:Node)
+        WITH n ORDER BY RAND() LIMIT $n
+        RETURN {_node_columns("n")}
+        """
         result = tx.run(query, n=n)
-        node_ids = [record["node_id"] for record in result]
-        return [self._get_node_by_id(tx, node_id) for node_id in node_ids]
+        return [_node_record(record) for record in result]
 
     def add_relationship_by_nodes_id(self, start_node_id, end_node_id, relationship_type, properties):
-        with self.begin_session() as session:
+        """创建关系并返回创建后的关系字典（包含两端节点）
+
+        Raises:
+            ValueError: 起始节点或目标节点不存在
+        """
+        with self.write_session() as session:
             result = session.write_transaction(self._add_relationship_by_nodes_id, 
                                             start_node_id, end_node_id,
                                             relationship_type, properties)
             return result
 
     def _add_relationship_by_nodes_id(self, tx, start_node_id, end_node_id, relationship_type, properties):
-        query = f"""
-        MATCH (a:Node), (b:Node)
-        WHERE id(a) = $start_node_id AND id(b) = $end_node_id
-        CREATE (a)-[r:{relationship_type} $properties]->(b)
-        RETURN id(r) as rel_id, type(r) as rel_type, 
-               id(a) as start_node_id, id(b) as end_node_id
-        """
-        result = tx.run(query, start_node_id=start_node_id, end_node_id=end_node_id, 
-                       properties=properties)
-        record = result.single()
-        if record:
-            return {
-                'rel_id': record['rel_id'],
-                'type': record['rel_type'],
-                'start_node_id': record['start_node_id'],
-                'end_node_id': record['end_node_id']
-            }
-        return None
+        record = tx.run(_add_relationship_by_nodes_id_query(relationship_type),
+                        start_node_id=start_node_id, end_node_id=end_node_id,
+                        properties=properties).single()
+        return _created_relationship_record(record, start_node_id, end_node_id)
+
+    def get_random_nearby_nodes(self, start_node_id, count, max_depth, seed=None):
+        """从起始节点 max_depth 跳以内可到达的节点中随机抽取 count 个
 
-    def get_random_nearby_nodes(self, start_node_id, count, max_depth):
+        与 find_nodes_by_id_and_length 相同地逐层扩展，每层边界超过上限时随机保留，
+        最后在到达的节点中抽样，只读取抽中的节点。seed 用于得到可重复的样本，为 None 时每次随机。
+        """
         with self.begin_session() as session:
-            return session.execute_read(self._get_random_nearby_nodes, 
-                                     start_node_id, count, max_depth)
+            return session.execute_read(self._get_random_nearby_nodes,
+                                        start_node_id, count, max_depth, random.Random(seed))
 
-    def _get_random_nearby_nodes(self, tx, start_node_id, count, max_depth):
-        query = """
-        MATCH (a)-[*1..{}]->(b)
-        WHERE id(a) = $start_node_id AND id(a) <> id(b)
-        WITH DISTINCT b
-        RETURN id(b) as node_id
-        ORDER BY rand()
-        LIMIT $count
-        """.format(max_depth)
-        result = tx.run(query, 
-                       start_node_id=start_node_id, 
-                       count=count)
-        return [record for record in result]
+    def _get_random_nearby_nodes(self, tx, start_node_id, count, max_depth, rng):
+        reached = self._expand_neighborhood(tx, start_node_id, max_depth, self.nearby_frontier_limit, rng)
+        node_ids = rng.sample(reached, min(count, len(reached)))
+        return _ordered_node_records(tx.run(NODES_BY_IDS_QUERY, node_ids=node_ids), node_ids) if node_ids else []
 
     def search_nodes(self, name=None, limit=3):
         """根据节点名字模糊搜索节点
@@ -428,27 +1066,11 @@ class Neo4jGraph:
             return session.read_transaction(self._search_nodes, name, limit)
 
     def _search_nodes(self, tx, name=None, limit=3):
-        # 构建查询条件
-        query = ""
-        params = {}
-
-        # 处理名字条件
-        if name:
-            # 使用全文索引进行模糊搜索
-            query = (
-                f"CALL db.index.fulltext.queryNodes('{NODE_INDEX_NAME}', $name) "
-                "YIELD node "
-                "RETURN node "
-                f"LIMIT {limit}"
-            )
-            params["name"] = f'"{name}"'
-
-        result = tx.run(query, **params)
-        node_list = []
-       
-        return [{"node_id": record["node"].id, 
-                "labels": record["node"].labels,
-                "properties": dict(record["node"]._properties)} for record in result]
+        if not name:
+            return []
+        # 使用全文索引进行模糊搜索
+        result = tx.run(SEARCH_NODES_QUERY, name=f'"{name}"', limit=limit)
+        return [_node_record(record) for record in result]
 
     def search_relationships(self, rel_type=None, limit=3):
         """根据关系类型和属性模糊搜索关系
@@ -473,21 +1095,14 @@ class Neo4jGraph:
             query = (
                 f"CALL db.index.fulltext.queryRelationships('{RELATIONSHIP_INDEX_NAME}', $rel_type) "
                 "YIELD relationship, score "
-                "RETURN id(relationship) as rel_id, "
-                "type(relationship) as type, "
-                "properties(relationship) as properties, "
-                "id(startNode(relationship)) as start_node_id, "
-                "id(endNode(relationship)) as end_node_id "
+                "WITH relationship as r, startNode(relationship) as a, endNode(relationship) as b "
+                f"RETURN {_relationship_columns(with_nodes=True)} "
                 f"LIMIT {limit}"
             )
             params["rel_type"] = f'"{rel_type}"'
 
         result = tx.run(query, **params)
-        return [{"rel_id": record["rel_id"],
-                 "type": record["type"],
-                 "properties": record["properties"],
-                 "start_node_id": record["start_node_id"],
-                 "end_node_id": record["end_node_id"]} for record in result]
+        return [_relationship_record(record) for record in result]
 
     def create_indexes(self):
         """创建全文索引"""
@@ -499,6 +1114,20 @@ class Neo4jGraph:
                     FOR (n:Node)
                     ON EACH [n.name]
                 """)
+
+                # 增量检测修改时按写入时间戳查找节点
+                session.run(f"""
+                    CREATE INDEX {UPDATED_AT_INDEX_NAME} IF NOT EXISTS
+                    FOR (n:Node)
+                    ON (n.{UPDATED_AT_PROPERTY})
+                """)
+
+                # 批量导入时按外部主键查找节点
+                session.run(f"""
+                    CREATE INDEX {IMPORT_KEY_INDEX_NAME} IF NOT EXISTS
+                    FOR (n:Node)
+                    ON (n.{IMPORT_KEY_PROPERTY})
+                """)
                 
                 # # 创建关系全文索引
                 # session.run(f"""
@@ -510,6 +1139,363 @@ class Neo4jGraph:
             except Exception as e:
                 print(f"创建索引时出错: {str(e)}")
 
+    def add_nodes_bulk(self, rows, batch_size=1000, on_batch=None):
+        """使用 UNWIND 按批次写入节点，每批一个事务，输入按批次流式读取
+
+        带 key 的节点按 IMPORT_KEY_PROPERTY MERGE，重复导入同一批不会产生重复节点，
+        因此导入失败后可以从上一个完成的批次继续。
+
+        Args:
+            rows: 可迭代对象，每项为 {'key': 外部主键, 'labels': [...], 'properties': {...}}，
+                  key 和 labels 可省略，所有节点都带有 Node 标签
+            batch_size: 每个事务写入的节点数量
+            on_batch: 每批提交后调用 on_batch(batch, result)，result 为
+                      [{'key': 外部主键, 'node_id': 节点ID}, ...]
+        Returns:
+            int: 写入的节点总数
+        """
+        total = 0
+        for batch in _batches(rows, batch_size):
+            with self.write_session() as session:
+                result = session.execute_write(self._add_nodes_batch, batch)
+            total += len(result)
+            if on_batch:
+                on_batch(batch, result)
+        return total
+
+    def _add_nodes_batch(self, tx, batch):
+        keyed = [row for row in batch if row.get('key') is not None]
+        unkeyed = [row for row in batch if row.get('key') is None]
+        created = []
+        if keyed:
+            query = f"""
+            UNWIND $rows as row
+            MERGE (n:Node {{{IMPORT_KEY_PROPERTY}: row.key}})
+            SET n += row.properties, n.{UPDATED_AT_PROPERTY} = timestamp()
+            WITH n, row
+            CALL apoc.create.addLabels(n, row.labels) YIELD node
+            RETURN row.key as key, id(node) as node_id
+            """
+            created += [record.data() for record in tx.run(query, rows=self._bulk_node_rows(keyed))]
+        if unkeyed:
+            query = f"""
+            UNWIND $rows as row
+            CREATE (n:Node)
+            SET n = row.properties, n.{UPDATED_AT_PROPERTY} = timestamp()
+            WITH n, row
+            CALL apoc.create.addLabels(n, row.labels) YIELD node
+            RETURN null as key, id(node) as node_id
+            """
+            created += [record.data() for record in tx.run(query, rows=self._bulk_node_rows(unkeyed))]
+        return created
+
+    @staticmethod
+    def _bulk_node_rows(rows):
+        return [{
+            'key': row.get('key'),
+            'labels': [label for label in (row.get('labels') or []) if label != "Node"],
+            'properties': row.get('properties') or {}
+        } for row in rows]
+
+    def add_relationships_bulk(self, rows, batch_size=1000, on_batch=None):
+        """使用 UNWIND 按批次写入关系，两端节点通过导入时的外部主键查找
+
+        同一批内按关系类型分组，每组一条 UNWIND 语句，所有分组在同一个事务中提交。
+        带 key 的关系按 IMPORT_KEY_PROPERTY MERGE，可安全地重复导入。
+
+        Args:
+            rows: 可迭代对象，每项为 {'start_key', 'end_key', 'type', 'key'(可选), 'properties'(可选)}
+            batch_size: 每个事务写入的关系数量
+            on_batch: 每批提交后调用 on_batch(batch, result)，result 为
+                      {'created': 写入数量, 'skipped': 因端点不存在而跳过的数量}
+        Returns:
+            dict: 写入和跳过的关系总数
+        """
+        totals = {'created': 0, 'skipped': 0}
+        for batch in _batches(rows, batch_size):
+            with self.write_session() as session:
+                created = session.execute_write(self._add_relationships_batch, batch)
+            result = {'created': created, 'skipped': len(batch) - created}
+            totals['created'] += result['created']
+            totals['skipped'] += result['skipped']
+            if on_batch:
+                on_batch(batch, result)
+        return totals
+
+    def _add_relationships_batch(self, tx, batch):
+        groups = {}
+        for row in batch:
+            keyed = row.get('key') is not None
+            groups.setdefault((row.get('type') or 'CONNECTS_TO', keyed), []).append({
+                'start_key': row['start_key'],
+                'end_key': row['end_key'],
+                'key': row.get('key'),
+                'properties': row.get('properties') or {}
+            })
+        created = 0
+        for (relationship_type, keyed), group in groups.items():
+            if keyed:
+                write = (f"MERGE (a)-[r:{_quote_identifier(relationship_type)} "
+                         f"{{{IMPORT_KEY_PROPERTY}: row.key}}]->(b)")
+            else:
+                write = f"CREATE (a)-[r:{_quote_identifier(relationship_type)}]->(b)"
+            query = f"""
+            UNWIND $rows as row
+            MATCH (a:Node {{{IMPORT_KEY_PROPERTY}: row.start_key}})
+            MATCH (b:Node {{{IMPORT_KEY_PROPERTY}: row.end_key}})
+            {write}
+            SET r += row.properties, r.{UPDATED_AT_PROPERTY} = timestamp()
+            RETURN count(r) as created
+            """
+            created += tx.run(query, rows=group).single()['created']
+        return created
+
+    def export_graph(self):
+        """在一个读事务中流式读取全部节点和关系，两次查询看到同一个一致的图
+
+        Returns:
+            dict: {'nodes': [节点字典], 'relationships': [关系字典（只包含两端节点ID）]}
+        """
+        with self.begin_session() as session:
+            return session.execute_read(self._export_graph)
+
+    def _export_graph(self, tx):
+        query = f"""
+        MATCH (n:Node)
+        RETURN {_node_columns("n")}, {_fingerprint_column("n")}
+        """
+        nodes = [dict(_node_record(record), fingerprint=int(record['fingerprint'], 16))
+                 for record in tx.run(query)]
+        query = f"""
+        MATCH (a:Node)-[r]->(b:Node)
+        RETURN {_relationship_columns()}, {_fingerprint_column("r")}
+        """
+        relationships = [dict(_relationship_record(record), fingerprint=int(record['fingerprint'], 16))
+                         for record in tx.run(query)]
+        return {'nodes': nodes, 'relationships': relationships}
+
+    def export_topology(self):
+        """在一个读事务中读取全部节点ID和关系的 (ID, 起点ID, 终点ID, 类型)，不读取属性
+
+        Returns:
+            dict: {'node_ids': [...], 'rel_ids': [...], 'start_node_ids': [...],
+                   'end_node_ids': [...], 'types': [...]}，关系的各列按下标对应
+        """
+        with self.begin_session() as session:
+            return session.execute_read(self._export_topology)
+
+    def _export_topology(self, tx):
+        node_ids = [record['node_id'] for record in tx.run("MATCH (n:Node) RETURN id(n) as node_id")]
+        query = """
+        MATCH (a:Node)-[r]->(b:Node)
+        RETURN id(r) as rel_id, id(a) as start_node_id, id(b) as end_node_id, type(r) as rel_type
+        """
+        columns = {'node_ids': node_ids, 'rel_ids': [], 'start_node_ids': [], 'end_node_ids': [], 'types': []}
+        for record in tx.run(query):
+            columns['rel_ids'].append(record['rel_id'])
+            columns['start_node_ids'].append(record['start_node_id'])
+            columns['end_node_ids'].append(record['end_node_id'])
+            columns['types'].append(record['rel_type'])
+        return columns
+
+    def clear_graph(self, chunk_size=10000, on_chunk=None):
+        """分块 DETACH DELETE 删除全部节点，每块一个事务，避免单个事务占用过多内存
+
+        Args:
+            on_chunk: 每块提交后调用 on_chunk(deleted)，deleted 为该块删除的节点数量
+        Returns:
+            int: 删除的节点总数
+        """
+        total = 0
+        while True:
+            with self.write_session() as session:
+                deleted = session.execute_write(self._clear_graph_chunk, chunk_size)
+            if not deleted:
+                return total
+            total += deleted
+            if on_chunk:
+                on_chunk(deleted)
+
+    def _clear_graph_chunk(self, tx, chunk_size):
+        query = """
+        MATCH (n:Node)
+        WITH n LIMIT $chunk_size
+        DETACH DELETE n
+        RETURN count(*) as deleted
+        """
+        return tx.run(query, chunk_size=chunk_size).single()['deleted']
+
+    def restore_nodes(self, nodes):
+        """在一个事务中用 UNWIND 重建一块节点
+
+        Args:
+            nodes: [{'node_id': 原节点ID, 'labels': [...], 'properties': {...}}]
+        Returns:
+            dict: 原节点ID -> 新节点ID
+        """
+        with self.write_session() as session:
+            return session.execute_write(self._restore_nodes, nodes)
+
+    def _restore_nodes(self, tx, nodes):
+        query = f"""
+        UNWIND $rows as row
+        CREATE (n:Node)
+        SET n = row.properties, n.{UPDATED_AT_PROPERTY} = timestamp()
+        WITH n, row
+        CALL apoc.create.addLabels(n, row.labels) YIELD node
+        RETURN row.old_id as old_id, id(node) as node_id
+        """
+        rows = [{
+            'old_id': node['node_id'],
+            'labels': [label for label in node['labels'] if label != "Node"],
+            'properties': node['properties']
+        } for node in nodes]
+        return {record['old_id']: record['node_id'] for record in tx.run(query, rows=rows)}
+
+    def restore_relationships(self, relationships, node_id_map):
+        """在一个事务中用 UNWIND 重建一块关系，按关系类型分组，每组一条语句
+
+        Args:
+            relationships: [{'rel_id'(可选), 'type', 'properties', 'start_node_id', 'end_node_id'}]，
+                rel_id 为原关系ID，端点为原节点ID
+            node_id_map: 原节点ID -> 新节点ID，端点不在映射中的关系被跳过
+        Returns:
+            list: 创建的关系字典（只包含两端节点ID），snapshot_rel_id 为对应的原关系ID
+        """
+        with self.write_session() as session:
+            return session.execute_write(self._restore_relationships, relationships, node_id_map)
+
+    def _restore_relationships(self, tx, relationships, node_id_map):
+        groups = {}
+        for relationship in relationships:
+            start_id = node_id_map.get(relationship['start_node_id'])
+            end_id = node_id_map.get(relationship['end_node_id'])
+            if start_id is None or end_id is None:
+                continue
+            groups.setdefault(relationship['type'], []).append({
+                'old_id': relationship.get('rel_id'),
+                'start_id': start_id,
+                'end_id': end_id,
+                'properties': relationship['properties']
+            })
+        created = []
+        for relationship_type, group in groups.items():
+            query = f"""
+            UNWIND $rows as row
+            MATCH (a) WHERE id(a) = row.start_id
+            MATCH (b) WHERE id(b) = row.end_id
+            CREATE (a)-[r:{_quote_identifier(relationship_type)}]->(b)
+            SET r = row.properties, r.{UPDATED_AT_PROPERTY} = timestamp()
+            RETURN {_relationship_columns()}, row.old_id as snapshot_rel_id
+            """
+            created += [dict(_relationship_record(record), snapshot_rel_id=record['snapshot_rel_id'])
+                        for record in tx.run(query, rows=group)]
+        return created
+
+    def apply_graph_diff(self, diff):
+        """在一个事务中应用快照与当前图之间的差异，未涉及的节点和关系保持原ID不变
+
+        Args:
+            diff (dict):
+                delete_relationships / delete_nodes: 要删除的关系ID、节点ID
+                revert_nodes: [{'node_id', 'labels', 'properties'}]，把已有节点恢复为快照中的标签和属性
+                revert_relationships: [{'rel_id', 'properties'}]，把已有关系恢复为快照中的属性
+                create_nodes: [{'node_id': 快照中的节点ID, 'labels', 'properties'}]
+                create_relationships: [{'type', 'properties', 'start_node_id', 'end_node_id'}]，
+                    端点为快照中的节点ID，未在 create_nodes 中重建的端点保持原ID
+        Returns:
+            dict: node_id_map（快照节点ID -> 重建后的节点ID）和 relationships（创建的关系字典）
+        """
+        with self.write_session() as session:
+            return session.execute_write(self._apply_graph_diff, diff)
+
+    def _apply_graph_diff(self, tx, diff):
+        if diff['delete_relationships']:
+            query = """
+            UNWIND $ids as rel_id
+            MATCH ()-[r]->() WHERE id(r) = rel_id
+            DELETE r
+            """
+            tx.run(query, ids=diff['delete_relationships']).consume()
+        if diff['delete_nodes']:
+            query = """
+            UNWIND $ids as node_id
+            MATCH (n:Node) WHERE id(n) = node_id
+            DETACH DELETE n
+            """
+            tx.run(query, ids=diff['delete_nodes']).consume()
+        if diff['revert_nodes']:
+            query = f"""
+            UNWIND $rows as row
+            MATCH (n:Node) WHERE id(n) = row.node_id
+            SET n = row.properties, n.{UPDATED_AT_PROPERTY} = timestamp()
+            WITH n, row
+            CALL apoc.create.setLabels(n, row.labels) YIELD node
+            RETURN count(node) as reverted
+            """
+            rows = [{
+                'node_id': node['node_id'],
+                'labels': list(set(node['labels']) | {"Node"}),
+                'properties': node['properties']
+            } for node in diff['revert_nodes']]
+            tx.run(query, rows=rows).consume()
+        if diff['revert_relationships']:
+            query = f"""
+            UNWIND $rows as row
+            MATCH ()-[r]->() WHERE id(r) = row.rel_id
+            SET r = row.properties, r.{UPDATED_AT_PROPERTY} = timestamp()
+            """
+            rows = [{'rel_id': rel['rel_id'], 'properties': rel['properties']}
+                    for rel in diff['revert_relationships']]
+            tx.run(query, rows=rows).consume()
+        node_id_map = self._restore_nodes(tx, diff['create_nodes']) if diff['create_nodes'] else {}
+        endpoints = {node_id for rel in diff['create_relationships']
+                     for node_id in (rel['start_node_id'], rel['end_node_id'])}
+        relationships = self._restore_relationships(
+            tx, diff['create_relationships'],
+            {node_id: node_id_map.get(node_id, node_id) for node_id in endpoints}
+        ) if diff['create_relationships'] else []
+        return {'node_id_map': node_id_map, 'relationships': relationships}
+
+    def merge_nodes(self, node_ids, properties="discard"):
+        """在一个事务中把一组节点合并到第一个节点
+
+        其余节点的关系改接到第一个节点，合并后类型、方向和另一端都相同的关系合并为一条，
+        这组节点之间的关系被删除，其余节点随后被删除。
+        Args:
+            node_ids (list[int]): 要合并的节点ID，第一个为保留的节点
+            properties (str): 属性冲突时的处理方式：'discard' 保留第一个节点的值，
+                'overwrite' 用后面节点的值覆盖，'combine' 把不同的值合并为数组；缺少的属性总是被补上
+        Returns:
+            dict: {'node': 合并后的节点字典, 'deleted_relationships', 'created_relationships',
+                   'updated_relationships': 关系字典列表}，有节点不存在时返回 None
+        Raises:
+            ValueError: 参数不合法
+        """
+        node_ids = list(dict.fromkeys(node_ids))
+        if len(node_ids) < 2:
+            raise ValueError("At least two distinct nodes are required to merge")
+        if properties not in MERGE_PROPERTY_POLICIES:
+            raise ValueError(f"properties must be one of {', '.join(MERGE_PROPERTY_POLICIES)}")
+        with self.write_session() as session:
+            return session.execute_write(self._merge_nodes, node_ids, properties)
+
+    def _merge_nodes(self, tx, node_ids, properties):
+        before = {record['rel_id']: _relationship_record(record)
+                  for record in tx.run(RELATIONSHIPS_OF_NODES_QUERY, node_ids=node_ids)}
+        record = tx.run(MERGE_NODES_QUERY, node_ids=node_ids, properties=properties).single()
+        if record is None:
+            return None
+        after = {record['rel_id']: _relationship_record(record)
+                 for record in tx.run(RELATIONSHIPS_OF_NODES_QUERY, node_ids=node_ids[:1])}
+        return {
+            'node': _node_record(record),
+            'deleted_relationships': [rel for rel_id, rel in before.items() if rel_id not in after],
+            'created_relationships': [rel for rel_id, rel in after.items() if rel_id not in before],
+            'updated_relationships': [rel for rel_id, rel in after.items()
+                                      if rel_id in before and before[rel_id]['properties'] != rel['properties']]
+        }
+
     def get_isolated_nodes(self):
         """查找没有任何关系连接的孤立节点
         
@@ -520,24 +1506,103 @@ class Neo4jGraph:
             return session.execute_read(self._get_isolated_nodes)
 
     def _get_isolated_nodes(self, tx):
-        query = """
+        query = f"""
         MATCH (n:Node)
         WHERE NOT (n)-[]-()
-        RETURN id(n) as node_id, labels(n) as node_labels, 
-               keys(n) as node_keys, [k in keys(n) | n[k]] as node_values
+        RETURN {_node_columns("n")}
         """
         result = tx.run(query)
-        
-        isolated_nodes = []
+        return [_node_record(record) for record in result]
+
+    def get_top_degree_nodes(self, limit=100):
+        """获取连接数最多的节点
+
+        Args:
+            limit: 返回的节点数量
+        Returns:
+            list: 按度数从高到低排列的节点列表，每个节点包含 node_id, labels, properties 和 degree
+        """
+        with self.begin_session() as session:
+            return session.execute_read(self._get_top_degree_nodes, limit)
+
+    def _get_top_degree_nodes(self, tx, limit):
+        query = f"""
+        MATCH (n:Node)
+        WITH n, COUNT {{ (n)--() }} as degree
+        ORDER BY degree DESC
+        LIMIT $limit
+        RETURN {_node_columns("n")}, degree
+        """
+        result = tx.run(query, limit=limit)
+        nodes = []
         for record in result:
-            node = {
-                'node_id': record['node_id'],
-                'labels': record['node_labels'],
-                'properties': dict(zip(record['node_keys'], record['node_values']))
-            }
-            isolated_nodes.append(node)
-        
-        return isolated_nodes
+            node = _node_record(record)
+            node['degree'] = record['degree']
+            nodes.append(node)
+        return nodes
+
+    def get_subgraph(self, seed_ids=None, q=None, depth=1, limit=200, labels=None, types=None, seed_limit=10):
+        """在一次查询中获取种子节点周围的子图
+
+        种子节点优先取 seed_ids，其次为全文搜索 q 的结果，都未提供时取连接数最多的节点。
+        从种子节点出发按广度优先扩展 depth 跳（忽略方向），最多返回 limit 个节点（含种子节点），
+        并返回这些节点之间的全部关系。
+        Args:
+            seed_ids (list[int], optional): 种子节点ID
+            q (str, optional): 搜索种子节点的名字
+            depth (int): 扩展的跳数
+            limit (int): 节点数量上限
+            labels (list[str], optional): 只扩展到带有这些标签之一的节点
+            types (list[str], optional): 只沿这些类型的关系扩展，也只返回这些类型的关系
+            seed_limit (int): 通过搜索或度数选取种子节点时的数量
+        Returns:
+            dict: {'nodes': 节点字典列表, 'relationships': 关系字典列表（只包含两端节点ID）}
+        """
+        with self.begin_session() as session:
+            return session.execute_read(self._get_subgraph, seed_ids, q, depth, limit,
+                                        list(labels or []), list(types or []), seed_limit)
+
+    def _get_subgraph(self, tx, seed_ids, q, depth, limit, labels, types, seed_limit):
+        if seed_ids:
+            seed_clause = "MATCH (s:Node) WHERE id(s) IN $seed_ids"
+        elif q:
+            seed_clause = (f"CALL db.index.fulltext.queryNodes('{NODE_INDEX_NAME}', $q) YIELD node as s\n"
+                           f"WITH s LIMIT $seed_limit")
+        else:
+            seed_clause = "MATCH (s:Node)\nWITH s ORDER BY COUNT { (s)--() } DESC LIMIT $seed_limit"
+        query = f"""
+        {seed_clause}
+        WITH collect(DISTINCT s) as seeds
+        CALL apoc.path.subgraphNodes(seeds, {{
+            maxLevel: $depth, limit: $limit, bfs: true,
+            relationshipFilter: $relationship_filter, labelFilter: $label_filter
+        }}) YIELD node
+        WITH collect(node) as nodes
+        CALL {{
+            WITH nodes
+            CALL apoc.algo.cover(nodes) YIELD rel
+            WITH rel WHERE size($types) = 0 OR type(rel) IN $types
+            RETURN collect({{
+                rel_id: id(rel), type: type(rel), properties: {_visible_properties("rel")},
+                start_node_id: id(startNode(rel)), end_node_id: id(endNode(rel))
+            }}) as relationships
+        }}
+        RETURN [n IN nodes | {{node_id: id(n), labels: labels(n), properties: {_visible_properties("n")}}}] as nodes,
+               relationships
+        """
+        record = tx.run(query,
+                        seed_ids=list(seed_ids or []),
+                        q=f'"{q}"' if q else None,
+                        seed_limit=seed_limit,
+                        depth=depth,
+                        limit=limit,
+                        relationship_filter="|".join(types),
+                        label_filter="+" + "|".join(labels) if labels else "",
+                        types=types).single()
+        return {
+            'nodes': record['nodes'] if record else [],
+            'relationships': record['relationships'] if record else []
+        }
 
     def get_all_relationships(self):
         """获取数据库中的所有关系
@@ -549,35 +1614,131 @@ class Neo4jGraph:
             return session.execute_read(self._get_all_relationships)
 
     def _get_all_relationships(self, tx):
-        query = """
-        MATCH ()-[r]->()
-        RETURN id(r) as rel_id, 
-               type(r) as rel_type,
-               keys(r) as rel_keys,
-               [k in keys(r) | r[k]] as rel_values,
-               id(startNode(r)) as start_node_id,
-               id(endNode(r)) as end_node_id
+        query = f"""
+        MATCH (a)-[r]->(b)
+        RETURN {_relationship_columns()}
         """
         result = tx.run(query)
-        
-        relationships = []
-        for record in result:
-            relationship = {
-                'rel_id': record['rel_id'],
-                'type': record['rel_type'],
-                'properties': dict(zip(record['rel_keys'], record['rel_values'])),
-                'start_node_id': record['start_node_id'],
-                'end_node_id': record['end_node_id']
-            }
-            relationships.append(relationship)
-        
-        return relationships
+        return [_relationship_record(record) for record in result]
+
+    def get_relationships_page(self, after_id=None, limit=500):
+        """按关系ID升序分页获取关系，只返回两端节点ID
+
+        Args:
+            after_id: 上一页最后一个关系的ID，为 None 时从头开始
+            limit: 每页数量
+        Returns:
+            list: 关系字典列表，包含 rel_id, type, properties, start_node_id 和 end_node_id
+        """
+        with self.begin_session() as session:
+            return session.execute_read(self._get_relationships_page, after_id, limit)
+
+    def _get_relationships_page(self, tx, after_id, limit):
+        query = f"""
+        MATCH (a)-[r]->(b)
+        WHERE id(r) IN range($start, $end)
+        WITH a, r, b ORDER BY id(r) LIMIT $limit
+        RETURN {_relationship_columns()}
+        """
+        records = _seek_page(tx, query, LAST_RELATIONSHIP_ID_QUERY, after_id, limit)
+        return [_relationship_record(record) for record in records]
+
+    def iter_all_relationships(self, with_nodes=True):
+        """流式遍历数据库中的所有关系
+
+        Args:
+            with_nodes: 为 True 时同一条查询中一并返回两端节点的完整信息
+        Yields:
+            dict: 关系字典，包含 rel_id, type, properties, start_node_id, end_node_id，
+                  with_nodes 为 True 时还包含 start_node 和 end_node
+        """
+        query = f"""
+        MATCH (a)-[r]->(b)
+        RETURN {_relationship_columns(with_nodes=with_nodes)}
+        """
+        with self.begin_session() as session:
+            for record in session.run(query):
+                yield _relationship_record(record)
+
+    def get_max_ids(self):
+        """返回当前最大的节点ID和关系ID，图为空时为 -1，用于按ID区间分块扫描"""
+        with self.begin_session() as session:
+            return session.execute_read(self._get_max_ids)
+
+    def _get_max_ids(self, tx):
+        query = """
+        CALL { MATCH (n:Node) RETURN coalesce(max(id(n)), -1) as max_node_id }
+        CALL { MATCH ()-[r]->() RETURN coalesce(max(id(r)), -1) as max_rel_id }
+        RETURN max_node_id, max_rel_id
+        """
+        record = tx.run(query).single()
+        return {'node': record['max_node_id'], 'relationship': record['max_rel_id']}
+
+    def get_node_fingerprints(self, start_id, end_id):
+        """返回ID在 [start_id, end_id) 区间内节点的内容指纹
+
+        指纹由标签和属性（不含 UPDATED_AT_PROPERTY）计算，取 apoc.hashing.fingerprint 的前 16 位十六进制，
+        按ID直接查找节点，不扫描整个标签。
+        Returns:
+            list[tuple[int, int]]: (节点ID, 指纹)
+        """
+        with self.begin_session() as session:
+            return session.execute_read(self._get_fingerprints, NODE_FINGERPRINT_QUERY, start_id, end_id)
+
+    def get_relationship_fingerprints(self, start_id, end_id):
+        """返回ID在 [start_id, end_id) 区间内关系的 (ID, (内容指纹, 起点ID, 终点ID))，指纹由类型和属性计算
+
+        两端节点ID随指纹保存，关系在应用之外被删除时仍能在删除事件中给出两端节点。
+        """
+        with self.begin_session() as session:
+            return session.execute_read(self._get_relationship_fingerprints, start_id, end_id)
+
+    def _get_fingerprints(self, tx, query, start_id, end_id):
+        result = tx.run(query, start_id=start_id, end_id=end_id)
+        return [(record['id'], int(record['fingerprint'], 16)) for record in result]
+
+    def _get_relationship_fingerprints(self, tx, start_id, end_id):
+        result = tx.run(RELATIONSHIP_FINGERPRINT_QUERY, start_id=start_id, end_id=end_id)
+        return [(record['id'], (int(record['fingerprint'], 16), record['start_node_id'], record['end_node_id']))
+                for record in result]
+
+    def get_nodes_by_ids(self, node_ids):
+        """在一次查询中获取多个节点，不存在的ID被忽略"""
+        with self.begin_session() as session:
+            return session.execute_read(self._get_nodes_by_ids, list(node_ids))
+
+    def _get_nodes_by_ids(self, tx, node_ids):
+        return [_node_record(record) for record in tx.run(NODES_BY_IDS_QUERY, node_ids=node_ids)]
+
+    def get_relationships_by_ids(self, relationship_ids):
+        """在一次查询中获取多个关系（只包含两端节点ID），不存在的ID被忽略"""
+        with self.begin_session() as session:
+            return session.execute_read(self._get_relationships_by_ids, list(relationship_ids))
+
+    def _get_relationships_by_ids(self, tx, relationship_ids):
+        query = f"""
+        MATCH (a)-[r]->(b)
+        WHERE id(r) IN $relationship_ids
+        RETURN {_relationship_columns()}
+        """
+        return [_relationship_record(record) for record in tx.run(query, relationship_ids=relationship_ids)]
+
 
 def get_graph_instance():
-    uri = "bolt://localhost:7687"  # 您的Neo4j数据库URI
-    user = "neo4j"  # 您的Neo4j用户名
-    password = "AGCF3xJumbfJD-b"  # 您的Neo4j密码
-    GRAPH = Neo4jGraph(uri, user, password)
+    from Server.config import Config
+    GRAPH = Neo4jGraph(
+        Config.NEO4J_URI,
+        Config.NEO4J_USER,
+        Config.NEO4J_PASSWORD,
+        max_connection_pool_size=Config.NEO4J_MAX_CONNECTION_POOL_SIZE,
+        connection_acquisition_timeout=Config.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+        max_connection_lifetime=Config.NEO4J_MAX_CONNECTION_LIFETIME,
+        fetch_size=Config.NEO4J_FETCH_SIZE,
+        path_max_depth=Config.PATH_MAX_DEPTH,
+        path_max_results=Config.PATH_MAX_RESULTS,
+        path_timeout=Config.PATH_QUERY_TIMEOUT,
+        nearby_frontier_limit=Config.NEARBY_FRONTIER_LIMIT
+    )
     # 创建必要的索引
     GRAPH.create_indexes()
     return GRAPH
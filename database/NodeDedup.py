@@ -0,0 +1,193 @@
+"""近似重复节点检测
+
+每个节点表示为一个特征集合：name 规范化（NFKC、小写、只保留字母和数字）后的字符 n-gram，
+以及其他较短的标量属性的 "键=值"。导入主键、写入时间戳等每个节点各不相同的内部属性不作为特征，
+没有 name 的节点默认不参与检测。用 MinHash 签名估计特征集合的 Jaccard 相似度，再把签名分为
+bands 段做 LSH 分桶：在任一段上签名完全相同的节点成为候选对，只对候选对计算精确的 Jaccard 相似度，
+开销与节点数量近似线性。相似度达到阈值的节点对通过并查集合并为重复簇。
+"""
+import time
+import unicodedata
+import zlib
+
+import numpy as np
+
+from database.Neo4jStuff import IMPORT_KEY_PROPERTY, UPDATED_AT_PROPERTY
+
+# MinHash 使用的梅森素数 2^31 - 1，特征哈希先对它取模，乘积不会超出 uint64
+_PRIME = (1 << 31) - 1
+# 计算签名时每批的特征数量，限制 (num_perm, 特征数) 临时矩阵的大小
+_SIGNATURE_CHUNK = 200_000
+# 不作为特征的内部属性
+IGNORED_KEYS = frozenset({IMPORT_KEY_PROPERTY, UPDATED_AT_PROPERTY})
+
+
+def normalize_name(name):
+    """统一全角半角和大小写，去掉空白和标点"""
+    return "".join(ch for ch in unicodedata.normalize("NFKC", str(name)).lower() if ch.isalnum())
+
+
+def node_features(properties, ngram=2, name_key="name", max_value_length=64, include_unnamed=False):
+    """返回节点的特征集合：name 的字符 n-gram（首尾加边界符），以及其他标量属性的 "键=值"
+
+    Args:
+        properties (dict): 节点属性
+        ngram (int): n-gram 长度
+        name_key (str): 名称属性
+        max_value_length (int): 其他属性的值超过该长度时不作为特征（例如长文本描述）
+        include_unnamed (bool): 没有名称属性的节点是否只按其他属性生成特征，默认返回空集合
+    """
+    features = set()
+    name = properties.get(name_key)
+    if name is not None:
+        text = f"^{normalize_name(name)}$"
+        features.update(text[i:i + ngram] for i in range(max(1, len(text) - ngram + 1)))
+    elif not include_unnamed:
+        return features
+    for key, value in properties.items():
+        if key == name_key or key in IGNORED_KEYS or isinstance(value, (list, dict)) or value is None:
+            continue
+        value = str(value)
+        if len(value) <= max_value_length:
+            features.add(f"{key}={value}")
+    return features
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+class DuplicateFinder:
+    """基于 MinHash/LSH 的近似重复节点检测
+
+    Args:
+        threshold (float): 判为重复的最小 Jaccard 相似度
+        num_perm (int): MinHash 签名长度
+        bands (int): LSH 分段数量，num_perm 必须能被整除；段越多召回率越高、候选对越多
+        ngram (int): name 的 n-gram 长度
+        max_bucket (int): 同一个桶中节点超过该数量时只把相邻的节点作为候选对，避免候选对数量平方增长
+        seed (int): 生成 MinHash 哈希函数的随机种子
+    """
+
+    def __init__(self, threshold=0.6, num_perm=64, bands=16, ngram=2, max_bucket=50, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.ngram = ngram
+        self.max_bucket = max_bucket
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    def _signatures(self, feature_sets):
+        """返回 (节点数, num_perm) 的 MinHash 签名，每个特征集合都不为空"""
+        signatures = np.empty((len(feature_sets), self.num_perm), dtype=np.uint64)
+        start = 0
+        while start < len(feature_sets):
+            end, size = start, 0
+            while end < len(feature_sets) and (size == 0 or size + len(feature_sets[end]) <= _SIGNATURE_CHUNK):
+                size += len(feature_sets[end])
+                end += 1
+            chunk = feature_sets[start:end]
+            hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for features in chunk for feature in features),
+                                 dtype=np.uint64, count=size) % _PRIME
+            offsets = np.zeros(len(chunk), dtype=np.int64)
+            np.cumsum([len(features) for features in chunk[:-1]], out=offsets[1:])
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+            signatures[start:end] = np.minimum.reduceat(permuted, offsets, axis=1).T
+            start = end
+        return signatures
+
+    def _candidates(self, signatures):
+        """按 LSH 分段分桶，返回候选对 (i, j)，i < j 为节点下标"""
+        rows = self.num_perm // self.bands
+        pairs = set()
+        for band in range(self.bands):
+            block = signatures[:, band * rows:(band + 1) * rows]
+            # 把一段签名合并为一个桶键，uint64 溢出按模回绕
+            keys = block[:, 0].copy()
+            for column in range(1, rows):
+                keys = keys * np.uint64(1000003) ^ block[:, column]
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            sizes = np.diff(np.r_[starts, len(keys)])
+            for start, size in zip(starts[sizes > 1].tolist(), sizes[sizes > 1].tolist()):
+                members = sorted(order[start:start + size].tolist())
+                if size <= self.max_bucket:
+                    pairs.update((members[i], members[j]) for i in range(size) for j in range(i + 1, size))
+                else:
+                    pairs.update(zip(members, members[1:]))
+        return pairs
+
+    def find(self, records, limit=None, name_key="name", include_unnamed=False):
+        """在节点中查找重复簇
+
+        Args:
+            records (Iterable[dict]): 节点字典，包含 node_id 和 properties，可以是流式的
+            limit (int, optional): 返回的最多簇数量
+            include_unnamed (bool): 没有名称属性的节点是否按其他属性参与检测
+        Returns:
+            dict: clusters 为按大小降序的 [{'node_ids', 'names', 'similarity'}]，similarity 为簇内
+                  已验证节点对的最低相似度；以及扫描的节点数、候选对数量、验证通过的节点对数量和用时
+        """
+        started = time.perf_counter()
+        node_ids, names, feature_sets = [], [], []
+        for record in records:
+            features = node_features(record['properties'], self.ngram, name_key, include_unnamed=include_unnamed)
+            if features:
+                node_ids.append(record['node_id'])
+                names.append(record['properties'].get(name_key))
+                feature_sets.append(features)
+
+        candidates = self._candidates(self._signatures(feature_sets)) if feature_sets else set()
+        clusters = _UnionFind()
+        similarity = {}
+        for i, j in candidates:
+            score = _jaccard(feature_sets[i], feature_sets[j])
+            if score >= self.threshold:
+                clusters.union(i, j)
+                similarity[(i, j)] = score
+
+        groups = {}
+        for i in clusters.parent:
+            groups.setdefault(clusters.find(i), []).append(i)
+        lowest = {}
+        for (i, j), score in similarity.items():
+            root = clusters.find(i)
+            lowest[root] = min(lowest.get(root, 1.0), score)
+        result = []
+        for root, members in groups.items():
+            members.sort(key=lambda i: node_ids[i])
+            result.append({
+                'node_ids': [node_ids[i] for i in members],
+                'names': [names[i] for i in members],
+                'similarity': lowest[root]
+            })
+        result.sort(key=lambda cluster: (-len(cluster['node_ids']), -cluster['similarity'], cluster['node_ids'][0]))
+        return {
+            'clusters': result[:limit] if limit is not None else result,
+            'total_clusters': len(result),
+            'nodes': len(node_ids),
+            'candidate_pairs': len(candidates),
+            'duplicate_pairs': len(similarity),
+            'seconds': time.perf_counter() - started
+        }
@@ -0,0 +1,4 @@
+import os
+
+# 导入 database.Neo4jDataProcessor 时不创建变更日志目录和后台线程；数据库不可用时只打印建索引失败
+os.environ.setdefault('JOURNAL_ENABLED', 'false')
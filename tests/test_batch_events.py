@@ -0,0 +1,45 @@
+from database.Neo4jDataProcessor import Graph
+
+
+def _node(node_id, **properties):
+    return {'node_id': node_id, 'labels': ['Node'], 'properties': properties}
+
+
+def _relationship(rel_id, start, end, rel_type='R', previous=None):
+    return {'rel_id': rel_id, 'previous_rel_id': previous if previous is not None else rel_id, 'type': rel_type,
+            'properties': {}, 'start_node_id': start, 'end_node_id': end}
+
+
+def test_coalesce_keeps_final_state():
+    results = [
+        {'op': 'create_node', 'result': _node(1, name='a')},
+        {'op': 'update_node', 'result': _node(1, name='b')},
+        {'op': 'create_node', 'result': _node(2)},
+        {'op': 'delete_node', 'result': {'node_id': 2, 'relationships': []}},
+        {'op': 'update_node', 'result': _node(3, name='c')},
+        {'op': 'update_node', 'result': _node(3, name='d')},
+    ]
+    events = Graph.coalesce_batch_events(results)
+    assert events == [
+        {'event': 'node_created', 'data': {'id': 1, 'labels': ['Node'], 'properties': {'name': 'b'}}},
+        {'event': 'node_updated', 'data': {'id': 3, 'labels': ['Node'], 'properties': {'name': 'd'}}},
+    ]
+
+
+def test_coalesce_orders_and_expands_deletes():
+    results = [
+        {'op': 'delete_node', 'result': {'node_id': 7, 'relationships': [
+            {'rel_id': 70, 'start_node_id': 7, 'end_node_id': 8}]}},
+        {'op': 'create_relationship', 'result': _relationship(80, 8, 9)},
+        {'op': 'update_relationship', 'result': _relationship(81, 8, 9, 'NEW', previous=60)},
+        {'op': 'create_node', 'result': _node(9)},
+    ]
+    events = [(item['event'], item['data']['id']) for item in Graph.coalesce_batch_events(results)]
+    assert events == [
+        ('node_created', 9),
+        ('relationship_created', 80),
+        ('relationship_created', 81),
+        ('relationship_deleted', 70),
+        ('relationship_deleted', 60),
+        ('node_deleted', 7),
+    ]
@@ -0,0 +1,128 @@
+import threading
+import time
+
+from Server.broadcast import EventAggregator
+
+
+def _batch(*events):
+    return {'events': [{'event': event, 'data': data} for event, data in events], 'versions': []}
+
+
+def _events(frame):
+    return [(item['event'], item['data']) for item in frame['events']]
+
+
+def test_window_zero_emits_each_publish():
+    frames = []
+    aggregator = EventAggregator(frames.append, window=0)
+    aggregator('node_created', {'id': 1, 'labels': [], 'properties': {}})
+    aggregator('graph_batch', _batch(('node_deleted', {'id': 2})))
+    assert [_events(frame) for frame in frames] == [
+        [('node_created', {'id': 1, 'labels': [], 'properties': {}})],
+        [('node_deleted', {'id': 2})],
+    ]
+
+
+def test_window_buffers_until_flush():
+    frames = []
+    aggregator = EventAggregator(frames.append, window=60)
+    aggregator('node_created', {'id': 1, 'labels': ['A'], 'properties': {'name': 'x'}})
+    aggregator('node_updated', {'id': 1, 'properties': {'name': 'y'}, 'labels': ['A']})
+    assert frames == []
+    aggregator.flush()
+    assert len(frames) == 1
+    assert _events(frames[0]) == [('node_created', {'id': 1, 'labels': ['A'], 'properties': {'name': 'y'}})]
+    assert frames[0]['batches'] == 2 and frames[0]['received'] == 2 and frames[0]['dropped'] == 1
+    aggregator.flush()
+    assert len(frames) == 1
+
+
+def test_created_then_deleted_is_dropped():
+    frames = []
+    aggregator = EventAggregator(frames.append, window=60)
+    aggregator('graph_batch', _batch(('node_created', {'id': 1, 'labels': [], 'properties': {}}),
+                                     ('node_deleted', {'id': 1})))
+    aggregator.flush()
+    assert frames == []
+    assert aggregator.stats['received'] == 0
+
+
+def test_updates_merge_and_delete_wins():
+    frames = []
+    aggregator = EventAggregator(frames.append, window=60)
+    aggregator('node_updated', {'id': 1, 'properties': {'a': 1, 'b': 2}, 'labels': []})
+    aggregator('node_updated', {'id': 1, 'removed_properties': ['a'], 'labels': []})
+    aggregator('node_updated', {'id': 2, 'properties': {'c': 3}, 'labels': []})
+    aggregator('node_deleted', {'id': 2})
+    aggregator.flush()
+    assert _events(frames[0]) == [
+        ('node_updated', {'id': 1, 'properties': {'b': 2}, 'removed_properties': ['a'], 'labels': []}),
+        ('node_deleted', {'id': 2}),
+    ]
+
+
+def test_reused_id_emits_delete_before_create():
+    frames = []
+    aggregator = EventAggregator(frames.append, window=60)
+    aggregator('node_deleted', {'id': 1})
+    aggregator('node_created', {'id': 1, 'labels': [], 'properties': {}})
+    aggregator.flush()
+    assert _events(frames[0]) == [('node_deleted', {'id': 1}),
+                                  ('node_created', {'id': 1, 'labels': [], 'properties': {}})]
+
+
+def test_frame_orders_nodes_around_relationships():
+    frames = []
+    aggregator = EventAggregator(frames.append, window=60)
+    aggregator('node_deleted', {'id': 9})
+    aggregator('relationship_deleted', {'id': 5, 'start_node_id': 9, 'end_node_id': 1})
+    aggregator('relationship_created', {'id': 6, 'start_node_id': 1, 'end_node_id': 2, 'type': 'R',
+                                        'properties': {}})
+    aggregator('node_created', {'id': 2, 'labels': [], 'properties': {}})
+    aggregator.flush()
+    assert [event for event, _ in _events(frames[0])] == [
+        'node_created', 'relationship_created', 'relationship_deleted', 'node_deleted']
+
+
+def test_graph_reset_discards_buffered_events():
+    frames = []
+    aggregator = EventAggregator(frames.append, window=60)
+    aggregator('node_created', {'id': 1, 'labels': [], 'properties': {}})
+    aggregator('graph_reset', {'name': 'frozen'})
+    aggregator('node_created', {'id': 2, 'labels': [], 'properties': {}})
+    aggregator.flush()
+    assert _events(frames[0]) == [('graph_reset', {'name': 'frozen'}),
+                                  ('node_created', {'id': 2, 'labels': [], 'properties': {}})]
+
+
+def test_frames_are_emitted_in_order_across_threads():
+    frames = []
+    first_emit = threading.Event()
+    release = threading.Event()
+
+    def emit(frame):
+        if not first_emit.is_set():
+            first_emit.set()
+            release.wait(5)
+        frames.append(frame)
+
+    aggregator = EventAggregator(emit, window=0)
+    writer = threading.Thread(target=aggregator, args=('node_created', {'id': 1, 'labels': [], 'properties': {}}))
+    writer.start()
+    first_emit.wait(5)
+    # 第一帧发出前到达的 graph_reset 不能先于它发出，否则客户端重建后又收到过时的事件
+    reset = threading.Thread(target=aggregator, args=('graph_reset', {'mode': 'full'}))
+    reset.start()
+    time.sleep(0.05)
+    release.set()
+    writer.join(5)
+    reset.join(5)
+    assert [_events(frame)[0][0] for frame in frames] == ['node_created', 'graph_reset']
+
+
+def test_unknown_events_are_ignored():
+    frames = []
+    aggregator = EventAggregator(frames.append, window=0)
+    aggregator('graph_batch', _batch(('index_rebuilt', {'name': 'test'}), ('node_created', {'id': 1})))
+    assert [_events(frame) for frame in frames] == [[('node_created', {'id': 1})]]
+    assert aggregator.stats['ignored'] == 1
@@ -0,0 +1,116 @@
+import json
+import os
+from itertools import islice
+
+import pytest
+
+from database.Neo4jBulkImport import _node_row, _relationship_row, run_import
+
+
+class _FakeGraph:
+    """按批次接收行，fail_at_batch 指定的批次抛出异常，模拟导入中断"""
+
+    def __init__(self, fail_at_batch=None):
+        self.rows = []
+        self.batches = 0
+        self.fail_at_batch = fail_at_batch
+
+    def _write(self, rows, batch_size, on_batch, result):
+        iterator = iter(rows)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            self.batches += 1
+            if self.batches == self.fail_at_batch:
+                raise RuntimeError("connection lost")
+            self.rows += batch
+            on_batch(batch, result(batch))
+
+    def add_nodes_bulk(self, rows, batch_size, on_batch):
+        self._write(rows, batch_size, on_batch,
+                    lambda batch: [{'key': row['key'], 'node_id': len(self.rows) - len(batch) + i}
+                                   for i, row in enumerate(batch)])
+
+    def add_relationships_bulk(self, rows, batch_size, on_batch):
+        self._write(rows, batch_size, on_batch, lambda batch: batch)
+
+
+def test_node_row_parsing():
+    assert _node_row({'key': 'k1', 'labels': 'Person; Author;', 'name': 'x', 'age': ''}, csv_format=True) == {
+        'key': 'k1', 'labels': ['Person', 'Author'], 'properties': {'name': 'x'}}
+    assert _node_row({'labels': ['A'], 'properties': {'name': 'y'}, 'ignored': 1}, csv_format=False) == {
+        'key': None, 'labels': ['A'], 'properties': {'name': 'y'}}
+
+
+def test_relationship_row_parsing():
+    assert _relationship_row({'start': 'a', 'end': 'b', 'type': '', 'key': '', 'weight': '2'}, csv_format=True) == {
+        'start_key': 'a', 'end_key': 'b', 'type': 'CONNECTS_TO', 'key': None, 'properties': {'weight': '2'}}
+
+
+def test_keys_are_normalized_to_strings():
+    row = _relationship_row({'start': 1, 'end': 2, 'key': 3}, csv_format=False)
+    assert (row['start_key'], row['end_key'], row['key']) == ('1', '2', '3')
+    assert _node_row({'key': 7}, csv_format=False)['key'] == '7'
+
+
+def test_unkeyed_rows_get_keys_from_file_offsets(tmp_path):
+    path = tmp_path / 'nodes.jsonl'
+    path.write_text('{"name": "a"}\n{"key": "k2", "name": "b"}\n{"name": "c"}\n', encoding='utf-8')
+    key_map = tmp_path / 'keys.csv'
+    first = _FakeGraph()
+    run_import(first, 'nodes', str(path), batch_size=2, key_map_path=str(key_map))
+    source = os.path.abspath(str(path))
+    assert [row['key'] for row in first.rows] == [f'{source}#14', 'k2', f'{source}#55']
+
+    # 批次已提交、检查点未写入时中断：重新导入同一批得到相同的主键，按主键 MERGE 不会重复创建
+    again = _FakeGraph()
+    run_import(again, 'nodes', str(path), batch_size=2)
+    assert [row['key'] for row in again.rows] == [row['key'] for row in first.rows]
+    assert len(key_map.read_text(encoding='utf-8').splitlines()) == 3
+
+
+def test_csv_import_writes_key_map(tmp_path):
+    path = tmp_path / 'nodes.csv'
+    path.write_text('﻿key,labels,name\nk1,Person,张三\nk2,,李四\n', encoding='utf-8')
+    key_map = tmp_path / 'keys.csv'
+    graph = _FakeGraph()
+    stats = run_import(graph, 'nodes', str(path), batch_size=1, key_map_path=str(key_map))
+    assert stats['rows'] == 2
+    assert [row['properties']['name'] for row in graph.rows] == ['张三', '李四']
+    assert graph.rows[1]['labels'] == []
+    assert key_map.read_text(encoding='utf-8').splitlines() == ['k1,0', 'k2,1']
+
+
+@pytest.mark.parametrize('suffix', ['jsonl', 'csv'])
+def test_resume_from_checkpoint(tmp_path, suffix):
+    path = tmp_path / f'relationships.{suffix}'
+    records = [{'start': f's{i}', 'end': f'e{i}', 'type': 'R'} for i in range(7)]
+    if suffix == 'jsonl':
+        path.write_text(''.join(json.dumps(record) + '\n' for record in records) + '\n', encoding='utf-8')
+    else:
+        path.write_text('start,end,type\n' + ''.join(f"{r['start']},{r['end']},{r['type']}\n" for r in records),
+                        encoding='utf-8')
+    checkpoint = str(tmp_path / 'import.ckpt')
+
+    failing = _FakeGraph(fail_at_batch=3)
+    with pytest.raises(RuntimeError):
+        run_import(failing, 'relationships', str(path), batch_size=2, checkpoint_path=checkpoint)
+    with open(checkpoint, encoding='utf-8') as f:
+        assert json.load(f)['rows'] == 4
+
+    resumed = _FakeGraph()
+    stats = run_import(resumed, 'relationships', str(path), batch_size=2, checkpoint_path=checkpoint)
+    assert [row['start_key'] for row in failing.rows + resumed.rows] == [record['start'] for record in records]
+    assert stats['rows'] == 7 and stats['imported'] == 3
+    assert not os.path.exists(checkpoint)
+
+
+def test_checkpoint_from_other_import_is_rejected(tmp_path):
+    path = tmp_path / 'nodes.jsonl'
+    path.write_text('{"key": "k1"}\n', encoding='utf-8')
+    checkpoint = tmp_path / 'import.ckpt'
+    checkpoint.write_text(json.dumps({'input': str(path), 'kind': 'relationships', 'offset': 0, 'rows': 0}),
+                          encoding='utf-8')
+    with pytest.raises(ValueError):
+        run_import(_FakeGraph(), 'nodes', str(path), checkpoint_path=str(checkpoint))
@@ -0,0 +1,53 @@
+from database import Neo4jDataProcessor
+from database.Neo4jDataProcessor import GRAPH, ExternalChangeWatcher, changed_fields
+
+
+def test_changed_fields_reports_only_differences():
+    assert changed_fields(['A'], {'a': 1, 'b': 2}, ['A'], {'a': 1, 'b': 2}) == {}
+    assert changed_fields(['A'], {'a': 1, 'b': 2}, ['A'], {'a': 3, 'c': 4}) == {
+        'properties': {'a': 3, 'c': 4}, 'removed_properties': ['b']}
+    assert changed_fields(['A', 'B'], {}, ['B', 'A'], {}) == {}
+    assert changed_fields(['A'], {}, ['A', 'B'], {}) == {'labels': ['A', 'B']}
+    # 关系没有标签
+    assert changed_fields(None, {'w': 1}, None, {'w': 2}) == {'properties': {'w': 2}}
+
+
+def test_watcher_diff_skips_touched_ids():
+    known = {1: 10, 2: 20, 3: 30, 4: 40}
+    current = {1: 10, 2: 21, 3: 31, 5: 50, 6: 60}
+    new, changed, deleted = ExternalChangeWatcher._diff(known, current, touched={3, 6})
+    assert new == [5]
+    assert changed == [2]
+    assert deleted == [4]
+
+
+def test_watcher_diff_without_changes():
+    fingerprints = {1: 10, 2: 20}
+    assert ExternalChangeWatcher._diff(fingerprints, dict(fingerprints), set()) == ([], [], [])
+
+
+def test_versions_outside_publishing_writes_are_not_collected():
+    # 例如批量导入：不发布事件，版本号不应附加到之后无关的事件上
+    GRAPH.advance_version()
+    assert GRAPH.take_write_versions() == []
+    with GRAPH.collect_versions():
+        first = GRAPH.advance_version()
+        with GRAPH.collect_versions():
+            second = GRAPH.advance_version()
+        assert GRAPH.take_write_versions() == [first, second]
+        dropped = GRAPH.advance_version()
+    assert dropped == second + 1
+    assert GRAPH.take_write_versions() == []
+
+
+def test_watcher_deleted_relationship_carries_endpoints(monkeypatch):
+    tables = iter([({1: 10, 2: 20}, {5: (50, 1, 2)}), ({1: 10, 2: 20}, {})])
+    monkeypatch.setattr(Neo4jDataProcessor, 'scan_fingerprints', lambda chunk_size=None: next(tables))
+    published = []
+    monkeypatch.setattr(Neo4jDataProcessor, 'publish_changes', lambda events, versions=None: published.append(events))
+    watcher = ExternalChangeWatcher(min_interval=1, max_interval=2)
+    Neo4jDataProcessor.EVENTS.unsubscribe(watcher._on_event)
+    assert watcher.poll() == 0
+    watcher.poll()
+    # 关系没有被缓存，两端节点ID来自上一次检测的指纹表
+    assert published == [[{'event': 'relationship_deleted', 'data': {'id': 5, 'start_node_id': 1, 'end_node_id': 2}}]]
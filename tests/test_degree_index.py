@@ -0,0 +1,130 @@
+import pytest
+
+from database.DegreeIndex import DegreeIndex
+
+
+class _FakeGraph:
+    """按节点ID分页返回 (节点ID, 入度, 出度)"""
+
+    def __init__(self, rows):
+        self.rows = sorted(rows)
+        self.loads = 0
+        self.version = 0
+        self.version_reads = 0
+        self.writes = {}    # 第几次读取版本号 -> 在这次读取前提交的写入，模拟加载期间的并发写入
+
+    @property
+    def graph_version(self):
+        self.version_reads += 1
+        write = self.writes.pop(self.version_reads, None)
+        if write is not None:
+            write()
+        return self.version
+
+    def get_degrees(self, after_id, limit):
+        if after_id is None:
+            self.loads += 1
+        return [row for row in self.rows if after_id is None or row[0] > after_id][:limit]
+
+
+@pytest.fixture
+def index():
+    # 1 -> 2, 1 -> 3, 2 -> 3；4、5 为孤立节点
+    graph = _FakeGraph([(1, 0, 2), (2, 1, 1), (3, 2, 0), (4, 0, 0), (5, 0, 0)])
+    return DegreeIndex(graph, refresh_interval=0, page_size=2)
+
+
+def test_loads_in_pages(index):
+    assert index.degree(1) == {'in': 0, 'out': 2, 'total': 2}
+    assert index.histogram() == [[0, 2], [2, 3]]
+    assert index.histogram("in") == [[0, 3], [1, 1], [2, 1]]
+
+
+def test_relationship_events_move_buckets(index):
+    index.isolated()
+    index.on_event('relationship_created', {'id': 9, 'start_node_id': 4, 'end_node_id': 1})
+    assert index.degree(4) == {'in': 0, 'out': 1, 'total': 1}
+    assert index.degree(1) == {'in': 1, 'out': 2, 'total': 3}
+    assert index.isolated() == ([5], None, 1)
+    index.on_event('graph_batch', {'events': [
+        {'event': 'relationship_deleted', 'data': {'id': 9, 'start_node_id': 4, 'end_node_id': 1}},
+        {'event': 'node_created', 'data': {'id': 6}},
+    ]})
+    assert index.isolated() == ([4, 5, 6], None, 3)
+    assert index.top(1) == ([(1, 2)], (2, 1))
+
+
+def test_unknown_endpoints_mark_index_stale(index):
+    index.isolated()
+    loads = index.graph.loads
+    index.on_event('relationship_deleted', {'id': 9})
+    assert index.stats()['stale']
+    index.isolated()
+    assert index.graph.loads == loads + 1
+    # 仍有关系的节点被删除，相邻节点的度数已不准确
+    index.on_event('node_deleted', {'id': 1})
+    assert index.stats()['stale']
+
+
+def test_isolated_keyset_paging_survives_deletes(index):
+    index.isolated()
+    for node_id in (6, 7, 8):
+        index.on_event('node_created', {'id': node_id})
+    first, cursor, total = index.isolated(2)
+    assert (first, cursor, total) == ([4, 5], 5, 5)
+    index.on_event('node_deleted', {'id': 4})
+    index.on_event('node_deleted', {'id': 6})
+    second, cursor, _ = index.isolated(2, cursor)
+    assert (second, cursor) == ([7, 8], None)
+
+
+def test_top_keyset_paging_by_degree_then_id(index):
+    ranked, cursor = index.top(2)
+    assert ranked == [(1, 2), (2, 2)]
+    index.on_event('relationship_created', {'id': 10, 'start_node_id': 5, 'end_node_id': 4})
+    ranked, cursor = index.top(2, cursor)
+    assert ranked == [(3, 2), (4, 1)]
+    ranked, cursor = index.top(2, cursor)
+    assert (ranked, cursor) == ([(5, 1)], None)
+
+
+def test_top_rejects_unknown_direction(index):
+    with pytest.raises(ValueError):
+        index.top(direction="sideways")
+
+
+def test_events_during_load_are_applied_once(index):
+    graph = index.graph
+
+    def write():
+        # 关系 4 -> 1 在第一页 (1, 2) 读取之后、第二页 (3, 4) 读取之前提交
+        graph.version += 1
+        graph.rows = [(1, 1, 2) if row[0] == 1 else (4, 0, 1) if row[0] == 4 else row for row in graph.rows]
+        index.on_event('graph_batch', {'events': [
+            {'event': 'relationship_created', 'data': {'id': 9, 'start_node_id': 4, 'end_node_id': 1}},
+            {'event': 'node_created', 'data': {'id': 6}},
+        ], 'versions': [graph.version]})
+
+    # 第一页查询前后各读取一次版本号，第三次读取在第二页查询之前
+    graph.writes[3] = write
+    # 节点 1 的页不包含这次修改，由事件补上入度；节点 4 的页已包含，不重复计算
+    assert index.degree(1) == {'in': 1, 'out': 2, 'total': 3}
+    assert index.degree(4) == {'in': 0, 'out': 1, 'total': 1}
+    assert index.isolated() == ([5, 6], None, 2)
+    assert not index.stats()['stale']
+    assert graph.loads == 1
+
+
+def test_ambiguous_events_during_load_mark_index_stale(index):
+    graph = index.graph
+
+    def write():
+        graph.version += 1
+        index.on_event('graph_batch', {'events': [
+            {'event': 'relationship_created', 'data': {'id': 9, 'start_node_id': 4, 'end_node_id': 1}},
+        ], 'versions': [graph.version]})
+
+    # 在第一页查询之后、读取查询后版本号之前提交，无法确定第一页是否包含这次修改
+    graph.writes[2] = write
+    index.isolated()
+    assert index.stats()['stale']
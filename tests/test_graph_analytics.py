@@ -0,0 +1,125 @@
+from collections import deque
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from database.GraphAnalytics import GraphAnalytics
+
+
+class _FakeGraph:
+    def __init__(self, node_ids, edges):
+        self.node_ids = node_ids
+        self.edges = edges
+        self.graph_version = 0
+        self.exports = 0
+
+    def export_topology(self):
+        self.exports += 1
+        return {'node_ids': self.node_ids, 'start_node_ids': [edge[0] for edge in self.edges],
+                'end_node_ids': [edge[1] for edge in self.edges]}
+
+
+def _random_graph(seed, n=12, m=30):
+    rng = np.random.default_rng(seed)
+    node_ids = [int(node_id) for node_id in rng.choice(1000, size=n, replace=False)]
+    edges = {(node_ids[a], node_ids[b]) for a, b in rng.integers(0, n, size=(m, 2)) if a != b}
+    return node_ids, sorted(edges)
+
+
+def _shortest_path_counts(adjacency, source):
+    """BFS 求 source 到各节点的距离和最短路径数"""
+    dist, sigma = {source: 0}, {source: 1}
+    queue = deque([source])
+    while queue:
+        v = queue.popleft()
+        for w in adjacency[v]:
+            if w not in dist:
+                dist[w] = dist[v] + 1
+                sigma[w] = 0
+                queue.append(w)
+            if dist[w] == dist[v] + 1:
+                sigma[w] += sigma[v]
+    return dist, sigma
+
+
+def _brute_betweenness(node_ids, edges):
+    """按定义计算：经过 v 的 s-t 最短路径占比之和，v 在最短路径上当且仅当 d(s,v) + d(v,t) = d(s,t)"""
+    adjacency = {node_id: [] for node_id in node_ids}
+    for start, end in edges:
+        adjacency[start].append(end)
+    counts = {node_id: _shortest_path_counts(adjacency, node_id) for node_id in node_ids}
+    scores = dict.fromkeys(node_ids, 0.0)
+    for s, t in permutations(node_ids, 2):
+        dist_s, sigma_s = counts[s]
+        if t not in dist_s:
+            continue
+        for v in node_ids:
+            if v in (s, t) or v not in dist_s:
+                continue
+            dist_v, sigma_v = counts[v]
+            if t in dist_v and dist_s[v] + dist_v[t] == dist_s[t]:
+                scores[v] += sigma_s[v] * sigma_v[t] / sigma_s[t]
+    return scores
+
+
+def _dense_pagerank(node_ids, edges, damping):
+    """解线性方程 (I - d·P) r = (1 - d) / n，出度为 0 的节点均匀跳转"""
+    ids = sorted(node_ids)
+    n = len(ids)
+    position = {node_id: i for i, node_id in enumerate(ids)}
+    matrix = np.zeros((n, n))
+    for start, end in set(edges):
+        matrix[position[start], position[end]] = 1.0
+    out_degree = matrix.sum(axis=1)
+    transition = np.where(out_degree[:, None] > 0, matrix / np.maximum(out_degree, 1)[:, None], 1.0 / n).T
+    ranks = np.linalg.solve(np.eye(n) - damping * transition, np.full(n, (1.0 - damping) / n))
+    return dict(zip(ids, ranks / ranks.sum()))
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_betweenness_with_all_sources_matches_brute_force(seed):
+    node_ids, edges = _random_graph(seed)
+    analytics = GraphAnalytics(_FakeGraph(node_ids, edges), cache_ttl=0)
+    result = analytics.betweenness(limit=len(node_ids), samples=len(node_ids))
+    expected = _brute_betweenness(node_ids, edges)
+    assert result['samples'] == len(node_ids)
+    assert {node_id: pytest.approx(score) for node_id, score in result['top']} == expected
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_pagerank_matches_dense_solution(seed):
+    node_ids, edges = _random_graph(seed)
+    analytics = GraphAnalytics(_FakeGraph(node_ids, edges), cache_ttl=0)
+    result = analytics.pagerank(limit=len(node_ids), tol=1e-12, max_iter=1000)
+    expected = _dense_pagerank(node_ids, edges, 0.85)
+    assert result['converged']
+    assert {node_id: pytest.approx(score, abs=1e-9) for node_id, score in result['top']} == expected
+    scores = [score for _, score in result['top']]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_results_are_cached_per_version():
+    node_ids, edges = _random_graph(0)
+    graph = _FakeGraph(node_ids, edges)
+    analytics = GraphAnalytics(graph, cache_ttl=0)
+    first = analytics.pagerank()
+    assert analytics.pagerank() is first
+    assert graph.exports == 1
+    graph.graph_version += 1
+    second = analytics.pagerank()
+    assert graph.exports == 2
+    assert second['warm_start']
+
+
+def test_components_and_reachability():
+    graph = _FakeGraph([1, 2, 3, 4, 5], [(1, 2), (2, 1), (2, 3), (4, 5)])
+    analytics = GraphAnalytics(graph, cache_ttl=0)
+    weak = analytics.components("weak")
+    assert weak['count'] == 2
+    assert [component['size'] for component in weak['largest']] == [3, 2]
+    assert analytics.components("strong")['count'] == 4
+    assert analytics.same_component([1, 3, 5, 9], "weak") == {
+        'kind': 'weak', 'groups': [[1, 3], [5]], 'missing': [9], 'version': 0}
+    with pytest.raises(ValueError):
+        analytics.components("sideways")
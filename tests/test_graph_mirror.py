@@ -0,0 +1,128 @@
+import time
+
+import pytest
+
+from database.GraphMirror import GraphMirror
+
+
+class _FakeGraph:
+    def __init__(self, nodes, relationships, version=0):
+        self.nodes = nodes
+        self.relationships = relationships   # [(关系ID, 起点ID, 终点ID, 类型)]
+        self.graph_version = version
+
+    def export_topology(self):
+        return {
+            'node_ids': list(self.nodes),
+            'rel_ids': [rel[0] for rel in self.relationships],
+            'start_node_ids': [rel[1] for rel in self.relationships],
+            'end_node_ids': [rel[2] for rel in self.relationships],
+            'types': [rel[3] for rel in self.relationships],
+        }
+
+
+def _wait_for_builds(mirror, builds):
+    deadline = time.monotonic() + 5
+    while mirror.stats_counters['builds'] + mirror.stats_counters['build_failures'] < builds \
+            and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def _publish(mirror, graph, *events):
+    """模拟一次写入：图版本号递增，事件带着这次写入的版本号发布"""
+    graph.graph_version += 1
+    mirror.on_event('graph_batch', {'events': [{'event': event, 'data': data} for event, data in events],
+                                    'versions': [graph.graph_version]})
+
+
+@pytest.fixture
+def graph():
+    # 1 -> 2 -> 3 -> 4，1 -> 5
+    return _FakeGraph([1, 2, 3, 4, 5], [(10, 1, 2, 'R'), (11, 2, 3, 'R'), (12, 3, 4, 'S'), (13, 1, 5, 'R')])
+
+
+@pytest.fixture
+def mirror(graph):
+    mirror = GraphMirror(graph, max_stale=60, max_age=0, compact_threshold=100)
+    mirror.refresh()
+    _wait_for_builds(mirror, 1)
+    return mirror
+
+
+def test_traversal_on_built_arrays(mirror):
+    assert mirror.nearby_ids(1, 2, frontier_limit=10) == [2, 5, 3]
+    assert mirror.shortest_path(1, 4, 5) == ([1, 2, 3, 4], [10, 11, 12])
+    assert mirror.shortest_path(1, 4, 5, rel_types=['R']) == []
+    assert mirror.shortest_path(4, 1, 5, direction="in") == ([4, 3, 2, 1], [12, 11, 10])
+
+
+def test_frontier_cap_keeps_lowest_ids(mirror):
+    assert mirror.nearby_ids(1, 1, frontier_limit=1) == [2]
+
+
+def test_overlay_applies_events(graph, mirror):
+    _publish(mirror, graph, ('node_created', {'id': 6}),
+             ('relationship_created', {'id': 20, 'start_node_id': 4, 'end_node_id': 6, 'type': 'R'}))
+    assert mirror.shortest_path(1, 6, 10) == ([1, 2, 3, 4, 6], [10, 11, 12, 20])
+    _publish(mirror, graph, ('relationship_deleted', {'id': 11}))
+    assert mirror.shortest_path(1, 6, 10) == []
+    _publish(mirror, graph, ('node_deleted', {'id': 4}))
+    assert mirror.shortest_path(3, 6, 10) == []
+    edges = mirror.edge_list()
+    assert sorted(edges['node_ids'].tolist()) == [1, 2, 3, 5, 6]
+    assert sorted(zip(edges['start_node_ids'].tolist(), edges['end_node_ids'].tolist())) == [(1, 2), (1, 5)]
+
+
+def test_compaction_preserves_topology(graph, mirror):
+    mirror.compact_threshold = 2
+    _publish(mirror, graph, ('node_created', {'id': 6}), ('node_created', {'id': 7}),
+             ('relationship_created', {'id': 20, 'start_node_id': 6, 'end_node_id': 7, 'type': 'R'}),
+             ('relationship_deleted', {'id': 13}))
+    # 合并在后台进行，合并期间收到的删除在替换后重新应用
+    deadline = time.monotonic() + 5
+    while mirror.stats_counters['compactions'] < 1 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert mirror.stats_counters['compactions'] == 1
+    assert not mirror._added_nodes and not mirror._added_edges
+    assert mirror.stats()['edges'] == 4
+    assert mirror.shortest_path(6, 7, 1) == ([6, 7], [20])
+    assert mirror.nearby_ids(1, 1, frontier_limit=10) == [2]
+
+
+def test_retype_changes_type_filter(graph, mirror):
+    _publish(mirror, graph, ('relationship_updated', {'id': 12, 'start_node_id': 3, 'end_node_id': 4, 'type': 'R'}))
+    assert mirror.shortest_path(1, 4, 5, rel_types=['R']) == ([1, 2, 3, 4], [10, 11, 12])
+
+
+def test_version_watermark_waits_for_earlier_writes(graph, mirror):
+    # 两个并发写入：版本 2 的事件先于版本 1 到达
+    graph.graph_version = 2
+    mirror.on_event('graph_batch', {'events': [{'event': 'node_created', 'data': {'id': 7}}], 'versions': [2]})
+    assert mirror._version == 0
+    assert mirror.nearby_ids(1, 1, frontier_limit=10) is None
+    mirror.on_event('graph_batch', {'events': [{'event': 'node_created', 'data': {'id': 6}}], 'versions': [1]})
+    assert mirror._version == 2
+    assert mirror.nearby_ids(1, 1, frontier_limit=10) == [2, 5]
+
+
+def test_lagging_mirror_rebuilds_after_max_stale(graph, mirror):
+    mirror.max_stale = 0.01
+    graph.graph_version += 1    # 写入没有发布事件
+    assert mirror.nearby_ids(1, 1, frontier_limit=10) is None
+    time.sleep(0.02)
+    assert mirror.nearby_ids(1, 1, frontier_limit=10) is None
+    _wait_for_builds(mirror, 2)
+    assert mirror.nearby_ids(1, 1, frontier_limit=10) == [2, 5]
+
+
+def test_build_failure_is_recorded(graph):
+    def fail():
+        raise RuntimeError("database unavailable")
+    graph.export_topology = fail
+    mirror = GraphMirror(graph, max_stale=60, max_age=0)
+    mirror.refresh()
+    _wait_for_builds(mirror, 1)
+    stats = mirror.stats()
+    assert stats['build_failures'] == 1
+    assert stats['last_error'] == "RuntimeError: database unavailable"
+    assert mirror.nearby_ids(1, 1, frontier_limit=10) is None
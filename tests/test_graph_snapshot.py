@@ -0,0 +1,95 @@
+import datetime
+import os
+
+import pytest
+
+from database.GraphSnapshot import SnapshotStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / 'snapshots'))
+
+
+def _snapshot():
+    return {
+        'nodes': [
+            {'node_id': 5, 'labels': ['Person', 'Author'], 'properties': {'name': '张三', 'age': 30},
+             'fingerprint': 11},
+            {'node_id': 9, 'labels': [], 'properties': {'tags': ['a', 'b'], 'meta': {'x': 1.5}, 'flag': True},
+             'fingerprint': 12},
+            {'node_id': 2, 'labels': ['Person'], 'properties': {}, 'fingerprint': 13},
+        ],
+        'relationships': [
+            {'rel_id': 100, 'start_node_id': 5, 'end_node_id': 9, 'type': 'KNOWS', 'properties': {'since': 2020},
+             'fingerprint': 21},
+            {'rel_id': 101, 'start_node_id': 9, 'end_node_id': 2, 'type': 'CONNECTS_TO', 'properties': {},
+             'fingerprint': 22},
+            {'rel_id': 102, 'start_node_id': 9, 'end_node_id': 404, 'type': 'KNOWS', 'properties': {},
+             'fingerprint': 23},
+        ]
+    }
+
+
+def _strip(items):
+    """去掉指纹；标签组合按排序后的顺序保存"""
+    stripped = [{key: value for key, value in item.items() if key != 'fingerprint'} for item in items]
+    for item in stripped:
+        if 'labels' in item:
+            item['labels'] = sorted(item['labels'])
+    return stripped
+
+
+def test_round_trip(store):
+    original = _snapshot()
+    stats = store.save('base', original, journal_position=7)
+    assert stats['nodes'] == 3 and stats['relationships'] == 2 and stats['dropped_relationships'] == 1
+    assert 'json_bytes' not in stats
+
+    snapshot = store.open('base')
+    assert snapshot.meta['journal_position'] == 7
+    assert list(snapshot['nodes']) == _strip(original['nodes'])
+    assert list(snapshot['relationships']) == _strip(original['relationships'][:2])
+    fingerprints = snapshot.fingerprints()
+    assert fingerprints['node_fingerprints'].tolist() == [11, 12, 13]
+    assert fingerprints['relationship_ids'].tolist() == [100, 101]
+
+
+def test_replace_keeps_single_copy(store):
+    store.save('base', _snapshot())
+    smaller = {'nodes': _snapshot()['nodes'][:1], 'relationships': []}
+    stats = store.save('base', smaller, measure_json=True)
+    assert stats['json_bytes'] > 0
+    assert os.listdir(store.directory) == ['base']
+    assert [meta['nodes'] for meta in store.list()] == [1]
+
+
+def test_interrupted_replace_recovers_old_snapshot(store):
+    store.save('base', _snapshot())
+    # 旧快照已改名到一边、新快照尚未改名到位时中断
+    os.replace(os.path.join(store.directory, 'base'), os.path.join(store.directory, '.old-base'))
+    os.makedirs(os.path.join(store.directory, '.tmp-base'))
+    # 只在创建时恢复，运行中不会与保存的两次改名竞争
+    assert not store.exists('base')
+    reopened = SnapshotStore(store.directory)
+    assert reopened.exists('base')
+    assert os.listdir(store.directory) == ['base']
+    assert len(reopened.open('base')['nodes']) == 3
+
+
+def test_non_json_values_are_rejected(store):
+    snapshot = _snapshot()
+    snapshot['nodes'][0]['properties']['born'] = datetime.date(1990, 1, 1)
+    with pytest.raises(ValueError, match='born'):
+        store.save('base', snapshot)
+    assert not store.exists('base')
+    assert os.listdir(store.directory) == []
+
+
+def test_names_are_validated(store):
+    for name in ('', '../x', '.old-base', 'a/b'):
+        with pytest.raises(ValueError):
+            store.save(name, _snapshot())
+    with pytest.raises(KeyError):
+        store.open('missing')
+    assert store.delete('missing') is False
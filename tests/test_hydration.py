@@ -0,0 +1,25 @@
+from database.Neo4jDataProcessor import Link, Node
+
+
+def _node(node_id, **properties):
+    return {'node_id': node_id, 'labels': ['Node'], 'properties': properties}
+
+
+def _relationship(rel_id, start, end):
+    return {'rel_id': rel_id, 'type': 'R', 'properties': {'w': rel_id}, 'start_node_id': start, 'end_node_id': end,
+            'start_node': _node(start, name=f'n{start}'), 'end_node': _node(end, name=f'n{end}')}
+
+
+def test_node_from_record_uses_row_without_query():
+    node = Node.from_record(_node(10001, name='a'))
+    assert (node.id, node.labels, node.properties) == (10001, ['Node'], {'name': 'a'})
+
+
+def test_links_in_one_load_share_endpoint_nodes():
+    nodes = {}
+    first = Link.from_record(_relationship(20001, 10001, 10002), nodes)
+    second = Link.from_record(_relationship(20002, 10002, 10003), nodes)
+    assert first.end_node is second.start_node
+    assert first.start_node.properties == {'name': 'n10001'}
+    assert sorted(nodes) == [10001, 10002, 10003]
+    assert (second.type, second.properties) == ('R', {'w': 20002})
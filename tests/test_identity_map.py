@@ -0,0 +1,69 @@
+from database import Neo4jDataProcessor
+from database.Neo4jDataProcessor import IdentityMap
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = IdentityMap(max_size=2)
+    cache.put(1, 'a')
+    cache.put(2, 'b')
+    assert cache.get(1) == 'a'
+    cache.put(3, 'c')
+    assert cache.get(2) is None
+    assert cache.get(1) == 'a'
+    assert cache.get(3) == 'c'
+    assert cache.evictions == 1
+
+
+def test_peek_does_not_touch_order_or_stats():
+    cache = IdentityMap(max_size=2)
+    cache.put(1, 'a')
+    cache.put(2, 'b')
+    assert cache.peek(1) == 'a'
+    cache.put(3, 'c')
+    assert cache.peek(1) is None
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_ttl_expires_entries(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(Neo4jDataProcessor.time, 'monotonic', clock)
+    cache = IdentityMap(max_size=10, ttl=5)
+    cache.put(1, 'a')
+    clock.now += 4
+    assert cache.get(1) == 'a'
+    clock.now += 2
+    assert cache.get(1) is None
+    assert cache.stats()['size'] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidate_by_secondary_key():
+    cache = IdentityMap(max_size=10, index_fn=lambda pair: set(pair))
+    cache.put('r1', (1, 2))
+    cache.put('r2', (2, 3))
+    cache.put('r3', (3, 4))
+    cache.invalidate_by(2)
+    assert cache.peek('r1') is None and cache.peek('r2') is None
+    assert cache.peek('r3') == (3, 4)
+    # 被失效或淘汰的对象同时从二级索引中移除
+    cache.put('r3', (4, 5))
+    cache.invalidate_by(3)
+    assert cache.peek('r3') == (4, 5)
+
+
+def test_stats_hit_rate():
+    cache = IdentityMap(max_size=10)
+    cache.put(1, 'a')
+    cache.get(1)
+    cache.get(2)
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
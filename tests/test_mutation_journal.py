@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from database.MutationJournal import MutationJournal
+
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    return str(tmp_path / 'journal')
+
+
+def _segments(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory))
+
+
+def test_records_batches_and_reads_ranges(journal_dir):
+    journal = MutationJournal(journal_dir, fsync_interval=60)
+    journal('node_created', {'id': 1})
+    journal('graph_batch', {'events': [{'event': 'node_updated', 'data': {'id': 1}},
+                                       {'event': 'node_deleted', 'data': {'id': 1}}], 'versions': [2]})
+    assert journal.position == 3
+    assert [record['event'] for record in journal.read()] == ['node_created', 'node_updated', 'node_deleted']
+    assert [record['seq'] for record in journal.read(1, 2)] == [2]
+    journal.close()
+
+
+def test_segments_roll_over(journal_dir):
+    journal = MutationJournal(journal_dir, segment_size=200, fsync_interval=60)
+    for node_id in range(10):
+        journal('node_created', {'id': node_id})
+    assert len(journal.stats()['segments']) > 1
+    assert [record['data']['id'] for record in journal.read(4)] == list(range(4, 10))
+    journal.close()
+
+
+def test_torn_tail_is_truncated_on_recovery(journal_dir):
+    journal = MutationJournal(journal_dir, fsync_interval=60)
+    for node_id in range(3):
+        journal('node_created', {'id': node_id})
+    journal.close()
+    last_segment = _segments(journal_dir)[-1]
+    intact_size = os.path.getsize(last_segment)
+    with open(last_segment, 'ab') as f:
+        f.write(b'{"seq": 4, "ts": 1, "event": "node_cre')
+
+    journal = MutationJournal(journal_dir, fsync_interval=60)
+    assert journal.position == 3
+    assert os.path.getsize(last_segment) == intact_size
+    journal('node_created', {'id': 3})
+    assert [record['seq'] for record in journal.read()] == [1, 2, 3, 4]
+    journal.close()
+
+
+def test_corrupt_last_line_is_truncated(journal_dir):
+    journal = MutationJournal(journal_dir, fsync_interval=60)
+    journal('node_created', {'id': 1})
+    journal.close()
+    with open(_segments(journal_dir)[-1], 'ab') as f:
+        f.write(b'not json\n')
+    journal = MutationJournal(journal_dir, fsync_interval=60)
+    assert journal.position == 1
+    assert [record['seq'] for record in journal.read()] == [1]
+    journal.close()
+
+
+def test_replayed_batches_are_not_journaled(journal_dir):
+    journal = MutationJournal(journal_dir, fsync_interval=60)
+    journal('graph_batch', {'events': [{'event': 'node_created', 'data': {'id': 1}}], 'versions': [1],
+                            'journal': False})
+    assert journal.position == 0
+    assert list(journal.read()) == []
+    journal.close()
+
+
+def test_restore_writes_reset_marker_before_events(journal_dir):
+    journal = MutationJournal(journal_dir, fsync_interval=60)
+    journal('graph_batch', {'events': [{'event': 'node_created', 'data': {'id': 1}}], 'versions': [1],
+                            'restore': {'mode': 'diff'}})
+    records = list(journal.read())
+    assert [record['event'] for record in records] == ['graph_reset', 'node_created']
+    assert records[0]['data'] == {'mode': 'diff'}
+    journal.close()
+
+
+def test_unserializable_batch_leaves_no_gap(journal_dir):
+    journal = MutationJournal(journal_dir, fsync_interval=60)
+    journal('node_created', {'id': 1})
+    with pytest.raises(TypeError):
+        journal('graph_batch', {'events': [{'event': 'node_created', 'data': {'id': 2}},
+                                           {'event': 'node_created', 'data': {'id': object()}}], 'versions': [2]})
+    journal('node_created', {'id': 3})
+    assert [record['seq'] for record in journal.read()] == [1, 2]
+    assert [record['data']['id'] for record in journal.read()] == [1, 3]
+    journal.close()
@@ -0,0 +1,62 @@
+from database.NodeDedup import DuplicateFinder, node_features, normalize_name
+
+
+def _record(node_id, **properties):
+    return {'node_id': node_id, 'properties': properties}
+
+
+def test_normalize_name():
+    assert normalize_name("Ｎｅｏ４ｊ  Graph!") == "neo4jgraph"
+
+
+def test_node_features():
+    features = node_features({'name': 'Ab', 'city': 'Paris', 'bio': 'x' * 100, 'tags': ['a']})
+    assert features == {'^a', 'ab', 'b$', 'city=Paris'}
+    assert node_features({}) == set()
+
+
+def test_internal_keys_and_unnamed_nodes_are_ignored():
+    features = node_features({'name': 'Ab', 'import_key': 'k1', 'updated_at': 1700000000000})
+    assert features == {'^a', 'ab', 'b$'}
+    assert node_features({'city': 'Paris'}) == set()
+    assert node_features({'city': 'Paris', 'import_key': 'k1'}, include_unnamed=True) == {'city=Paris'}
+
+
+def test_finds_near_duplicates():
+    records = [
+        _record(1, name="Alan Turing", field="math"),
+        _record(2, name="alan  turing", field="math"),
+        _record(3, name="Alan Turing.", field="math"),
+        _record(4, name="Grace Hopper", field="cs"),
+        _record(5, name="Ada Lovelace"),
+        _record(6, description=None),
+    ]
+    result = DuplicateFinder(threshold=0.8).find(iter(records))
+    assert [cluster['node_ids'] for cluster in result['clusters']] == [[1, 2, 3]]
+    assert result['clusters'][0]['similarity'] == 1.0
+    assert result['nodes'] == 5
+
+
+def test_unnamed_nodes_only_when_requested():
+    records = [_record(1, city="Paris", field="math"), _record(2, city="Paris", field="math"),
+               _record(3, name="Alan Turing", import_key="a"), _record(4, name="Grace Hopper", import_key="b")]
+    assert DuplicateFinder(threshold=0.8).find(records)['clusters'] == []
+    result = DuplicateFinder(threshold=0.8).find(records, include_unnamed=True)
+    assert [cluster['node_ids'] for cluster in result['clusters']] == [[1, 2]]
+
+
+def test_threshold_and_limit():
+    records = [
+        _record(1, name="knowledge graph"), _record(2, name="knowledge graphs"),
+        _record(3, name="neo4j database"), _record(4, name="neo4j databases"),
+    ]
+    finder = DuplicateFinder(threshold=0.7)
+    result = finder.find(records)
+    assert sorted(cluster['node_ids'] for cluster in result['clusters']) == [[1, 2], [3, 4]]
+    assert len(finder.find(records, limit=1)['clusters']) == 1
+    assert DuplicateFinder(threshold=0.99).find(records)['clusters'] == []
+
+
+def test_results_are_deterministic():
+    records = [_record(i, name=f"node {i % 7}") for i in range(50)]
+    assert DuplicateFinder().find(records)['clusters'] == DuplicateFinder().find(records)['clusters']
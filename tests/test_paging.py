@@ -0,0 +1,51 @@
+from database.Neo4jStuff import LAST_NODE_ID_QUERY, _seek_page
+
+
+class _FakeTx:
+    """按 `id(n) IN range($start, $end)` 的语义回答窗口查询，并记录每次读取的ID区间"""
+
+    def __init__(self, ids):
+        self.ids = sorted(ids)
+        self.windows = []
+
+    def run(self, query, **params):
+        if query == LAST_NODE_ID_QUERY:
+            return _Result([{'last_id': self.ids[-1]}] if self.ids else [])
+        self.windows.append((params['start'], params['end']))
+        found = [node_id for node_id in self.ids if params['start'] <= node_id <= params['end']]
+        return _Result([{'node_id': node_id} for node_id in found[:params['limit']]])
+
+
+class _Result(list):
+    def single(self):
+        return self[0] if self else None
+
+
+def _page(tx, after_id, limit):
+    return [record['node_id'] for record in _seek_page(tx, 'page', LAST_NODE_ID_QUERY, after_id, limit)]
+
+
+def test_pages_cover_every_id_once():
+    ids = [0, 1, 2, 5, 9, 10, 40, 41, 100]
+    tx = _FakeTx(ids)
+    seen, after_id = [], None
+    while True:
+        page = _page(tx, after_id, 3)
+        seen += page
+        if len(page) < 3:
+            break
+        after_id = page[-1]
+    assert seen == ids
+
+
+def test_windows_stay_proportional_to_limit_for_dense_ids():
+    tx = _FakeTx(range(10000))
+    assert _page(tx, 4999, 10) == list(range(5000, 5010))
+    assert tx.windows == [(5000, 5009)]
+
+
+def test_sparse_ids_widen_the_window_and_stop_at_last_id():
+    tx = _FakeTx([3, 500])
+    assert _page(tx, 3, 4) == [500]
+    assert tx.windows[-1][1] == 500
+    assert _page(_FakeTx([]), None, 4) == []